@@ -0,0 +1,310 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Generates synthetic exchange dumps and prices to benchmark pyhodl """
+
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytz
+
+from pyhodl.config import DATE_TIME_FORMAT, DATE_TIME_KEY
+
+SINCE = datetime(2017, 1, 1, tzinfo=pytz.utc)
+UNTIL = datetime(2019, 1, 1, tzinfo=pytz.utc)
+COINS = ["BTC", "ETH", "LTC", "XRP", "NEO", "BNB", "EOS", "XMR"]
+FIAT = "USD"
+BINANCE_MARKETS = ["ETHBTC", "LTCBTC", "XRPBTC", "NEOETH", "BNBETH", "EOSBTC"]
+BITFINEX_MARKETS = ["BTCUSD", "ETHUSD", "LTCUSD", "ETHBTC", "XMRBTC"]
+GDAX_PRODUCTS = ["BTC-USD", "ETH-USD", "LTC-USD", "ETH-BTC"]
+
+
+def generate_dates(size, rng, since=SINCE, until=UNTIL):
+    """
+    :param size: int
+        Number of dates to generate
+    :param rng: Random
+        Random generator
+    :param since: datetime
+        Generate dates since this date
+    :param until: datetime
+        Generate dates until this date
+    :return: generator of datetime
+        Sorted dates spread (with some noise) between boundaries
+    """
+
+    step = (until - since).total_seconds() / max(1, size)
+    for i in range(size):
+        yield since + timedelta(seconds=step * (i + rng.random()))
+
+
+def to_ms(date_time):
+    return int(date_time.timestamp() * 1e3)
+
+
+def to_iso(date_time):
+    return date_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def generate_binance(size, rng):
+    """
+    :param size: int
+        Number of transactions
+    :param rng: Random
+        Random generator
+    :return: generator of {}
+        Raw Binance trades, deposits and withdrawals
+    """
+
+    for i, date in enumerate(generate_dates(size, rng)):
+        kind = rng.random()
+        if kind < 0.8:  # trade
+            yield {
+                "symbol": rng.choice(BINANCE_MARKETS),
+                "id": i,
+                "orderId": i,
+                "price": str(rng.uniform(0.001, 0.1)),
+                "qty": str(rng.uniform(0.1, 10.0)),
+                "commission": str(rng.uniform(0.0, 0.01)),
+                "commissionAsset": "BNB",
+                "time": to_ms(date),
+                "isBuyer": rng.random() < 0.5,
+                "isMaker": rng.random() < 0.5,
+                "isBestMatch": True
+            }
+        elif kind < 0.9:  # deposit
+            yield {
+                "insertTime": to_ms(date),
+                "amount": rng.uniform(0.1, 10.0),
+                "asset": rng.choice(COINS),
+                "address": "address",
+                "txId": "tx" + str(i),
+                "status": 1
+            }
+        else:  # withdrawal
+            yield {
+                "id": "withdrawal" + str(i),
+                "amount": rng.uniform(0.1, 1.0),
+                "address": "address",
+                "asset": rng.choice(COINS),
+                "txId": "tx" + str(i),
+                "applyTime": to_ms(date),
+                "successTime": to_ms(date),
+                "status": 6
+            }
+
+
+def generate_bitfinex(size, rng):
+    """
+    :param size: int
+        Number of transactions
+    :param rng: Random
+        Random generator
+    :return: generator of {}
+        Raw Bitfinex trades and movements
+    """
+
+    for i, date in enumerate(generate_dates(size, rng)):
+        timestamp = str(date.timestamp())
+        if rng.random() < 0.8:  # trade
+            market = rng.choice(BITFINEX_MARKETS)
+            yield {
+                "price": str(rng.uniform(10.0, 1000.0)),
+                "amount": str(rng.uniform(0.01, 1.0)),
+                "timestamp": timestamp,
+                "type": rng.choice(["Buy", "Sell"]),
+                "fee_currency": market[3:],
+                "fee_amount": str(-rng.uniform(0.0, 0.1)),
+                "tid": i,
+                "order_id": i,
+                "symbol": market
+            }
+        else:  # movement
+            yield {
+                "id": i,
+                "currency": rng.choice(COINS),
+                "method": "CRYPTO",
+                "type": rng.choice(["DEPOSIT", "WITHDRAWAL"]),
+                "amount": str(rng.uniform(0.1, 1.0)),
+                "description": "",
+                "address": "address",
+                "status": "COMPLETED",
+                "timestamp": timestamp,
+                "txid": "tx" + str(i),
+                "fee": str(-rng.uniform(0.0, 0.001))
+            }
+
+
+def generate_coinbase_account(size, rng, coin):
+    """
+    :param size: int
+        Number of transactions
+    :param rng: Random
+        Random generator
+    :param coin: str
+        Coin of account
+    :return: generator of {}
+        Raw Coinbase transactions of account
+    """
+
+    for i, date in enumerate(generate_dates(size, rng)):
+        kind = rng.choice(["buy", "sell", "send"])
+        amount = rng.uniform(0.01, 1.0)
+        native_amount = amount * rng.uniform(100.0, 10000.0)
+        if kind == "sell" or (kind == "send" and rng.random() < 0.5):
+            amount, native_amount = -amount, -native_amount
+
+        yield {
+            "id": coin + str(i),
+            "type": kind,
+            "status": "completed",
+            "amount": {"amount": str(amount), "currency": coin},
+            "native_amount": {"amount": str(native_amount), "currency": FIAT},
+            "created_at": to_iso(date),
+            "updated_at": to_iso(date),
+            "instant_exchange": False,
+            "network": {
+                "status": "confirmed",
+                "transaction_fee": {"amount": "0.0001", "currency": coin}
+            }
+        }
+
+
+def generate_gdax_account(size, rng, coin):
+    """
+    :param size: int
+        Number of transactions
+    :param rng: Random
+        Random generator
+    :param coin: str
+        Coin of account
+    :return: generator of {}
+        Raw GDAX ledger of account
+    """
+
+    for i, date in enumerate(generate_dates(size, rng)):
+        if rng.random() < 0.8:  # match
+            details = {
+                "order_id": str(i),
+                "trade_id": str(i),
+                "product_id": rng.choice(GDAX_PRODUCTS)
+            }
+            kind = "match"
+        else:
+            details = {
+                "transfer_id": str(i),
+                "transfer_type": rng.choice(["deposit", "withdraw"])
+            }
+            kind = "transfer"
+
+        yield {
+            "id": i,
+            "amount": str(rng.uniform(-1.0, 1.0)),
+            "balance": "0.0",
+            "created_at": to_iso(date),
+            "type": kind,
+            "details": details,
+            "currency": coin
+        }
+
+
+def write_list(items, writer):
+    """
+    :param items: generator of {}
+        Items to write
+    :param writer: file
+        Where to write
+    :return: void
+        Writes items as JSON list, one at a time
+    """
+
+    writer.write("[")
+    for i, item in enumerate(items):
+        if i > 0:
+            writer.write(",\n")
+        writer.write(json.dumps(item))
+    writer.write("]")
+
+
+def write_dump(exchange, size, output_file, seed=0):
+    """
+    :param exchange: str
+        Exchange name (binance, bitfinex, coinbase, gdax)
+    :param size: int
+        Number of transactions
+    :param output_file: str
+        Path to file where to write dump
+    :param seed: int
+        Seed of random generator (same seed -> same dump)
+    :return: void
+        Writes synthetic dump of exchange (as updaters do)
+    """
+
+    rng = random.Random(seed)
+    with open(output_file, "w") as writer:
+        if exchange == "binance":
+            write_list(generate_binance(size, rng), writer)
+        elif exchange == "bitfinex":
+            write_list(generate_bitfinex(size, rng), writer)
+        elif exchange in ("coinbase", "gdax"):
+            generate_account = generate_coinbase_account \
+                if exchange == "coinbase" else generate_gdax_account
+            accounts = COINS[:4]
+            writer.write("{")
+            for i, coin in enumerate(accounts):
+                if i > 0:
+                    writer.write(",\n")
+                writer.write(json.dumps("account-" + coin) + ":")
+                write_list(
+                    generate_account(size // len(accounts), rng, coin), writer
+                )
+            writer.write("}")
+        else:
+            raise ValueError("Cannot generate data of exchange", exchange)
+
+
+def write_prices(output_file, hours=1.0, seed=0):
+    """
+    :param output_file: str
+        Path to file where to write prices
+    :param hours: float
+        Hours between 2 consecutive prices
+    :param seed: int
+        Seed of random generator
+    :return: void
+        Writes synthetic prices of all coins (as the price downloader does)
+    """
+
+    rng = random.Random(seed)
+    prices = {coin: rng.uniform(1.0, 1000.0) for coin in COINS}
+    count = int((UNTIL - SINCE).total_seconds() / (hours * 60 * 60)) + 1
+
+    def _generate():
+        for i in range(count):
+            for coin in prices:  # random walk
+                prices[coin] *= rng.uniform(0.98, 1.02)
+
+            item = dict(prices)
+            item[DATE_TIME_KEY] = (
+                SINCE + timedelta(hours=hours * i)
+            ).strftime(DATE_TIME_FORMAT)
+            yield item
+
+    with open(output_file, "w") as writer:
+        write_list(_generate(), writer)
@@ -0,0 +1,285 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Times parsing, wallets and prices hot paths on synthetic histories.
+
+Run as `python3 -m benchmarks.run -s 10000 -s 1000000 -o results.json`:
+data is generated (with a fixed seed) in a temporary home folder, so that
+your own ~/.pyhodl data is never touched. """
+
+import gc
+import json
+import optparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+EXCHANGES = ["binance", "bitfinex", "coinbase", "gdax"]
+STAGES = [
+    "parse", "parse_parallel", "wallets", "crypto_fiat", "crypto_fiat_stream",
+    "prices_table", "plot_data"
+]
+DEFAULT_SIZES = [10000]
+PRICES_LOOKUPS = 100000
+PARSE_WORKERS = max(2, os.cpu_count() or 1)
+
+
+def create_args():
+    """
+    :return: OptionParser
+        Parser that handles cmd arguments.
+    """
+
+    parser = optparse.OptionParser(
+        usage="-s SIZE [-s SIZE ...] -h/--help for full usage"
+    )
+    parser.add_option(
+        "-s", "--size", dest="sizes", action="append", type=int,
+        help="Number of transactions of each dump (repeat for more sizes)"
+    )
+    parser.add_option(
+        "-e", "--exchange", dest="exchanges", action="append",
+        choices=EXCHANGES, help="Exchange to benchmark (default: all)"
+    )
+    parser.add_option(
+        "--stage", dest="stages", action="append", choices=STAGES,
+        help="Stage to benchmark (default: all)"
+    )
+    parser.add_option(
+        "-o", "--output", dest="output", type=str,
+        help="Save results to this JSON file"
+    )
+    parser.add_option(
+        "-c", "--compare", dest="compare", type=str,
+        help="Compare results with the ones saved in this JSON file"
+    )
+    parser.add_option(
+        "--seed", dest="seed", type=int, default=0,
+        help="Seed of data generator"
+    )
+    parser.add_option(
+        "--no-memory", dest="memory", action="store_false", default=True,
+        help="Do not measure peak memory (stages are run once)"
+    )
+    return parser
+
+
+def measure(func, memory):
+    """
+    :param func: callback function
+        Stage to measure; returns a tuple (result, number of items processed)
+    :param memory: bool
+        True iff stage should be run again to trace its peak memory
+    :return: tuple (*, int, float, float)
+        Result of stage, number of items, seconds taken and peak memory
+        (MB) allocated by stage
+    """
+
+    gc.collect()
+    start_time = time.perf_counter()
+    result, items = func()
+    seconds = time.perf_counter() - start_time
+
+    peak = float("nan")
+    if memory:  # tracing slows down stage, so time it without tracing
+        del result
+        gc.collect()
+        tracemalloc.start()
+        result, items = func()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    return result, items, seconds, peak
+
+
+def benchmark_exchange(exchange_name, size, folder, stages, memory, seed):
+    """
+    :param exchange_name: str
+        Exchange to benchmark
+    :param size: int
+        Number of transactions
+    :param folder: str
+        Folder where to generate data
+    :param stages: [] of str
+        Stages to run
+    :param memory: bool
+        True iff peak memory should be measured
+    :param seed: int
+        Seed of data generator
+    :return: generator of {}
+        Results of each stage
+    """
+
+    from benchmarks.data import write_dump, SINCE, UNTIL, COINS
+    from pyhodl.data.parsers import build_parser
+    from pyhodl.data.tables import CoinPricesTable
+    from pyhodl.models.exchanges import Portfolio
+
+    input_file = os.path.join(folder, exchange_name + ".json")
+    write_dump(exchange_name, size, input_file, seed)
+    context = {}
+
+    def _parse():
+        exchange = build_parser(input_file).build_exchange()
+        return exchange, exchange.get_transactions_count()
+
+    def _parse_parallel():
+        parser = build_parser(input_file, max_workers=PARSE_WORKERS)
+        exchange = parser.build_exchange()
+        return exchange, exchange.get_transactions_count()
+
+    def _wallets():
+        wallets = context["exchange"].build_wallets()
+        return wallets, context["exchange"].get_transactions_count()
+
+    def _crypto_fiat():
+        portfolio = Portfolio(context["wallets"].values())
+        dates, crypto, fiat = portfolio.get_crypto_fiat_balance("USD")
+        return (dates, crypto, fiat), len(dates)
+
+    def _crypto_fiat_stream():
+        portfolio = Portfolio(context["wallets"].values())
+        points = sum(1 for _ in portfolio.iter_crypto_fiat_balance("USD"))
+        return None, points
+
+    def _prices_table():
+        table = CoinPricesTable("USD")
+        rng = random.Random(seed)
+        for _ in range(PRICES_LOOKUPS):
+            table.get_value_on(
+                rng.choice(COINS),
+                SINCE + (UNTIL - SINCE) * rng.random()
+            )
+        return table, PRICES_LOOKUPS
+
+    def _plot_data():
+        portfolio = Portfolio(context["wallets"].values())
+        dates = portfolio.get_transactions_dates()
+        balances = [
+            wallet.get_balance_by_date(dates) for wallet in portfolio.wallets
+        ]
+        return balances, len(dates) * len(balances)
+
+    functions = {
+        "parse": _parse,
+        "parse_parallel": _parse_parallel,
+        "wallets": _wallets,
+        "crypto_fiat": _crypto_fiat,
+        "crypto_fiat_stream": _crypto_fiat_stream,
+        "prices_table": _prices_table,
+        "plot_data": _plot_data
+    }
+
+    for stage in STAGES:
+        needed = stage in stages or \
+                 (stage == "parse" and
+                  set(stages) - {"prices_table", "parse_parallel"}) or \
+                 (stage == "wallets" and
+                  set(stages) & {
+                      "crypto_fiat", "crypto_fiat_stream", "plot_data"
+                  })
+        if not needed:
+            continue
+
+        result, items, seconds, peak = measure(
+            functions[stage], memory and stage in stages
+        )
+        if stage == "parse":
+            context["exchange"] = result
+        elif stage == "wallets":
+            context["wallets"] = result
+
+        if stage in stages:
+            yield {
+                "exchange": exchange_name,
+                "size": size,
+                "stage": stage,
+                "items": items,
+                "seconds": seconds,
+                "throughput": items / seconds if seconds > 0 else float("inf"),
+                "peak_memory_mb": peak
+            }
+
+    os.remove(input_file)
+
+
+def print_result(result, baseline=None):
+    line = "{exchange:>10} {size:>10} {stage:>14} {items:>12} " \
+           "{seconds:>10.3f} s {throughput:>14.1f} items/s " \
+           "{peak_memory_mb:>10.1f} MB".format(**result)
+    if baseline and result["seconds"] > 0:
+        line += " {:>8.2f}x".format(baseline["seconds"] / result["seconds"])
+    print(line)
+
+
+def load_baseline(input_file):
+    """
+    :param input_file: str
+        JSON file with results of a previous run
+    :return: {} of tuple -> {}
+        Previous results by exchange, size and stage
+    """
+
+    with open(input_file) as reader:
+        return {
+            (result["exchange"], result["size"], result["stage"]): result
+            for result in json.load(reader)
+        }
+
+
+def main():
+    options = create_args().parse_args()[0]
+    sizes = options.sizes or DEFAULT_SIZES
+    exchanges = options.exchanges or EXCHANGES
+    stages = options.stages or STAGES
+    baseline = load_baseline(options.compare) if options.compare else {}
+
+    folder = tempfile.mkdtemp(prefix="pyhodl-benchmarks-")
+    os.environ["HOME"] = folder  # pyhodl folders are relative to home
+    try:
+        from benchmarks.data import write_prices
+        from pyhodl.config import HISTORICAL_DATA_FOLDER
+
+        os.makedirs(HISTORICAL_DATA_FOLDER)
+        write_prices(
+            os.path.join(HISTORICAL_DATA_FOLDER, "usd.json"), seed=options.seed
+        )
+
+        results = []
+        for size in sizes:
+            for exchange_name in exchanges:
+                for result in benchmark_exchange(
+                        exchange_name, size, folder, stages, options.memory,
+                        options.seed):
+                    print_result(result, baseline.get(
+                        (result["exchange"], result["size"], result["stage"])
+                    ))
+                    results.append(result)
+
+        if options.output:
+            with open(options.output, "w") as writer:
+                json.dump(results, writer, indent=4)
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
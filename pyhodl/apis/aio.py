@@ -0,0 +1,343 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Asyncio API requests: many in-flight requests from one process """
+
+import asyncio
+import time
+import urllib.parse
+from contextlib import asynccontextmanager
+
+from hal.time.profile import get_time_eta, print_time_eta
+
+from pyhodl.apis.prices import CryptocompareClient, CoinmarketCapClient
+from pyhodl.config import DATE_TIME_KEY, VALUE_KEY, NAN, COINS_REGISTRY
+from pyhodl.metrics import METRICS
+from pyhodl.utils import datetime_to_str, generate_dates, middle
+
+try:
+    import aiohttp
+except ImportError:  # optional: pip install pyhodl[async]
+    aiohttp = None
+
+MAX_CONNECTIONS = 256  # in-flight requests of a session
+MAX_REQUESTS_PER_HOST = 16  # in-flight requests to each host
+REQUEST_TIMEOUT = 60  # seconds
+
+
+class AsyncSession:
+    """ Pool of connections shared by async clients, with a limit of
+    concurrent requests to each host """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS,
+                 max_per_host=MAX_REQUESTS_PER_HOST, timeout=REQUEST_TIMEOUT):
+        """
+        :param max_connections: int
+            Max number of open connections
+        :param max_per_host: int
+            Max number of concurrent requests to each host
+        :param timeout: float
+            Seconds before a request is given up
+        """
+
+        if aiohttp is None:
+            raise ValueError(
+                "Cannot make async requests without aiohttp",
+                "pip install pyhodl[async]"
+            )
+
+        self.max_connections = int(max_connections)
+        self.max_per_host = int(max_per_host)
+        self.timeout = float(timeout)
+        self.limits = {}  # host -> semaphore
+        self.session = None
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def open(self):
+        """
+        :return: void
+            Opens pool of connections (in the running event loop)
+        """
+
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+    async def close(self):
+        """
+        :return: void
+            Closes all connections
+        """
+
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @asynccontextmanager
+    async def limit(self, host, min_seconds=0.0):
+        """
+        :param host: str
+            Host (or url) to call
+        :param min_seconds: float
+            Keep slot of host for at least these seconds (rate limit)
+        :return: async context manager
+            Waits until host has a free slot
+        """
+
+        if "/" in host:
+            host = urllib.parse.urlsplit(host).netloc
+        if host not in self.limits:
+            self.limits[host] = asyncio.Semaphore(self.max_per_host)
+
+        async with self.limits[host]:
+            start_time = time.perf_counter()
+            yield
+            wait = min_seconds - (time.perf_counter() - start_time)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def get_json(self, url):
+        """
+        :param url: str
+            Url to fetch
+        :return: {} or []
+            Response parsed as json
+        """
+
+        self.open()
+        async with self.limit(url):
+            with METRICS.span("http"):
+                async with self.session.get(url) as response:
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+
+
+class AsyncCryptocompareClient(CryptocompareClient):
+    """ Async API interface for official cryptocompare.com APIs """
+
+    def __init__(self, session, base_url=CryptocompareClient.BASE_URL):
+        """
+        :param session: AsyncSession
+            Session where to make requests
+        :param base_url: str
+            Base url for API calls
+        """
+
+        CryptocompareClient.__init__(self, base_url)
+        self.session = session
+
+    async def download(self, url):
+        return await self.session.get_json(url)
+
+    async def get_price(self, coins, date_time, **kwargs):
+        currency = kwargs["currency"]
+        results = await asyncio.gather(*[
+            self.download(url)
+            for url in self.get_price_urls(coins, date_time, currency)
+        ])
+        return self.parse_price(coins, results, currency)
+
+    async def get_current_price(self, coins, **kwargs):
+        currency = kwargs["currency"]
+        results = await asyncio.gather(*[
+            self.download(url)
+            for url in self.get_current_price_urls(coins, currency)
+        ])
+        return self.parse_current_price(coins, results, currency)
+
+    async def get_prices_by_date(self, coins, dates, **kwargs):
+        """
+        :param coins: [] of str
+            List of coins
+        :param dates: [] of datetime
+            Dates and times to get price
+        :param kwargs: **
+            Extra args
+        :return: [] of {}
+            Price of coins at each date (dates failed are skipped), all
+            dates requested together
+        """
+
+        start_time = time.time()
+        dates = list(dates)
+        done = []
+
+        async def _get_price(date):
+            try:
+                new_prices = await self.get_price(coins, date, **kwargs)
+                new_prices[DATE_TIME_KEY] = datetime_to_str(date)
+                done.append(date)
+                self.log("got prices on", date)
+                print_time_eta(get_time_eta(len(done), len(dates), start_time))
+                return new_prices
+            except Exception:
+                print("Failed getting prices for", date)
+
+        results = await asyncio.gather(*[_get_price(date) for date in dates])
+        return [prices for prices in results if prices is not None]
+
+    async def get_prices(self, coins, **kwargs):
+        if "dates" in kwargs:
+            dates = kwargs["dates"]
+        else:  # args since, until and hours provided
+            dates = generate_dates(
+                kwargs["since"],
+                kwargs["until"],
+                kwargs["hours"]
+            )
+
+        return await self.get_prices_by_date(coins, dates, **kwargs)
+
+
+class AsyncCoinmarketCapClient(CoinmarketCapClient):
+    """ Async coinmarketcap.com APIs data """
+
+    def __init__(self, session, base_url=CoinmarketCapClient.BASE_URL):
+        """
+        :param session: AsyncSession
+            Session where to make requests
+        :param base_url: str
+            Base url for API calls
+        """
+
+        CoinmarketCapClient.__init__(self, base_url)
+        self.session = session
+
+    async def download(self, url):
+        return await self.session.get_json(url)
+
+    async def get_market_cap(self, since, until):
+        raw_data = await self.download(
+            self._create_url("marketcap", since, until)
+        )
+        return self.parse_market_cap(raw_data)
+
+    async def get_coin_stats(self, coin, since, until):
+        raw_data = await self.download(self._create_url(coin, since, until))
+        return self.parse_coin_stats(raw_data)
+
+    async def get_price(self, coins, date_time, **kwargs):
+        async def _get_price(coin):
+            try:
+                stats = await self.get_coin_stats(
+                    coin,
+                    date_time - self.TIME_FRAME,
+                    date_time + self.TIME_FRAME
+                )
+                return middle(stats["price_usd"])[VALUE_KEY]
+            except Exception:
+                return NAN
+
+        prices = await asyncio.gather(*[_get_price(coin) for coin in coins])
+        return dict(zip(coins, prices))
+
+    async def get_raw_prices(self, coins, **kwargs):
+        since = kwargs["since"]
+        until = kwargs["until"]
+
+        async def _get_raw_prices(coin):
+            try:
+                raw = (await self.get_coin_stats(
+                    coin, since, until
+                ))["price_usd"]
+                return sorted(raw, key=lambda x: x[DATE_TIME_KEY])  # sort
+            except Exception:
+                self.log("Failed getting", coin, "prices")
+
+        raws = await asyncio.gather(*[_get_raw_prices(coin) for coin in coins])
+        return {
+            coin: raw for coin, raw in zip(coins, raws) if raw is not None
+        }
+
+    async def get_prices(self, coins, **kwargs):
+        windows = self.get_windows(kwargs["since"], kwargs["until"])
+        return self.merge_raw_prices(coins, await asyncio.gather(*[
+            self.get_raw_prices(coins, since=since, until=until)
+            for since, until in windows
+        ]))
+
+
+def get_async_client(currency, session):
+    """
+    :param currency: str
+        Currency to get price
+    :param session: AsyncSession
+        Session where to make requests
+    :return: ApiClient
+        Async client to get price with
+    """
+
+    if COINS_REGISTRY.get(currency) in CryptocompareClient.AVAILABLE_FIAT:
+        return AsyncCryptocompareClient(session)  # better client
+
+    return AsyncCoinmarketCapClient(session)
+
+
+async def get_prices_async(coins, currency, since, until, session=None):
+    """
+    :param coins: [] of str
+        List of coins
+    :param currency: str
+        Convert prices to this currency
+    :param since: datetime
+        Get prices since this date
+    :param until: datetime
+        Get prices until this date
+    :param session: AsyncSession
+        Session where to make requests (if None, a new one is opened)
+    :return: [] of {}
+        List of prices of coins at dates, all dates requested together
+    """
+
+    if session is None:
+        async with AsyncSession() as session:
+            return await get_prices_async(
+                coins, currency, since, until, session
+            )
+
+    client = get_async_client(currency, session)
+    return await client.get_prices(
+        coins, since=since, until=until, hours=6, currency=currency
+    )
+
+
+def get_prices(coins, currency, since, until):
+    """
+    :param coins: [] of str
+        List of coins
+    :param currency: str
+        Convert prices to this currency
+    :param since: datetime
+        Get prices since this date
+    :param until: datetime
+        Get prices until this date
+    :return: [] of {}
+        List of prices of coins at dates (same as
+        pyhodl.apis.prices.get_prices, but requested concurrently on an
+        event loop)
+    """
+
+    return asyncio.run(get_prices_async(coins, currency, since, until))
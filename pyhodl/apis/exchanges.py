@@ -78,6 +78,22 @@ class ApiConfig:
 
         return
 
+    def has_async_client(self):
+        """
+        :return: bool
+            True iff exchange has an asyncio client
+        """
+
+        return False
+
+    def get_async_client(self):
+        """
+        :return: ApiClient
+            Asyncio api client (to be built in a running event loop)
+        """
+
+        raise ValueError("Exchange has no async client", self.raw["name"])
+
     @staticmethod
     def build_api(raw):
         """
@@ -108,6 +124,17 @@ class BinanceApi(ApiConfig):
             self.secret
         )
 
+    def has_async_client(self):
+        return True
+
+    def get_async_client(self):
+        from binance import AsyncClient  # python-binance >= 1.0
+
+        return AsyncClient(
+            self.key,
+            self.secret
+        )
+
 
 class BitfinexApi(ApiConfig):
     """ Api config for Bitfinex exchange """
@@ -118,6 +145,17 @@ class BitfinexApi(ApiConfig):
             "secret": self.secret
         })
 
+    def has_async_client(self):
+        return True
+
+    def get_async_client(self):
+        from ccxt.async_support import bitfinex
+
+        return bitfinex({
+            "apiKey": self.key,
+            "secret": self.secret
+        })
+
 
 class CoinbaseApi(ApiConfig):
     """ Api config for Coinbase exchange """
@@ -19,22 +19,32 @@
 """ API requests for historical info """
 
 import abc
+import json
 import os
+import tempfile
 import time
 import urllib.parse
 import urllib.request
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from hal.time.profile import get_time_eta, print_time_eta
 
 from pyhodl.app import get_coin_by_symbol
-from pyhodl.config import DATE_TIME_KEY, VALUE_KEY, NAN, FIAT_COINS
-from pyhodl.data.coins import Coin
+from pyhodl.config import DATE_TIME_KEY, VALUE_KEY, NAN, FIAT_COINS, \
+    COINS_REGISTRY, APP_FOLDER
 from pyhodl.logs import Logger
+from pyhodl.metrics import timed
 from pyhodl.utils import replace_items, \
     datetime_to_unix_timestamp_ms, unix_timestamp_ms_to_datetime, download, \
     download_with_tor, datetime_to_str, datetime_to_unix_timestamp_s, middle, \
-    generate_dates
+    generate_dates, is_nan, unix_timestamps_to_datetimes, UTC
+
+CURRENT_PRICES_TTL = 60  # seconds before a current price is fetched again
+CURRENT_PRICES_CACHE = {}  # (currency, coin) -> (time fetched, price)
+CURRENT_PRICES_FILE = os.path.join(
+    APP_FOLDER,
+    "current_prices.json"
+)  # cache shared by runs
 
 
 class AbstractApiClient(Logger):
@@ -68,6 +78,18 @@ class PricesApiClient(AbstractApiClient):
 
         return
 
+    def get_current_price(self, coins, **kwargs):
+        """
+        :param coins: [] of str
+            List of coins
+        :param kwargs: **
+            Extra args
+        :return: {}
+            Price of coins right now
+        """
+
+        return self.get_price(coins, datetime.now(UTC), **kwargs)
+
     def get_prices_by_date(self, coins, dates, **kwargs):
         """
         :param coins: [] of str
@@ -125,6 +147,7 @@ class TorApiClient:
         if self.tor:
             print("Handling tor sessions with password:", self.tor)
 
+    @timed("http")
     def download(self, url):
         """
         :param url: str
@@ -143,7 +166,9 @@ class CryptocompareClient(PricesApiClient, TorApiClient):
     """ API interface for official cryptocompare.com APIs """
 
     BASE_URL = "https://min-api.cryptocompare.com/data/pricehistorical"
+    CURRENT_URL = "https://min-api.cryptocompare.com/data/pricemulti"
     MAX_COINS_PER_REQUEST = 6
+    MAX_COINS_PER_CURRENT_REQUEST = 50
     API_ENCODING = {
         "IOTA": "IOT"
     }
@@ -206,28 +231,115 @@ class CryptocompareClient(PricesApiClient, TorApiClient):
         url = self.base_url + "?%s" % params
         return url.replace("%2C", ",")
 
+    def get_price_urls(self, coins, date_time, currency):
+        """
+        :param coins: [] of str
+            BTC, ETH ...
+        :param date_time: datetime
+            Date and time of price
+        :param currency: str
+            Currency of prices
+        :return: [] of str
+            Urls to call (one for each chunk of coins)
+        """
+
+        return [
+            self.get_api_url(
+                self._encode_coins(
+                    coins[i: i + self.MAX_COINS_PER_REQUEST]
+                ), date_time, currency=currency
+            ) for i in range(0, len(coins), self.MAX_COINS_PER_REQUEST)
+        ]
+
+    def parse_price(self, coins, results, currency):
+        """
+        :param coins: [] of str
+            BTC, ETH ...
+        :param results: [] of {}
+            Result of each url to call
+        :param currency: str
+            Currency of prices
+        :return: {}
+            Price of each coin (NaN if missing)
+        """
+
+        data = {}
+        for result in results:
+            for coin, price in result[currency].items():
+                try:
+                    price = float(1 / price)
+                except:
+                    price = NAN
+                data[coin] = price
+        data = self._decode_coins(data)
+
+        for coin in coins:
+            if coin not in data:
+                data[coin] = NAN
+        return data
+
     def get_price(self, coins, date_time, **kwargs):
         currency = kwargs["currency"]
-        if len(coins) > self.MAX_COINS_PER_REQUEST:
-            data = self.get_price(
-                coins[self.MAX_COINS_PER_REQUEST:], date_time,
-                currency=currency
-            )
-        else:
-            data = {}
+        results = [
+            self.download(url)
+            for url in self.get_price_urls(coins, date_time, currency)
+        ]
+        return self.parse_price(coins, results, currency)
 
-        url = self.get_api_url(
-            self._encode_coins(coins[:self.MAX_COINS_PER_REQUEST]),
-            date_time, currency=currency
+    def get_current_api_url(self, coins, **kwargs):
+        """
+        :param coins: [] of str
+            BTC, ETH ...
+        :return: str
+            Url to call to get current price of all coins at once
+        """
+
+        params = urllib.parse.urlencode(
+            {
+                "fsyms": ",".join(coins),
+                "tsyms": str(kwargs["currency"])
+            }
         )
-        result = self.download(url)
-        values = result[currency]
-        for coin, price in values.items():
-            try:
-                price = float(1 / price)
-            except:
-                price = NAN
-            data[coin] = price
+        url = self.CURRENT_URL + "?%s" % params
+        return url.replace("%2C", ",")
+
+    def get_current_price_urls(self, coins, currency):
+        """
+        :param coins: [] of str
+            BTC, ETH ...
+        :param currency: str
+            Currency of prices
+        :return: [] of str
+            Urls to call (one for each chunk of coins)
+        """
+
+        return [
+            self.get_current_api_url(
+                self._encode_coins(
+                    list(coins[i: i + self.MAX_COINS_PER_CURRENT_REQUEST])
+                ), currency=currency
+            ) for i in range(0, len(coins), self.MAX_COINS_PER_CURRENT_REQUEST)
+        ]
+
+    def parse_current_price(self, coins, results, currency):
+        """
+        :param coins: [] of str
+            BTC, ETH ...
+        :param results: [] of {}
+            Result of each url to call
+        :param currency: str
+            Currency of prices
+        :return: {}
+            Current price of each coin (NaN if missing)
+        """
+
+        data = {}
+        for result in results:
+            for coin, values in result.items():
+                try:
+                    data[coin] = float(values[currency])
+                except:
+                    data[coin] = NAN
         data = self._decode_coins(data)
 
         for coin in coins:
@@ -235,12 +347,20 @@ class CryptocompareClient(PricesApiClient, TorApiClient):
                 data[coin] = NAN
         return data
 
+    def get_current_price(self, coins, **kwargs):
+        currency = kwargs["currency"]
+        results = [
+            self.download(url)
+            for url in self.get_current_price_urls(coins, currency)
+        ]
+        return self.parse_current_price(coins, results, currency)
+
 
 class CoinmarketCapClient(PricesApiClient, TorApiClient):
     """ Get coinmarketcap.com APIs data """
 
     BASE_URL = "https://graphs.coinmarketcap.com/"
-    AVAILABLE_FIAT = [Coin("USD")]
+    AVAILABLE_FIAT = [COINS_REGISTRY.get("USD")]
     TIME_FRAME = timedelta(minutes=5)  # API does not provide exact timing
 
     def __init__(self, base_url=BASE_URL, tor=False):
@@ -281,6 +401,17 @@ class CoinmarketCapClient(PricesApiClient, TorApiClient):
         """
 
         raw_data = self.download(self._create_url("marketcap", since, until))
+        return self.parse_market_cap(raw_data)
+
+    @staticmethod
+    def parse_market_cap(raw_data):
+        """
+        :param raw_data: {}
+            Result of API calling
+        :return: [] of {}
+            Market cap on each date
+        """
+
         data = raw_data["market_cap_by_available_supply"]
         data = [
             {
@@ -305,13 +436,27 @@ class CoinmarketCapClient(PricesApiClient, TorApiClient):
         """
 
         raw_data = self.download(self._create_url(coin, since, until))
+        return self.parse_coin_stats(raw_data)
+
+    @staticmethod
+    def parse_coin_stats(raw_data):
+        """
+        :param raw_data: {}
+            Result of API calling
+        :return: {}
+            Coin stats
+        """
+
         data = {}
         for category, values in raw_data.items():
+            dates = unix_timestamps_to_datetimes(
+                [item[0] for item in values], unit="ms"
+            )  # all together
             data[category] = [
                 {
-                    DATE_TIME_KEY: unix_timestamp_ms_to_datetime(item[0]),
+                    DATE_TIME_KEY: date,
                     VALUE_KEY: float(item[1])
-                } for item in values
+                } for date, item in zip(dates, values)
             ]
         return data
 
@@ -355,17 +500,39 @@ class CoinmarketCapClient(PricesApiClient, TorApiClient):
                 self.log("Failed getting", coin, "prices")
         return prices
 
-    def get_prices(self, coins, **kwargs):
-        since = kwargs["since"] - self.TIME_FRAME
-        until = kwargs["until"] + self.TIME_FRAME
+    def get_windows(self, since, until):
+        """
+        :param since: datetime
+            Get prices since this date
+        :param until: datetime
+            Get prices until this date
+        :return: [] of (datetime, datetime)
+            Intervals of dates to get raw prices of (API returns prices
+            with 5 minutes interval time just for short intervals)
+        """
+
+        since = since - self.TIME_FRAME
+        until = until + self.TIME_FRAME
         dates = list(generate_dates(since, until, hours=23))  # day intervals
+        return [
+            (dates[i - 1], date) for i, date in enumerate(dates[1:])
+        ]
+
+    @staticmethod
+    def merge_raw_prices(coins, windows_prices):
+        """
+        :param coins: [] of str
+            Coins fetched
+        :param windows_prices: [] of {}
+            Raw prices of each interval of dates
+        :return: [] of {}
+            Prices of coins on each date, sorted by date
+        """
+
         prices = {
             coin: [] for coin in coins
         }  # get raw prices with 5 minutes interval time
-        for i, date in enumerate(dates[1:]):
-            new_prices = self.get_raw_prices(
-                coins, since=dates[i - 1], until=date
-            )
+        for new_prices in windows_prices:
             for coin in new_prices:  # same keys
                 prices[coin] += new_prices[coin]
                 print("Found new datetime interval",
@@ -386,6 +553,13 @@ class CoinmarketCapClient(PricesApiClient, TorApiClient):
                 data.append(price)
         return data
 
+    def get_prices(self, coins, **kwargs):
+        windows = self.get_windows(kwargs["since"], kwargs["until"])
+        return self.merge_raw_prices(coins, [
+            self.get_raw_prices(coins, since=since, until=until)
+            for since, until in windows
+        ])
+
 
 def get_market_cap(since, until):
     """
@@ -411,7 +585,7 @@ def get_client(currency, tor):
         Client to get price with
     """
 
-    if Coin(currency) in CryptocompareClient.AVAILABLE_FIAT:
+    if COINS_REGISTRY.get(currency) in CryptocompareClient.AVAILABLE_FIAT:
         return CryptocompareClient(tor=tor)  # better client (use as default)
 
     return CoinmarketCapClient(tor=tor)
@@ -457,3 +631,97 @@ def get_price(coins, currency, date_time, tor):
     return client.get_price(
         coins, date_time=date_time, currency=currency
     )
+
+
+def load_current_prices(input_file=CURRENT_PRICES_FILE):
+    """
+    :param input_file: str
+        File with current prices fetched by any run
+    :return: {}
+        (currency, coin) -> (time fetched, price) of prices in file (empty
+        if file is missing or not valid)
+    """
+
+    try:
+        with open(input_file) as reader:
+            raw = json.load(reader)
+        return {
+            (currency, coin): (float(fetched), float(price))
+            for currency, coins in raw.items()
+            for coin, (fetched, price) in coins.items()
+        }
+    except (OSError, ValueError, TypeError, AttributeError):
+        return {}
+
+
+def save_current_prices(cache, output_file=CURRENT_PRICES_FILE):
+    """
+    :param cache: {}
+        (currency, coin) -> (time fetched, price)
+    :param output_file: str
+        File where to save current prices
+    :return: void
+        Saves prices not expired yet (readers never see a half-written
+        file). Prices are just not shared if file cannot be written.
+    """
+
+    now = time.time()
+    out = {}  # currency -> coin -> time fetched, price
+    for (currency, coin), (fetched, price) in cache.items():
+        if now - fetched <= CURRENT_PRICES_TTL:
+            out.setdefault(currency, {})[coin] = [fetched, price]
+
+    temp_file = None
+    try:
+        with tempfile.NamedTemporaryFile(
+                "w", dir=os.path.dirname(os.path.abspath(output_file)),
+                prefix=".current_prices.", suffix=".tmp", delete=False
+        ) as writer:  # unique, so that runs do not write the same one
+            temp_file = writer.name
+            json.dump(out, writer)
+        os.replace(temp_file, output_file)
+    except OSError:
+        if temp_file is not None and os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def get_current_prices(coins, currency, tor):
+    """
+    :param coins: [] of str
+        List of coins
+    :param currency: str
+        Convert prices to this currency
+    :param tor: str or None
+        Password to access tor proxy
+    :return: {}
+        Current price of each coin. Prices fetched less than
+        CURRENT_PRICES_TTL seconds ago (by this or other runs) are not
+        requested again.
+    """
+
+    for key, cached in load_current_prices(CURRENT_PRICES_FILE).items():
+        if key not in CURRENT_PRICES_CACHE or \
+                CURRENT_PRICES_CACHE[key][0] < cached[0]:
+            CURRENT_PRICES_CACHE[key] = cached
+
+    now = time.time()
+    prices, missing = {}, []
+    for coin in dict.fromkeys(coins):  # unique, keeping order
+        cached = CURRENT_PRICES_CACHE.get((currency, coin))
+        if COINS_REGISTRY.get(coin) == COINS_REGISTRY.get(currency):
+            prices[coin] = 1.0
+        elif cached and now - cached[0] <= CURRENT_PRICES_TTL:
+            prices[coin] = cached[1]
+        else:
+            missing.append(coin)
+
+    if missing:  # all coins in one batch
+        client = get_client(currency, tor)
+        new_prices = client.get_current_price(missing, currency=currency)
+        for coin in missing:
+            prices[coin] = new_prices.get(coin, NAN)
+            if not is_nan(prices[coin]):  # try again next time
+                CURRENT_PRICES_CACHE[(currency, coin)] = (now, prices[coin])
+        save_current_prices(CURRENT_PRICES_CACHE, CURRENT_PRICES_FILE)
+
+    return prices
@@ -23,7 +23,8 @@ import os
 from hal.files.parsers import JSONParser
 from hal.files.save_as import write_dicts_to_json
 
-from pyhodl.config import APP_FOLDER, API_FOLDER, DATA_FOLDER, CRYPTO_COINS
+from pyhodl.config import APP_FOLDER, API_FOLDER, DATA_FOLDER, \
+    COINS_REGISTRY
 
 
 class ConfigManager:
@@ -96,12 +97,8 @@ def create_workplace():
 
 
 def get_coin_by_name(coin_name):
-    for coin in CRYPTO_COINS:
-        if coin.name == coin_name or coin_name in coin.other_names:
-            return coin
+    return COINS_REGISTRY.get_by_name(coin_name)
 
 
 def get_coin_by_symbol(symbol):
-    for coin in CRYPTO_COINS:
-        if coin.symbol == symbol:
-            return coin
+    return COINS_REGISTRY.get_by_symbol(symbol)
@@ -21,7 +21,10 @@
 import abc
 
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
+from pyhodl.charts.sampling import downsample
 from pyhodl.config import VALUE_KEY
 from pyhodl.models.exchanges import Portfolio
 from pyhodl.utils import generate_dates, normalize
@@ -30,9 +33,59 @@ from pyhodl.utils import generate_dates, normalize
 class CryptoPlotter:
     """ Plots crypto data """
 
-    def __init__(self, wallets):
+    def __init__(self, wallets, headless=False):
+        """
+        :param wallets: [] of Wallet
+            Wallets to plot
+        :param headless: bool
+            True iff plot should just be saved to file: figure is drawn by
+            the Agg backend, without touching pyplot (and its global state)
+        """
+
         self.wallets = wallets
-        self.fig, self.axis = plt.subplots()
+        self.headless = headless
+        if headless:
+            self.fig = Figure()
+            FigureCanvasAgg(self.fig)
+            self.axis = self.fig.add_subplot(111)
+        else:
+            self.fig, self.axis = plt.subplots()
+
+        # no need to plot more points than pixels
+        self.max_points = int(self.fig.get_figwidth() * self.fig.dpi)
+
+    def _plot_series(self, dates, values, *args, method="lttb", **kwargs):
+        """
+        :param dates: [] of datetime
+            Sorted dates of series
+        :param values: [] of float
+            Values of series
+        :param method: str
+            How to downsample series: "lttb" or "min_max"
+        :return: void
+            Plots series, downsampled to the width of the plot
+        """
+
+        dates, values = downsample(dates, values, self.max_points, method)
+        self.axis.plot(dates, values, *args, **kwargs)
+
+    def _decorate(self, title, x_label, y_label):
+        """
+        :param title: str
+            Title of plot
+        :param x_label: str
+            Label of X-axis
+        :param y_label: str
+            Label of Y-axis
+        :return: void
+            Adds grid, labels, title and legend to plot
+        """
+
+        self.axis.grid(True)
+        self.axis.set_xlabel(x_label)
+        self.axis.set_ylabel(y_label)
+        self.axis.set_title(title)
+        self.axis.legend()  # build legend
 
     @abc.abstractmethod
     def show(self, title, x_label="Time", y_label="Amount"):
@@ -47,19 +100,36 @@ class CryptoPlotter:
             Shows plot
         """
 
-        plt.grid(True)
-        plt.xlabel(x_label)
-        plt.ylabel(y_label)
-        plt.title(title)
-        plt.legend()  # build legend
+        self._decorate(title, x_label, y_label)
         plt.show()
 
+    @abc.abstractmethod
+    def save(self, output_file, title, x_label="Time", y_label="Amount"):
+        """
+        :param output_file: str
+            Path to file where to save plot (format is guessed from
+            extension, e.g .png or .svg)
+        :param title: str
+            Title of plot
+        :param x_label: str
+            Label of X-axis
+        :param y_label: str
+            Label of Y-axis
+        :return: void
+            Saves plot to file and releases its figure
+        """
+
+        self._decorate(title, x_label, y_label)
+        self.fig.savefig(output_file, bbox_inches="tight")
+        if not self.headless:
+            plt.close(self.fig)
+
 
 class BalancePlotter(CryptoPlotter):
     """ Plots balance data of each coin for each date available """
 
-    def __init__(self, wallets):
-        CryptoPlotter.__init__(self, wallets)
+    def __init__(self, wallets, headless=False):
+        CryptoPlotter.__init__(self, wallets, headless)
         self.portfolio = Portfolio(self.wallets)
 
     def plot_balances(self):
@@ -71,7 +141,7 @@ class BalancePlotter(CryptoPlotter):
         dates = self.portfolio.get_transactions_dates()
         for wallet in self.wallets:
             balances = wallet.get_balance_by_date(dates)
-            plt.plot(
+            self._plot_series(
                 dates,
                 [b[VALUE_KEY] for b in balances],
                 "-x",
@@ -90,8 +160,7 @@ class BalancePlotter(CryptoPlotter):
             except:
                 print("Cannot plot delta balances wallet", wallet)
 
-    @staticmethod
-    def _plot_delta_balance(wallet):
+    def _plot_delta_balance(self, wallet):
         """
         :param wallet: Wallet
             Coin wallet with transactions
@@ -107,7 +176,7 @@ class BalancePlotter(CryptoPlotter):
             float(balance[VALUE_KEY]) for balance in deltas
         ]
 
-        plt.plot(
+        self._plot_series(
             dates,
             subtotals,
             "-o",
@@ -117,12 +186,15 @@ class BalancePlotter(CryptoPlotter):
     def show(self, title, x_label="Time", y_label="Balances"):
         super().show(title, x_label, y_label)
 
+    def save(self, output_file, title, x_label="Time", y_label="Balances"):
+        super().save(output_file, title, x_label, y_label)
+
 
 class FiatPlotter(BalancePlotter):
     """ Plots coins-equivalent of your wallet """
 
-    def __init__(self, wallets, base_currency="USD"):
-        BalancePlotter.__init__(self, wallets)
+    def __init__(self, wallets, base_currency="USD", headless=False):
+        BalancePlotter.__init__(self, wallets, headless)
 
         self.base_currency = base_currency
         self.wallets_value = {
@@ -140,7 +212,7 @@ class FiatPlotter(BalancePlotter):
         dates = self.portfolio.get_transactions_dates()
         for wallet in self.wallets:
             balances = wallet.get_balance_by_date(dates, self.base_currency)
-            plt.plot(
+            self._plot_series(
                 dates,
                 balances,
                 "-x",
@@ -163,29 +235,28 @@ class FiatPlotter(BalancePlotter):
             hours=4
         ))
         price = wallet.get_price_on(dates, self.base_currency)
-        plt.plot(
+        self._plot_series(
             dates, price,
+            method="min_max",  # keep spikes of price
             label=wallet.base_currency + " " + self.base_currency + "price"
         )  # plot price
 
         max_delta = max(abs(delta[VALUE_KEY]) for delta in deltas)
-        for delta in deltas:  # plot buys/sells points
+        dates, prices, colors, sizes = [], [], [], []
+        for delta in deltas:  # buys/sells points
             val = delta[VALUE_KEY]
-            if val < 0:
-                color = "r"
-            else:
-                color = "g"
+            date = delta["transaction"].date
+            dates.append(date)
+            prices.append(wallet.convert_to(date, self.base_currency))
+            colors.append("r" if val < 0 else "g")
 
             # the bigger the radius the more you bought/sold
-            radius = normalize(abs(val), 0, max_delta, 5, 15)
-            date = delta["transaction"].date
-            plt.plot(
-                [date],
-                [wallet.convert_to(date, self.base_currency)],
-                marker="o",
-                markersize=int(radius),
-                color=color
-            )
+            radius = int(normalize(abs(val), 0, max_delta, 5, 15))
+            sizes.append(radius ** 2)  # scatter wants area
+
+        self.axis.scatter(
+            dates, prices, s=sizes, c=colors, marker="o", zorder=2
+        )  # all points at once
 
     def plot_crypto_fiat_balance(self):
         """
@@ -196,13 +267,13 @@ class FiatPlotter(BalancePlotter):
         dates, crypto_values, fiat_values = \
             self.portfolio.get_crypto_fiat_balance(self.base_currency)
 
-        plt.plot(
+        self._plot_series(
             dates,
             crypto_values,
             label="Crypto value of portfolio (" + self.base_currency + ")"
         )  # plot crypto balances
 
-        plt.plot(
+        self._plot_series(
             dates,
             fiat_values,
             label="Fiat value of portfolio (" + self.base_currency + ")"
@@ -210,3 +281,51 @@ class FiatPlotter(BalancePlotter):
 
     def show(self, title, x_label="Time", y_label="value"):
         super().show(title, x_label, self.base_currency + " " + y_label)
+
+    def save(self, output_file, title, x_label="Time", y_label="value"):
+        super().save(
+            output_file, title, x_label, self.base_currency + " " + y_label
+        )
+
+
+class HistoryPlotter(CryptoPlotter):
+    """ Plots past balances saved over time """
+
+    def __init__(self, series, base_currency="USD", headless=False):
+        """
+        :param series: BalancesSeries
+            Past balances
+        :param base_currency: str
+            Currency of balances
+        :param headless: bool
+            True iff plot should just be saved to file
+        """
+
+        CryptoPlotter.__init__(self, [], headless)
+
+        self.series = series
+        self.base_currency = base_currency
+
+    def plot_total_value(self, resolution="daily"):
+        """
+        :param resolution: str or None
+            Resolution of series to plot
+        :return: void
+            Plots total value of portfolio over time
+        """
+
+        dates, values = self.series.get_total_values(resolution)
+        self._plot_series(
+            dates,
+            values,
+            "-x",
+            label="Value of portfolio (" + self.base_currency + ")"
+        )
+
+    def show(self, title, x_label="Time", y_label="value"):
+        super().show(title, x_label, self.base_currency + " " + y_label)
+
+    def save(self, output_file, title, x_label="Time", y_label="value"):
+        super().save(
+            output_file, title, x_label, self.base_currency + " " + y_label
+        )
@@ -0,0 +1,150 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Render charts of many wallets to files, in parallel and headless """
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pyhodl.charts.balances import FiatPlotter
+from pyhodl.config import DEFAULT_FIAT
+
+CHARTS_FORMATS = ["png", "svg"]
+
+
+def get_chart_file(output_folder, exchange_name, chart, file_format):
+    """
+    :param output_folder: str
+        Folder where to save charts
+    :param exchange_name: str
+        Exchange name
+    :param chart: str
+        Chart name
+    :param file_format: str
+        Format of file (png, svg)
+    :return: str
+        Path to chart file
+    """
+
+    return os.path.join(
+        output_folder,
+        str(exchange_name).title() + "-" + str(chart) + "." + file_format
+    )
+
+
+def render_wallet_buy_sells(wallet, output_file, base_currency=DEFAULT_FIAT):
+    """
+    :param wallet: Wallet
+        Wallet to plot
+    :param output_file: str
+        Path to file where to save chart
+    :param base_currency: str
+        Currency of prices
+    :return: str
+        Path to chart file
+    """
+
+    plotter = FiatPlotter([wallet], base_currency, headless=True)
+    plotter.plot_buy_sells(wallet)
+    plotter.save(output_file, "Buys and sells of " + str(wallet.base_currency))
+    return output_file
+
+
+def render_portfolio_charts(wallets, output_files, base_currency=DEFAULT_FIAT):
+    """
+    :param wallets: [] of Wallet
+        Wallets of exchange
+    :param output_files: {} of str -> str
+        Path to file of "balances" and "crypto_fiat" charts
+    :param base_currency: str
+        Currency of values
+    :return: [] of str
+        Paths to chart files
+    """
+
+    plotter = FiatPlotter(wallets, base_currency, headless=True)
+    plotter.plot_balances()
+    plotter.save(output_files["balances"], "Value of wallets")
+
+    plotter = FiatPlotter(wallets, base_currency, headless=True)
+    plotter.plot_crypto_fiat_balance()
+    plotter.save(output_files["crypto_fiat"], "Crypto and fiat value")
+    return list(output_files.values())
+
+
+def render_charts(exchanges, output_folder, file_format="png",
+                  base_currency=DEFAULT_FIAT, max_workers=None):
+    """
+    :param exchanges: [] of CryptoExchange
+        Exchanges to plot
+    :param output_folder: str
+        Folder where to save charts
+    :param file_format: str
+        Format of files (png, svg)
+    :param base_currency: str
+        Currency of values
+    :param max_workers: int
+        Max number of processes (if None, one per CPU)
+    :return: [] of str
+        Paths to chart files. Each chart is a task of a pool of processes,
+        so that charts of all wallets are rendered in parallel.
+    """
+
+    if file_format not in CHARTS_FORMATS:
+        raise ValueError(
+            "Format", file_format, "not supported. Choose one of",
+            CHARTS_FORMATS
+        )
+
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        tasks = {}
+        for exchange in exchanges:
+            name = exchange.exchange_name
+            wallets = list(exchange.build_wallets().values())
+            output_files = {
+                chart: get_chart_file(output_folder, name, chart, file_format)
+                for chart in ("balances", "crypto_fiat")
+            }
+            tasks[executor.submit(
+                render_portfolio_charts, wallets, output_files, base_currency
+            )] = name
+
+            for wallet in wallets:
+                if not wallet.get_delta_by_transaction():
+                    continue
+
+                output_file = get_chart_file(
+                    output_folder, name,
+                    "buy_sells-" + str(wallet.base_currency), file_format
+                )
+                tasks[executor.submit(
+                    render_wallet_buy_sells, wallet, output_file,
+                    base_currency
+                )] = name + " " + str(wallet.base_currency)
+
+        output_files = []
+        for task, chart in tasks.items():
+            try:
+                result = task.result()
+                output_files += result if isinstance(result, list) \
+                    else [result]
+            except Exception as e:
+                print("Cannot render charts of", chart, "due to", e)
+        return output_files
@@ -0,0 +1,120 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Downsample dense series before plotting them """
+
+import numpy as np
+
+from pyhodl.utils import datetimes_to_unix_timestamps
+
+
+def get_lttb_indexes(x, y, threshold):
+    """
+    :param x: numpy array
+        Sorted X values
+    :param y: numpy array
+        Y values (NaN if missing)
+    :param threshold: int
+        Max number of points to keep
+    :return: numpy array
+        Indexes of points kept by the Largest-Triangle-Three-Buckets
+        algorithm: first and last point, plus the point of each bucket that
+        makes the largest triangle with the point kept in the previous
+        bucket and the average of the next bucket
+    """
+
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.where(np.isfinite(y), y, 0.0)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.zeros(threshold, dtype=np.int64)
+    kept[-1] = n - 1
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        a = kept[i]
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        kept[i + 1] = start + int(np.argmax(areas))
+    return kept
+
+
+def get_min_max_indexes(y, buckets):
+    """
+    :param y: numpy array
+        Y values (NaN if missing)
+    :param buckets: int
+        Number of buckets
+    :return: numpy array
+        Sorted indexes of min and max point of each bucket (plus first and
+        last point), so that spikes are never lost
+    """
+
+    n = len(y)
+    if 2 * buckets + 2 >= n or buckets < 1:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    size = int(np.max(np.diff(edges)))
+    padded = np.full((buckets, size), np.nan)
+    positions = np.arange(n) - np.repeat(edges[:-1], np.diff(edges))
+    padded[np.repeat(np.arange(buckets), np.diff(edges)), positions] = y
+
+    found = np.isfinite(padded)
+    lows = np.argmin(np.where(found, padded, np.inf), axis=1)
+    highs = np.argmax(np.where(found, padded, -np.inf), axis=1)
+    return np.unique(np.concatenate((
+        [0, n - 1], edges[:-1] + lows, edges[:-1] + highs
+    )))
+
+
+def downsample(dates, values, max_points, method="lttb"):
+    """
+    :param dates: [] of datetime
+        Sorted dates of series
+    :param values: [] of float
+        Values of series
+    :param max_points: int
+        Max number of points to keep (e.g width of plot in pixels)
+    :param method: str
+        "lttb" (keeps shape of series) or "min_max" (keeps spikes)
+    :return: tuple ([] of datetime, [] of float)
+        Dates and values kept
+    """
+
+    if len(dates) <= max_points:
+        return dates, values
+
+    values = np.asarray(values, dtype=np.float64)
+    if method == "min_max":
+        indexes = get_min_max_indexes(values, max_points // 2 - 1)
+    else:
+        x = datetimes_to_unix_timestamps(dates)
+        indexes = get_lttb_indexes(x, values, max_points)
+
+    return [dates[i] for i in indexes], values[indexes]
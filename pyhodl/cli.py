@@ -22,22 +22,39 @@ import optparse
 import os
 import time
 import traceback
-from datetime import timedelta
+from datetime import datetime, timedelta
 from enum import Enum
 
 from hal.files.save_as import write_dicts_to_json
+from hal.streams.pretty_table import pretty_format_table
 from hal.streams.user import UserInput
 
+from pyhodl.apis import aio
 from pyhodl.apis.exchanges import API_CONFIG
 from pyhodl.apis.prices import get_market_cap, get_prices
-from pyhodl.charts.balances import FiatPlotter
+from pyhodl.charts.balances import FiatPlotter, HistoryPlotter
+from pyhodl.charts.batch import CHARTS_FORMATS, render_charts
 from pyhodl.config import DATA_FOLDER, HISTORICAL_DATA_FOLDER
-from pyhodl.data.balance import get_balance_file
-from pyhodl.data.parsers import build_parser, build_exchanges
-from pyhodl.models.exchanges import Portfolio
+from pyhodl.data.balance import BALANCES_ROLLUPS, BalancesSeries, \
+    get_balances_series
+from pyhodl.data.core import CryptoParser
+from pyhodl.data.export import EXPORT_FOLDER, EXPORT_FORMATS, Exporter
+from pyhodl.data.filters import TransactionsFilter
+from pyhodl.data.parsers import build_parser, build_parsers, \
+    build_exchanges, get_files
+from pyhodl.data.rejects import REJECTS, REJECTS_FILE
+from pyhodl.data.store import SqliteStore
+from pyhodl.data.tables import get_coin_prices_table, \
+    reload_coin_prices_table
+from pyhodl.metrics import METRICS, profile
+from pyhodl.models.exchanges import Portfolio, ExchangesPortfolio
+from pyhodl.server.core import DEFAULT_PORT, serve
+from pyhodl.stats.analytics import PortfolioAnalytics
+from pyhodl.stats.profits import CostBasisMethod, get_profits
 from pyhodl.stats.transactions import get_transactions_dates, \
     get_all_exchanges, get_all_coins
 from pyhodl.updater.core import Updater
+from pyhodl.utils import UTC, unix_timestamps_to_datetimes
 
 
 class RunMode(Enum):
@@ -47,12 +64,17 @@ class RunMode(Enum):
     STATS = "stats"
     DOWNLOAD_HISTORICAL = "download"
     UPDATER = "update"
+    SERVER = "server"
+    EXPORT = "export"
 
 
 DEFAULT_PATHS = {
+    RunMode.PLOTTER: DATA_FOLDER,
     RunMode.STATS: DATA_FOLDER,
     RunMode.DOWNLOAD_HISTORICAL: HISTORICAL_DATA_FOLDER,
-    RunMode.UPDATER: API_CONFIG
+    RunMode.UPDATER: API_CONFIG,
+    RunMode.SERVER: DATA_FOLDER,
+    RunMode.EXPORT: DATA_FOLDER
 }
 
 
@@ -93,6 +115,14 @@ def create_args():
         default=False
     )
 
+    parser.add_option(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        default=False,
+        help="Make requests concurrently on an event loop (needs aiohttp)"
+    )
+
     # extra options
     parser.add_option(
         "-v",
@@ -103,9 +133,137 @@ def create_args():
         help="Increase verbosity"
     )
 
+    parser.add_option(
+        "--cost-basis",
+        dest="cost_basis",
+        help="Show profits of wallets matching lots with this method",
+        choices=[x.value for x in CostBasisMethod]
+    )
+
+    parser.add_option(
+        "--analytics",
+        dest="analytics",
+        help="Show returns, volatility, drawdown and correlations of "
+             "portfolio sampled with this resolution",
+        choices=list(BALANCES_ROLLUPS.keys())
+    )
+
+    parser.add_option(
+        "--charts-folder",
+        dest="charts_folder",
+        help="Save charts of all wallets to this folder instead of showing "
+             "them (with -m plotter)",
+        type=str
+    )
+
+    parser.add_option(
+        "--charts-format",
+        dest="charts_format",
+        help="Format of saved charts",
+        choices=CHARTS_FORMATS,
+        default="png"
+    )
+
+    parser.add_option(
+        "--since",
+        dest="since",
+        help="Load just transactions since this day (YYYY-MM-DD)",
+        type=str
+    )
+
+    parser.add_option(
+        "--until",
+        dest="until",
+        help="Load just transactions until this day, included (YYYY-MM-DD)",
+        type=str
+    )
+
+    parser.add_option(
+        "--coins",
+        dest="coins",
+        help="Load just transactions buying, selling or paying fees with "
+             "these coins (comma-separated, e.g BTC,ETH)",
+        type=str
+    )
+
+    parser.add_option(
+        "--store",
+        dest="store",
+        help="Also save transactions, prices and balances to this SQLite "
+             "file and read them from there (with -m stats)",
+        type=str
+    )
+
+    parser.add_option(
+        "--export-folder",
+        dest="export_folder",
+        help="Export transactions and prices as columnar files to this "
+             "folder (with -m export, or -m update after each update)",
+        type=str
+    )
+
+    parser.add_option(
+        "--export-format",
+        dest="export_format",
+        help="Format of exported files",
+        choices=EXPORT_FORMATS,
+        default="parquet"
+    )
+
+    parser.add_option(
+        "--parse-workers",
+        dest="parse_workers",
+        help="Parse big files in chunks with this number of processes",
+        type=int,
+        default=1
+    )
+
+    parser.add_option(
+        "--port",
+        dest="port",
+        help="Port where to answer queries (with -m server)",
+        type=int,
+        default=DEFAULT_PORT
+    )
+
+    # profiling options
+    parser.add_option(
+        "--timings",
+        dest="timings",
+        action="store_true",
+        default=False,
+        help="Show time spent in each stage (parsing, wallets, prices ...)"
+    )
+
+    parser.add_option(
+        "--profile",
+        dest="profile",
+        help="Profile run and save stats (pstats format) to this file",
+        type=str
+    )
+
     return parser
 
 
+def parse_day(raw, end_of_day=False):
+    """
+    :param raw: str
+        Day (YYYY-MM-DD)
+    :param end_of_day: bool
+        True iff date should be the last moment of day
+    :return: datetime
+        UTC date (None if no day)
+    """
+
+    if not raw:
+        return None
+
+    date = datetime.strptime(raw, "%Y-%m-%d").replace(tzinfo=UTC)
+    if end_of_day:
+        date += timedelta(days=1, microseconds=-1)
+    return date
+
+
 def parse_args(parser):
     """
     :param parser: ArgumentParser
@@ -119,7 +277,24 @@ def parse_args(parser):
         "run": RunMode(args["mode"]),
         "verbose": args["verbose"],
         "tor": args["tor"],
-        "path": args["path"]
+        "use_async": args["use_async"],
+        "path": args["path"],
+        "cost_basis": args["cost_basis"],
+        "analytics": args["analytics"],
+        "charts_folder": args["charts_folder"],
+        "charts_format": args["charts_format"],
+        "store": args["store"],
+        "export_folder": args["export_folder"],
+        "export_format": args["export_format"],
+        "parse_workers": args["parse_workers"],
+        "filters": TransactionsFilter(
+            parse_day(args["since"]),
+            parse_day(args["until"], end_of_day=True),
+            args["coins"].split(",") if args["coins"] else None
+        ),
+        "port": args["port"],
+        "timings": args["timings"],
+        "profile": args["profile"]
     }
 
     if options["path"] is None and options["run"] in DEFAULT_PATHS:
@@ -132,42 +307,181 @@ def parse_args(parser):
     return options
 
 
-def update(config_file, verbose):
-    driver = Updater(config_file, verbose)
+def update(config_file, verbose, store_file=None, exporter=None,
+           use_async=False):
+    driver = Updater(config_file, verbose, store_file, exporter, use_async)
     driver.run()
 
 
-def plot(input_file, verbose):
+def plot_history(input_folder, verbose, exchange_name="total"):
+    if verbose:
+        print("Getting past balances from", input_folder)
+
+    series = BalancesSeries(exchange_name, input_folder)
+    plotter = HistoryPlotter(series)
+    plotter.plot_total_value()
+    plotter.show("Past balances of " + exchange_name)
+
+
+def load_exchanges(input_path, filters=None):
+    """
+    :param input_path: str
+        File or folder with transactions
+    :param filters: TransactionsFilter
+        Transactions to keep (if None, all)
+    :return: [] of CryptoExchange
+        Exchanges with their transactions
+    """
+
+    if os.path.isfile(input_path):
+        return [build_parser(input_path, filters=filters).build_exchange()]
+
+    return list(build_exchanges(input_path, filters))
+
+
+def plot(input_file, verbose, filters=None):
+    if os.path.isdir(input_file):
+        plot_history(input_file, verbose)
+        return
+
     if verbose:
         print("Getting balances from", input_file)
 
-    parser = build_parser(input_file)
-    exchange = parser.build_exchange()
+    exchange = load_exchanges(input_file, filters)[0]
     wallets = exchange.build_wallets().values()
     plotter = FiatPlotter(wallets)
     plotter.plot_crypto_fiat_balance()
     plotter.show("Balances from " + input_file)
 
 
-def show_exchange_balance(exchange):
+def save_charts(input_path, output_folder, file_format, verbose,
+                filters=None):
+    exchanges = load_exchanges(input_path, filters)
+    output_files = render_charts(exchanges, output_folder, file_format)
+    if verbose:
+        print("Saved", len(output_files), "charts to", output_folder)
+
+
+def show_profits(wallets, method):
+    profits = get_profits(wallets, method=CostBasisMethod(method))
+    table = [
+        [
+            str(profit["symbol"]),
+            str(profit["balance"]),
+            str(profit["cost"]) + " $",
+            str(profit["value"]) + " $",
+            str(profit["realized"]) + " $",
+            str(profit["unrealized"]) + " $",
+            str(profit["roi"]) + " %",
+            str(profit["unpriced"])
+        ] for profit in sorted(
+            profits, key=lambda x: x["realized"] + x["unrealized"],
+            reverse=True
+        )
+    ]
+    print("Profits (" + method + " cost basis; transactions without a "
+          "known price, counted as unpriced, are left out):")
+    print(pretty_format_table(
+        [
+            "symbol", "balance", "$ cost", "$ value", "$ realized",
+            "$ unrealized", "% ROI", "unpriced"
+        ], table
+    ))
+
+
+def show_analytics(exchanges, resolution):
+    summary = PortfolioAnalytics(exchanges, resolution=resolution) \
+        .get_summary()
+    if not summary:
+        print("No transactions or prices to analyze")
+        return
+
+    since, until = unix_timestamps_to_datetimes(
+        [summary["since"], summary["until"]]
+    )
+    print("Portfolio", resolution, "analytics from",
+          since.strftime("%Y-%m-%d %H:%M"), "to",
+          until.strftime("%Y-%m-%d %H:%M"))
+    print("Current value ~", summary["value"], "$")
+    print("Cumulative return:", 100.0 * summary["return"], "%")
+    print("Mean", resolution, "return:", 100.0 * summary["mean return"], "%")
+    print("Annualized volatility (last 30 days):",
+          100.0 * summary["volatility"], "%")
+    print("Max drawdown:", 100.0 * summary["max drawdown"], "%")
+    if summary["peak"] is not None:
+        peak, trough = unix_timestamps_to_datetimes(
+            [summary["peak"], summary["trough"]]
+        )
+        print("  from", peak.strftime("%Y-%m-%d"),
+              "to", trough.strftime("%Y-%m-%d"))
+
+    coins, correlations = summary["coins"], summary["correlations"]
+    if coins:
+        print("\nCorrelations of", resolution, "returns:")
+        print(pretty_format_table(
+            ["symbol"] + [str(coin) for coin in coins],
+            [
+                [str(coin)] + ["%.2f" % value for value in row]
+                for coin, row in zip(coins, correlations)
+            ]
+        ))
+
+
+def show_exchange_balance(exchange, cost_basis=None, save=True):
+    if not save:
+        print("Balance of filtered transactions (not saved)")
     print("\nExchange:", exchange.exchange_name.title())
 
     wallets = exchange.build_wallets()
     portfolio = Portfolio(wallets.values())
-    last_balance = get_balance_file(exchange.exchange_name)
-    save_to = last_balance
-    return portfolio.show_balance(last_balance, save_to)
-
+    series = get_balances_series(exchange.exchange_name) if save else None
+    total_value = portfolio.show_balance(series)
+    if cost_basis:
+        show_profits(wallets.values(), cost_basis)
+
+    return total_value
+
+
+def show_exchanges_balance(exchanges, cost_basis=None, store=None,
+                           save=True):
+    if not save:
+        print("Balances of filtered transactions (not saved)")
+    exchanges = ExchangesPortfolio(exchanges)
+    balances, total_balances = exchanges.get_current_balances()
+    for exchange_name, portfolio in exchanges.portfolios.items():
+        print("\nExchange:", exchange_name.title())
+
+        series = get_balances_series(exchange_name) if save else None
+        portfolio.show_balance(series, balances[exchange_name])
+        if cost_basis:
+            show_profits(portfolio.wallets, cost_basis)
+
+    if store and save:
+        now = datetime.now(UTC)
+        for exchange_name, exchange_balances in balances.items():
+            store.add_balances(exchange_name, exchange_balances, now)
+        store.add_balances(
+            exchanges.total.portfolio_name, total_balances, now
+        )
 
-def show_folder_balance(input_folder):
-    exchanges = build_exchanges(input_folder)
-    total_value = 0.0
-    for exchange in exchanges:
-        exchange_value = show_exchange_balance(exchange)
-        total_value += exchange_value
+    print("\nAll exchanges")
+    series = get_balances_series(exchanges.total.portfolio_name) \
+        if save else None
+    total_value = exchanges.total.show_balance(series, total_balances)
     print("\nTotal value of all exchanges ~", total_value, "$")
 
 
+def export(input_path, exporter, verbose):
+    parsers = [build_parser(input_path)] \
+        if os.path.isfile(input_path) else build_parsers(input_path)
+    output_files = [exporter.export_parser(parser) for parser in parsers]
+    output_files.append(exporter.export_prices(get_coin_prices_table()))
+    output_files = [doc for doc in output_files if doc]
+    if verbose:
+        print("Exported", len(output_files), "new files to",
+              exporter.output_folder)
+
+
 def download_market_cap(since, until, where_to, verbose):
     if verbose:
         print("Getting market cap since", since, "until", until)
@@ -175,43 +489,138 @@ def download_market_cap(since, until, where_to, verbose):
     output_file = os.path.join(where_to, "market_cap.json")
     data = get_market_cap(since, until)
     if data:
-        write_dicts_to_json(data, output_file)
+        with METRICS.span("write"):
+            write_dicts_to_json(data, output_file)
 
     if verbose:
         print("Saved market cap data to", output_file)
 
 
+def store_new_files(store, input_path):
+    """
+    :param store: SqliteStore
+        Store of transactions
+    :param input_path: str
+        File or folder with transactions
+    :return: int
+        Number of transactions added (negative if more were removed). Just
+        files changed since last time are parsed, and transactions of files
+        deleted are removed.
+    """
+
+    folder = os.path.abspath(input_path)
+    for stored_file in store.get_files_stored():
+        if not os.path.exists(stored_file) and \
+                os.path.commonpath([stored_file, folder]) == folder:
+            store.remove_file(stored_file)
+
+    added = 0
+    for input_file in get_files(input_path):
+        if store.is_file_stored(input_file):
+            continue
+
+        try:
+            exchange = build_parser(input_file).build_exchange()
+        except:
+            exchange = None  # not a transactions file (until it changes)
+
+        if exchange is not None:
+            added += store.add_transactions(
+                exchange.exchange_name, exchange.transactions, input_file
+            )
+        store.set_file_stored(input_file)
+    return added
+
+
+def show_store_stats(store, input_path, cost_basis=None, analytics=None,
+                     filters=None):
+    with METRICS.span("store"):
+        store_new_files(store, input_path)
+        exchanges = store.get_exchanges(filters)
+        prices = store.get_prices("USD")
+        if prices:
+            reload_coin_prices_table("USD", prices)
+
+    if analytics:
+        show_analytics(exchanges, analytics)
+    else:
+        show_exchanges_balance(
+            exchanges, cost_basis, store, filters is None or filters.is_empty()
+        )
+
+
 def download_prices(coins, since, until, where_to, verbose, currency="USD",
-                    tor=False):
+                    tor=False, store=None, use_async=False):
     if verbose:
         print("Getting historical prices for", len(coins), "coins")
 
     output_file = os.path.join(where_to, currency.lower() + ".json")
     extra_time = timedelta(hours=6)
-    data = get_prices(
-        coins, currency, since - extra_time, until + extra_time, tor
-    )
+    if use_async:
+        if tor:
+            raise ValueError("Cannot make async requests via tor", tor)
+
+        data = aio.get_prices(
+            coins, currency, since - extra_time, until + extra_time
+        )
+    else:
+        data = get_prices(
+            coins, currency, since - extra_time, until + extra_time, tor
+        )
     if data:
-        write_dicts_to_json(data, output_file)
+        with METRICS.span("write"):
+            write_dicts_to_json(data, output_file)
+        if store:
+            with METRICS.span("store"):
+                store.add_prices(currency, data)
 
     if verbose:
         print("Saved historical prices to", output_file)
 
 
-def main():
-    args = parse_args(create_args())
-    run_mode, run_path, tor, verbose = \
-        args["run"], args["path"], args["tor"], args["verbose"]
+def run(args):
+    run_mode, run_path, tor, verbose, filters = args["run"], args["path"], \
+        args["tor"], args["verbose"], args["filters"]
+    store = SqliteStore(args["store"]) \
+        if args["store"] and run_mode != RunMode.UPDATER else None
+    exporter = Exporter(
+        args["export_folder"] or EXPORT_FOLDER, args["export_format"]
+    ) if args["export_folder"] or run_mode == RunMode.EXPORT else None
 
     if run_mode == RunMode.UPDATER:
-        update(run_path, verbose)
+        update(run_path, verbose, args["store"], exporter, args["use_async"])
+    elif run_mode == RunMode.EXPORT:
+        export(run_path, exporter, verbose)
+    elif run_mode == RunMode.SERVER:
+        serve(run_path, port=args["port"], verbose=verbose)
     elif run_mode == RunMode.PLOTTER:
-        plot(run_path, verbose)
+        if args["charts_folder"]:
+            save_charts(
+                run_path, args["charts_folder"], args["charts_format"],
+                verbose, filters
+            )
+        else:
+            plot(run_path, verbose, filters)
     elif run_mode == RunMode.STATS:
-        if os.path.isfile(run_path):
-            show_exchange_balance(run_path)
+        if store:
+            show_store_stats(
+                store, run_path, args["cost_basis"], args["analytics"],
+                filters
+            )
+        elif args["analytics"]:
+            show_analytics(
+                load_exchanges(run_path, filters), args["analytics"]
+            )
+        elif os.path.isfile(run_path):
+            show_exchange_balance(
+                load_exchanges(run_path, filters)[0], args["cost_basis"],
+                filters.is_empty()
+            )
         else:
-            show_folder_balance(run_path)
+            show_exchanges_balance(
+                load_exchanges(run_path, filters), args["cost_basis"],
+                save=filters.is_empty()
+            )
     elif run_mode == RunMode.DOWNLOAD_HISTORICAL:
         exchanges = get_all_exchanges()
         dates = get_transactions_dates(exchanges)
@@ -220,7 +629,7 @@ def main():
 
         download_prices(
             coins, first_transaction, last_transaction, run_path, verbose,
-            tor=tor
+            tor=tor, store=store, use_async=args["use_async"]
         )
         download_market_cap(
             first_transaction, last_transaction, run_path, verbose
@@ -230,6 +639,26 @@ def main():
         print("Run `pyhodl --help` to get a list of options.")
 
 
+def main():
+    args = parse_args(create_args())
+    CryptoParser.MAX_WORKERS = max(1, args["parse_workers"])
+
+    if args["profile"]:
+        with profile(args["profile"]):
+            run(args)
+        print("Saved profile stats to", args["profile"])
+    else:
+        run(args)
+
+    if REJECTS.counts:
+        print("\nTransactions that cannot be parsed (see", REJECTS_FILE + "):")
+        print(REJECTS.pretty_format())
+
+    if args["timings"]:
+        print("\nTime spent in each stage:")
+        print(METRICS.pretty_format())
+
+
 def handle_exception(e):
     """
     :return: void
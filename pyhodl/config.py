@@ -19,7 +19,7 @@
 """ App global configs and vars """
 import os
 
-from pyhodl.data.coins import Coin, CoinsNamesTable
+from pyhodl.data.coins import Coin, CoinsNamesTable, CoinsRegistry
 
 APP_NAME = "Pyhodl"
 APP_SHORT_NAME = "pyhodl"
@@ -61,3 +61,4 @@ COINS_DATABASE = os.path.join(
 FIAT_COINS = [Coin("USD"), Coin("EUR")]  # supported fiat coins
 DEFAULT_FIAT = "USD"
 CRYPTO_COINS = CoinsNamesTable(COINS_DATABASE).get_coins()
+COINS_REGISTRY = CoinsRegistry(CRYPTO_COINS, FIAT_COINS)
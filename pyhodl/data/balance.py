@@ -18,14 +18,23 @@
 
 """ Input/output balance data """
 
+import json
 import os
+from bisect import bisect
 from datetime import datetime
 
+import pytz
 from hal.files.parsers import JSONParser
 from hal.files.save_as import write_dicts_to_json
 
-from pyhodl.config import DATA_FOLDER, DATE_TIME_KEY
-from pyhodl.utils import datetime_to_str, parse_datetime, is_nan
+from pyhodl.config import DATA_FOLDER, DATE_TIME_KEY, VALUE_KEY
+from pyhodl.metrics import timed
+from pyhodl.utils import datetime_to_str, parse_datetime, is_nan, localize
+
+BALANCES_ROLLUPS = {
+    "hourly": 60 * 60,
+    "daily": 24 * 60 * 60
+}  # resolution -> seconds in between 2 consecutive snapshots
 
 
 def get_balance_file(exchange):
@@ -56,6 +65,7 @@ def parse_balance(input_file):
         return content
 
 
+@timed("write")
 def save_balance(balances, output_file, timestamp=datetime.now()):
     """
     :param balances: [] of {}
@@ -77,3 +87,206 @@ def save_balance(balances, output_file, timestamp=datetime.now()):
         data[balance["symbol"]] = balance
     data[DATE_TIME_KEY] = datetime_to_str(timestamp)
     write_dicts_to_json(data, output_file)
+
+
+class BalancesSeries:
+    """ Append-only time series of balance snapshots of an exchange. Each
+    line of the file is the unix timestamp of the snapshot followed by its
+    compact JSON data, so that only the timestamps need to be parsed to
+    index the file. """
+
+    def __init__(self, exchange, folder=DATA_FOLDER):
+        """
+        :param exchange: str
+            Exchange name
+        :param folder: str
+            Folder where to save series
+        """
+
+        self.exchange = str(exchange)
+        self.files = {
+            None: os.path.join(folder, self.exchange.title() + "Balances.tsv")
+        }  # resolution -> file
+        for resolution in BALANCES_ROLLUPS:
+            self.files[resolution] = os.path.join(
+                folder,
+                self.exchange.title() + "Balances." + resolution + ".tsv"
+            )
+
+        self.indexes = {
+            resolution: {"timestamps": [], "offsets": [], "size": 0}
+            for resolution in self.files
+        }  # resolution -> timestamps and file offsets of snapshots
+
+    def _get_index(self, resolution=None):
+        """
+        :param resolution: str or None
+            Resolution of series (None for all snapshots)
+        :return: {}
+            Index of file, updated with the snapshots appended since last
+            time (only the new bytes are read)
+        """
+
+        index = self.indexes[resolution]
+        input_file = self.files[resolution]
+        size = os.path.getsize(input_file) if os.path.exists(input_file) \
+            else 0
+        if size < index["size"]:  # file has been rewritten
+            index["timestamps"], index["offsets"], index["size"] = [], [], 0
+
+        if size > index["size"]:
+            with open(input_file, "rb") as reader:
+                reader.seek(index["size"])
+                offset = index["size"]
+                for line in reader:
+                    if not line.endswith(b"\n"):
+                        break  # still being written
+
+                    index["timestamps"].append(float(line.split(b"\t")[0]))
+                    index["offsets"].append(offset)
+                    offset += len(line)
+                index["size"] = offset
+
+        return index
+
+    def _read_snapshot(self, resolution, i):
+        """
+        :param resolution: str or None
+            Resolution of series
+        :param i: int
+            Index of snapshot
+        :return: {}
+            Balance of each coin and date of snapshot (same format as
+            parse_balance)
+        """
+
+        index = self.indexes[resolution]
+        with open(self.files[resolution], "rb") as reader:
+            reader.seek(index["offsets"][i])
+            line = reader.readline()
+
+        timestamp, raw = line.split(b"\t", 1)
+        raw = json.loads(raw.decode("utf-8"))
+        snapshot = {
+            symbol: {
+                "symbol": symbol,
+                "balance": balance,
+                "value": value
+            } for symbol, (balance, value) in raw["coins"].items()
+        }
+        snapshot[DATE_TIME_KEY] = datetime.fromtimestamp(
+            float(timestamp), pytz.utc
+        )
+        return snapshot
+
+    def _append_line(self, resolution, line):
+        with open(self.files[resolution], "ab") as writer:
+            writer.write(line)
+
+    @timed("write")
+    def append(self, balances, timestamp):
+        """
+        :param balances: [] of {}
+            List of balanced for each wallet
+        :param timestamp: datetime
+            Time of snapshot
+        :return: void
+            Appends snapshot to series and to rollups whose last snapshot is
+            in a previous time bucket
+        """
+
+        timestamp = localize(timestamp).timestamp()
+        coins = {
+            balance["symbol"]: [balance["balance"], balance["value"]]
+            for balance in balances if not is_nan(balance["value"])
+        }
+        raw = {
+            VALUE_KEY: sum(value for _, value in coins.values()),
+            "coins": coins
+        }
+        line = (
+            repr(timestamp) + "\t" + json.dumps(raw, separators=(",", ":")) +
+            "\n"
+        ).encode("utf-8")
+
+        self._append_line(None, line)
+        for resolution, seconds in BALANCES_ROLLUPS.items():
+            timestamps = self._get_index(resolution)["timestamps"]
+            if not timestamps or \
+                    timestamp // seconds > timestamps[-1] // seconds:
+                self._append_line(resolution, line)
+
+    def __len__(self):
+        return len(self._get_index()["timestamps"])
+
+    def get_last(self, resolution=None):
+        """
+        :param resolution: str or None
+            Resolution of series
+        :return: {}
+            Last snapshot (if any)
+        """
+
+        timestamps = self._get_index(resolution)["timestamps"]
+        if timestamps:
+            return self._read_snapshot(resolution, len(timestamps) - 1)
+
+    def get_snapshot_before(self, date_time, resolution=None):
+        """
+        :param date_time: datetime
+            Date and time
+        :param resolution: str or None
+            Resolution of series
+        :return: {}
+            Last snapshot taken before (or on) date (if any)
+        """
+
+        timestamps = self._get_index(resolution)["timestamps"]
+        i = bisect(timestamps, localize(date_time).timestamp())
+        if i > 0:
+            return self._read_snapshot(resolution, i - 1)
+
+    def get_total_values(self, resolution="daily"):
+        """
+        :param resolution: str or None
+            Resolution of series
+        :return: tuple ([] of datetime, [] of float)
+            Dates and total value of snapshots
+        """
+
+        dates, values = [], []
+        if os.path.exists(self.files[resolution]):
+            with open(self.files[resolution], "rb") as reader:
+                for line in reader:
+                    if not line.endswith(b"\n"):
+                        break
+
+                    timestamp, raw = line.split(b"\t", 1)
+                    dates.append(
+                        datetime.fromtimestamp(float(timestamp), pytz.utc)
+                    )
+                    values.append(json.loads(raw.decode("utf-8"))[VALUE_KEY])
+        return dates, values
+
+
+def get_balances_series(exchange):
+    """
+    :param exchange: str
+        Exchange name
+    :return: BalancesSeries
+        Series of past balances of exchange. If it is empty, the balance
+        saved by older versions (if any) is imported.
+    """
+
+    series = BalancesSeries(exchange)
+    if not len(series):
+        last = parse_balance(get_balance_file(exchange))
+        if last:
+            series.append(
+                [
+                    balance for symbol, balance in last.items()
+                    if symbol != DATE_TIME_KEY
+                ],
+                last[DATE_TIME_KEY]
+            )
+    return series
@@ -20,6 +20,8 @@
 
 from hal.files.parsers import JSONParser
 
+MAX_UNKNOWN_COINS = 1024  # coins not supported interned by registries
+
 
 class Coin:
     """ Model of a coin traded """
@@ -33,10 +35,16 @@ class Coin:
             return self.symbol == other.symbol
 
         if isinstance(other, str):  # equals with string
-            return self == Coin(other)
+            return self.symbol == other.upper()
 
         return False
 
+    def __hash__(self):
+        return hash(self.symbol)  # same as its (upper case) symbol
+
+    def __str__(self):
+        return self.symbol
+
 
 class CryptoCoin(Coin):
     """ Crypto currency model """
@@ -54,6 +62,9 @@ class CryptoCoin(Coin):
         if super().__eq__(other):
             return True
 
+        if not isinstance(other, Coin):
+            return False
+
         try_with_name = self.name == other.name
         if try_with_name:
             return True
@@ -68,6 +79,8 @@ class CryptoCoin(Coin):
 
         return False
 
+    __hash__ = Coin.__hash__
+
 
 class CoinsNamesTable(JSONParser):
     """ Loads coins database """
@@ -94,3 +107,101 @@ class CoinsNamesTable(JSONParser):
                 other_names=raw["other_names"]
             ) for raw in self.content
         ]
+
+
+class CoinsRegistry:
+    """ Indexes coins by symbol, name and other names, so that they are
+    found in O(1). Coins are interned: each symbol resolves to the same
+    Coin object (just the first MAX_UNKNOWN_COINS of the ones not
+    supported). """
+
+    def __init__(self, crypto_coins, fiat_coins):
+        """
+        :param crypto_coins: [] of CryptoCoin
+            Crypto coins supported
+        :param fiat_coins: [] of Coin
+            Fiat coins supported
+        """
+
+        self.coins = {}  # symbol -> coin
+        self.names = {}  # name (or other name) -> coin
+        self.fiat = set()  # symbols of fiat coins
+        self.unknown = {}  # symbol -> coin not supported
+
+        for coin in fiat_coins:
+            self.coins.setdefault(coin.symbol, coin)
+            self.fiat.add(coin.symbol)
+
+        for coin in crypto_coins:
+            self.coins.setdefault(coin.symbol, coin)
+            if coin.name:
+                self.names.setdefault(coin.name, coin)
+
+        for coin in crypto_coins:  # names win over other names
+            for name in coin.other_names:
+                self.names.setdefault(name, coin)
+
+    def get_by_symbol(self, symbol):
+        """
+        :param symbol: str or Coin
+            Symbol of coin
+        :return: Coin
+            Coin with symbol (None if not supported)
+        """
+
+        return self.coins.get(str(symbol).upper())
+
+    def get_by_name(self, name):
+        """
+        :param name: str
+            Name (or other name) of coin
+        :return: Coin
+            Coin with name (None if not supported)
+        """
+
+        return self.names.get(str(name).lower())
+
+    def get(self, coin):
+        """
+        :param coin: str or Coin
+            Symbol (or name) of coin
+        :return: Coin
+            Interned coin: coins not supported are added to registry the
+            first time they are seen, until MAX_UNKNOWN_COINS of them are
+            (then new ones are just built)
+        """
+
+        symbol = str(coin).upper()
+        found = self.coins.get(symbol)
+        if found is None:
+            found = self.get_by_name(coin)
+
+        if found is None:
+            found = self.unknown.get(symbol)
+
+        if found is None:
+            found = Coin(symbol)
+            if len(self.unknown) < MAX_UNKNOWN_COINS:
+                self.unknown[symbol] = found
+
+        return found
+
+    def is_fiat(self, coin):
+        """
+        :param coin: str or Coin
+            Coin to check
+        :return: bool
+            True iff coin is among fiat supported
+        """
+
+        return str(coin).upper() in self.fiat
+
+    def is_crypto(self, coin):
+        """
+        :param coin: str or Coin
+            Coin to check
+        :return: bool
+            True iff coin is not fiat
+        """
+
+        return not self.is_fiat(coin)
@@ -20,33 +20,156 @@
 
 import abc
 import ciso8601
+import heapq
 import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 
+import numpy as np
 from hal.files.parsers import JSONParser
 
+from pyhodl.data.filters import TransactionsFilter
+from pyhodl.data.rejects import REJECTS, RejectsSink, get_reason
+from pyhodl.metrics import METRICS, timed
 from pyhodl.models.exchanges import CryptoExchange
 from pyhodl.models.transactions import TransactionType, Transaction, Commission
+from pyhodl.utils import UTC, datetimes_to_unix_timestamps, \
+    unix_timestamps_to_datetimes, unix_timestamps_to_seconds
+
+PARALLEL_MIN_TRANSACTIONS = 100000  # smaller files are parsed serially
+PARALLEL_CHUNKS_PER_WORKER = 4  # so that slower chunks are balanced
+
+
+def get_transaction_row(transaction, index):
+    """
+    :param transaction: Transaction
+        Transaction parsed
+    :param index: int
+        Index of raw transaction in file
+    :return: tuple
+        Values of transaction, without raw data (cheaper to send between
+        processes than the object). Rows sort by date, then by index.
+    """
+
+    commission = transaction.commission
+    if commission:
+        commission = (
+            None if commission.raw is transaction.raw else commission.raw,
+            commission.coin, commission.amount, commission.date,
+            commission.successful
+        )
+
+    date = transaction.date
+    return (
+        date.timestamp() if date else -float("inf"), index,
+        transaction.coin_buy, transaction.buy_amount,
+        transaction.coin_sell, transaction.sell_amount, date,
+        transaction.transaction_type, transaction.successful, commission
+    )
+
+
+def build_transaction(row, raws):
+    """
+    :param row: tuple
+        Values of transaction (see get_transaction_row)
+    :param raws: [] of {}
+        Raw transactions of file
+    :return: Transaction
+        Transaction with its raw data
+    """
+
+    _, index, coin_buy, buy_amount, coin_sell, sell_amount, date, \
+        transaction_type, successful, commission = row
+    raw = raws[index]
+    if commission:
+        commission_raw, coin, amount, commission_date, commission_successful \
+            = commission
+        commission = Commission(
+            raw if commission_raw is None else commission_raw,
+            coin, amount, commission_date, commission_successful
+        )
+
+    return Transaction(
+        raw, coin_buy, buy_amount, coin_sell, sell_amount, date,
+        transaction_type, successful, commission
+    )
+
+
+def parse_chunk(parser_class, input_file, raws, offset, filters):
+    """
+    :param parser_class: class
+        Parser of file
+    :param input_file: str
+        File of transactions
+    :param raws: [] of {}
+        Chunk of raw transactions of file
+    :param offset: int
+        Index of first raw transaction of chunk in file
+    :param filters: TransactionsFilter
+        Transactions to keep
+    :return: tuple ([] of tuple, [] of tuple)
+        Rows of transactions parsed by a serial parser, sorted by date, and
+        (index, reason, error) of rejects (run in worker processes)
+    """
+
+    rejects = RejectsSink(None, 0)  # sent back to parent
+    parser = parser_class(
+        input_file, raws, max_workers=1, rejects=rejects, filters=filters
+    )
+    indexes = {id(raw): offset + i for i, raw in enumerate(raws)}
+    rows = sorted(
+        get_transaction_row(transaction, indexes[id(transaction.raw)])
+        for transaction in parser.parse_transactions_serial(raws, offset)
+    )
+    return rows, [
+        (record["index"], record["reason"], record["error"])
+        for record in rejects.records
+    ]
 
 
 class CryptoParser:
     """ Abstract parser """
 
-    def __init__(self, input_file):
+    DATE_UNIT = None  # "s" or "ms" if raw dates are unix timestamps
+    EXCHANGE_NAME = None  # name of exchange built by default
+    MAX_WORKERS = 1  # processes parsing chunks of big files (1: serially)
+
+    def __init__(self, input_file, raw_data=None, max_workers=None,
+                 rejects=None, filters=None):
         """
         :param input_file: str
             File to parse
+        :param raw_data: [] of {}
+            Data already read from file (if any)
+        :param max_workers: int
+            Number of processes parsing chunks of big files (if None,
+            MAX_WORKERS; if 1, files are always parsed serially)
+        :param rejects: RejectsSink
+            Where to collect transactions that cannot be parsed (if None,
+            the app one)
+        :param filters: TransactionsFilter
+            Transactions to keep: the others are skipped before building
+            them (if None, all)
         """
 
         self.input_file = os.path.join(input_file)  # reformat file path
         self.filename = os.path.basename(self.input_file)
+        self.raw_data = raw_data
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.rejects = REJECTS if rejects is None else rejects
+        self.filters = filters or TransactionsFilter()
 
+    @timed("read")
     def get_raw_data(self):
         """
         :return: [] of {}
             List of data from file
         """
 
+        if self.raw_data is not None:
+            return self.raw_data
+
         return JSONParser(self.input_file).get_content()
 
     @abc.abstractmethod
@@ -83,10 +206,14 @@ class CryptoParser:
         return
 
     @abc.abstractmethod
-    def get_commission(self, raw):
+    def get_commission(self, raw, transaction_type=None, date=None):
         """
         :param raw: {}
             Raw trade
+        :param transaction_type: TransactionType
+            Type of transaction (if already known)
+        :param date: datetime
+            Date of transaction (if already known)
         :return: Transaction
             Inner commission of transaction (if any). Commission values
             should always be positive floats.
@@ -95,10 +222,12 @@ class CryptoParser:
         return
 
     @abc.abstractmethod
-    def get_coins_amounts(self, raw):
+    def get_coins_amounts(self, raw, transaction_type=None):
         """
         :param raw: {}
             Raw details of transaction
+        :param transaction_type: TransactionType
+            Type of transaction (if already known)
         :return: tuple (str, float, str, float)
             Coin bought, amount bought, coin sold, amount sold
         """
@@ -106,21 +235,42 @@ class CryptoParser:
         return
 
     @abc.abstractmethod
-    def get_date(self, raw):
+    def get_date(self, raw, transaction_type=None):
         """
         :param raw: {}
             Raw details of transaction
+        :param transaction_type: TransactionType
+            Type of transaction (if already known)
         :return: datetime
             Date and time of transaction
         """
 
         return
 
+    def get_raw_date(self, raw, transaction_type):
+        """
+        :param raw: {}
+            Raw details of transaction
+        :param transaction_type: TransactionType
+            Type of transaction
+        :return: str, int or float
+            Unix timestamp (in DATE_UNIT, or seconds) of transaction. By
+            default, the one of its parsed date.
+        """
+
+        date = self.get_date(raw, transaction_type)
+        if date is None:
+            return None
+
+        return datetimes_to_unix_timestamps([date], self.DATE_UNIT or "s")[0]
+
     @abc.abstractmethod
-    def is_successful(self, raw):
+    def is_successful(self, raw, transaction_type=None):
         """
         :param raw: {}
             Raw details of transaction
+        :param transaction_type: TransactionType
+            Type of transaction (if already known)
         :return: bool
             True iff transaction has completed successfully
         """
@@ -144,58 +294,275 @@ class CryptoParser:
 
         return TransactionType.NULL
 
-    def parse_transaction(self, raw):
+    def get_transactions_types(self, raws):
+        """
+        :param raws: [] of {}
+            Raw details of transactions
+        :return: [] of TransactionType
+            Type of each transaction (None if it cannot be classified)
+        """
+
+        transaction_types = []
+        for raw in raws:
+            try:
+                transaction_types.append(self.get_transaction_type(raw))
+            except:
+                transaction_types.append(None)  # will fail while parsing
+        return transaction_types
+
+    def _get_type(self, raw, transaction_type):
+        """
+        :param raw: {}
+            Raw details of transaction
+        :param transaction_type: TransactionType or None
+            Type of transaction (if already known)
+        :return: TransactionType
+            Type of transaction (computed only if not known)
+        """
+
+        if transaction_type is None:
+            return self.get_transaction_type(raw)
+
+        return transaction_type
+
+    def get_dates(self, raws, transaction_types):
+        """
+        :param raws: [] of {}
+            Raw details of transactions
+        :param transaction_types: [] of TransactionType
+            Type of each transaction
+        :return: tuple ([] of int, [] of datetime)
+            Indexes of transactions in the date range of filters and their
+            dates (None if it cannot be parsed). Unix timestamps are
+            filtered and converted all together.
+        """
+
+        if self.DATE_UNIT:
+            timestamps = []
+            for raw, transaction_type in zip(raws, transaction_types):
+                try:
+                    timestamps.append(
+                        self.get_raw_date(raw, transaction_type)
+                    )
+                except:
+                    timestamps.append(None)
+
+            seconds = unix_timestamps_to_seconds(timestamps, self.DATE_UNIT)
+            if self.filters.has_dates():
+                indexes = np.flatnonzero(self.filters.get_dates_mask(seconds))
+                seconds = seconds[indexes]
+            else:
+                indexes = range(len(raws))
+            return indexes, unix_timestamps_to_datetimes(seconds)
+
+        dates = []
+        for raw, transaction_type in zip(raws, transaction_types):
+            try:
+                dates.append(self.get_date(raw, transaction_type))
+            except:
+                dates.append(None)
+
+        if not self.filters.has_dates():
+            return range(len(raws)), dates
+
+        indexes = np.flatnonzero(self.filters.get_dates_mask(
+            datetimes_to_unix_timestamps(dates)
+        ))
+        return indexes, [dates[i] for i in indexes]
+
+    def parse_transaction(self, raw, transaction_type=None, date=None,
+                          coins_amounts=None):
         """
         :param raw: {}
             Raw trade
+        :param transaction_type: TransactionType
+            Type of transaction (if already known)
+        :param date: datetime
+            Date of transaction (if already known)
+        :param coins_amounts: tuple (str, float, str, float)
+            Coins and amounts of transaction (if already known)
         :return: Transaction
             Parsed Transaction
         """
 
-        coin_bought, amount_bought, coin_sold, amount_sold = \
-            self.get_coins_amounts(raw)
+        transaction_type = self._get_type(raw, transaction_type)
+        if date is None:
+            date = self.get_date(raw, transaction_type)
+
+        if coins_amounts is None:
+            coins_amounts = self.get_coins_amounts(raw, transaction_type)
+        coin_bought, amount_bought, coin_sold, amount_sold = coins_amounts
 
         return Transaction(
             raw,
             coin_bought, amount_bought, coin_sold, amount_sold,
-            self.get_date(raw),
-            self.get_transaction_type(raw),
-            self.is_successful(raw),
-            self.get_commission(raw)
+            date,
+            transaction_type,
+            self.is_successful(raw, transaction_type),
+            self.get_commission(raw, transaction_type, date)
         )
 
+    def parse_transactions(self, raws):
+        """
+        :param raws: [] of {}
+            Raw transactions
+        :return: generator of Transaction
+            Parsed transactions: each one is classified just once and all
+            dates are converted together. Big lists are split in chunks
+            parsed by many processes, then merged sorted by date.
+        """
+
+        if self.max_workers > 1 and len(raws) >= PARALLEL_MIN_TRANSACTIONS:
+            try:
+                return iter(self.parse_transactions_parallel(raws))
+            except (OSError, BrokenProcessPool) as e:
+                print("Cannot parse", self.filename, "in parallel due to", e)
+
+        return self.parse_transactions_serial(raws)
+
+    def parse_transactions_parallel(self, raws):
+        """
+        :param raws: [] of {}
+            Raw transactions
+        :return: [] of Transaction
+            Parsed transactions, sorted by date. Chunks of raws are parsed by
+            a pool of processes with this same parser class.
+        """
+
+        chunks_count = self.max_workers * PARALLEL_CHUNKS_PER_WORKER
+        chunk_size = -(-len(raws) // chunks_count)  # ceil
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(
+                    parse_chunk, self.__class__, self.input_file,
+                    raws[i:i + chunk_size], i, self.filters
+                ) for i in range(0, len(raws), chunk_size)
+            ]
+            parsed, rejected = [], 0
+            for future in futures:
+                rows, rejects = future.result()
+                parsed.append(rows)
+                rejected += len(rejects)
+                for index, reason, error in rejects:
+                    self.rejects.add(
+                        self.input_file, index, raws[index], reason, error
+                    )
+        self.rejects.save()
+
+        if not self.filters.is_empty():
+            METRICS.count(
+                "transactions skipped",
+                len(raws) - rejected - sum(len(rows) for rows in parsed)
+            )
+
+        return [
+            build_transaction(row, raws) for row in heapq.merge(*parsed)
+        ]  # by date, ties in file order
+
+    def parse_transactions_serial(self, raws, offset=0):
+        """
+        :param raws: [] of {}
+            Raw transactions
+        :param offset: int
+            Index of first raw transaction in file
+        :return: generator of Transaction
+            Parsed transactions, in the same order of raws. The ones that
+            cannot be parsed go to rejects.
+        """
+
+        if self.DATE_UNIT:  # raw dates depend on type
+            transaction_types = self.get_transactions_types(raws)
+            indexes, dates = self.get_dates(raws, transaction_types)
+        else:  # just transactions in date range are classified
+            indexes, dates = self.get_dates(raws, [None] * len(raws))
+            transaction_types = [None] * len(raws)
+            kept_types = self.get_transactions_types(
+                [raws[i] for i in indexes]
+            )
+            for i, transaction_type in zip(indexes, kept_types):
+                transaction_types[i] = transaction_type
+
+        has_coins = self.filters.has_coins()
+        kept = 0
+        for i, date in zip(indexes, dates):
+            raw, transaction_type = raws[i], transaction_types[i]
+            try:
+                coins_amounts = None
+                if has_coins and transaction_type is not None:
+                    coins_amounts = self.get_coins_amounts(
+                        raw, transaction_type
+                    )
+                    if not self.filters.contains_coins(
+                            coins_amounts[0], coins_amounts[2]):
+                        commission = self.get_commission(
+                            raw, transaction_type, date
+                        )  # fees debit their coin too
+                        if commission is None or \
+                                not self.filters.contains_coins(
+                                    commission.coin):
+                            continue
+
+                kept += 1
+                yield self.parse_transaction(
+                    raw, transaction_type, date, coins_amounts
+                )
+            except Exception as e:
+                self.rejects.add(
+                    self.input_file, offset + i, raw,
+                    get_reason(transaction_type, date), e
+                )
+
+        if not self.filters.is_empty():
+            METRICS.count("transactions skipped", len(raws) - kept)
+
+        self.rejects.save()
+
+    def get_raw_transactions(self):
+        """
+        :return: [] of {}
+            Raw transactions of file
+        """
+
+        return self.get_raw_data()
+
     def get_transactions_list(self):
         """
         :return: [] of Transaction
             List of transactions of exchange
         """
 
-        raw = self.get_raw_data()
-        for transaction in raw:
-            try:
-                yield self.parse_transaction(transaction)
-            except:
-                print("Cannot parse transaction", transaction)
+        return self.parse_transactions(self.get_raw_transactions())
 
-    def build_exchange(self, exchange_name):
+    @timed("parse")
+    def build_exchange(self, exchange_name=None):
         """
         :param exchange_name: str
-            Name of exchange
+            Name of exchange (if None, the one of parser)
         :return: CryptoExchange
             List of transactions listed in a exchange
         """
 
-        return CryptoExchange(
-            list(self.get_transactions_list()),
-            exchange_name
-        )
+        exchange_name = exchange_name or self.EXCHANGE_NAME
+        transactions = list(self.get_transactions_list())
+        METRICS.count("transactions parsed", len(transactions))
+        return CryptoExchange(transactions, exchange_name)
 
 
 class BinanceParser(CryptoParser):
     """ Parses Binance transactions data """
 
-    def get_coins_amounts(self, raw):
-        if self.is_trade(raw):
+    DATE_UNIT = "ms"
+    EXCHANGE_NAME = "binance"
+    DATE_KEYS = {
+        TransactionType.TRADING: "time",
+        TransactionType.DEPOSIT: "insertTime",
+        TransactionType.WITHDRAWAL: "successTime"
+    }
+
+    def get_coins_amounts(self, raw, transaction_type=None):
+        transaction_type = self._get_type(raw, transaction_type)
+        if transaction_type == TransactionType.TRADING:
             market = raw["symbol"]
             if market.endswith("USDT"):
                 coin_buy, coin_sell = market.replace("USDT", ""), "USDT"
@@ -209,43 +576,42 @@ class BinanceParser(CryptoParser):
                 return coin_buy, amount_buy, coin_sell, amount_sell
 
             return coin_sell, amount_sell, coin_buy, amount_buy
-        elif self.is_deposit(raw):
+        elif transaction_type == TransactionType.DEPOSIT:
             return raw["asset"], float(raw["amount"]), None, 0
-        elif self.is_withdrawal(raw):
+        elif transaction_type == TransactionType.WITHDRAWAL:
             return None, 0, raw["asset"], float(raw["amount"])
 
         return None, 0, None, 0
 
-    def get_commission(self, raw):
+    def get_commission(self, raw, transaction_type=None, date=None):
         if "commissionAsset" in raw:
+            transaction_type = self._get_type(raw, transaction_type)
             return Commission(
                 raw,
                 raw["commissionAsset"],
                 float(raw["commission"]),
-                self.get_date(raw),
-                self.is_successful(raw)
+                date or self.get_date(raw, transaction_type),
+                self.is_successful(raw, transaction_type)
             )
 
-    def get_date(self, raw):
-        if self.is_trade(raw):
-            return datetime.fromtimestamp(
-                int(raw["time"]) / 1000  # ms -> s
-            )
-        elif self.is_deposit(raw):
-            return datetime.fromtimestamp(
-                int(raw["insertTime"]) / 1000  # ms -> s
-            )
-        elif self.is_withdrawal(raw):
+    def get_raw_date(self, raw, transaction_type):
+        return raw[self.DATE_KEYS[transaction_type]]
+
+    def get_date(self, raw, transaction_type=None):
+        transaction_type = self._get_type(raw, transaction_type)
+        if transaction_type in self.DATE_KEYS:
             return datetime.fromtimestamp(
-                int(raw["successTime"]) / 1000  # ms -> s
+                int(self.get_raw_date(raw, transaction_type)) / 1000,  # ms
+                UTC
             )
 
-    def is_successful(self, raw):
-        if self.is_trade(raw):
+    def is_successful(self, raw, transaction_type=None):
+        transaction_type = self._get_type(raw, transaction_type)
+        if transaction_type == TransactionType.TRADING:
             return "commission" in raw
-        elif self.is_deposit(raw):
+        elif transaction_type == TransactionType.DEPOSIT:
             return int(raw["status"]) == 1
-        elif self.is_withdrawal(raw):
+        elif transaction_type == TransactionType.WITHDRAWAL:
             return int(raw["status"]) == 6
 
         return False
@@ -259,15 +625,16 @@ class BinanceParser(CryptoParser):
     def is_withdrawal(self, raw):
         return "applyTime" in raw
 
-    def build_exchange(self, exchange_name="binance"):
-        return super(BinanceParser, self).build_exchange(exchange_name)
-
 
 class BitfinexParser(CryptoParser):
     """ Parses Binance transactions data """
 
-    def get_coins_amounts(self, raw):
-        if self.is_trade(raw):
+    DATE_UNIT = "s"
+    EXCHANGE_NAME = "bitfinex"
+
+    def get_coins_amounts(self, raw, transaction_type=None):
+        transaction_type = self._get_type(raw, transaction_type)
+        if transaction_type == TransactionType.TRADING:
             coin_buy, coin_sell = raw["symbol"][:3], raw["symbol"][3:]
             buy_amount = float(raw["amount"])
             sell_amount = buy_amount * float(raw["price"])
@@ -275,9 +642,9 @@ class BitfinexParser(CryptoParser):
                 return coin_buy, buy_amount, coin_sell, sell_amount
 
             return coin_sell, sell_amount, coin_buy, buy_amount
-        elif self.is_deposit(raw):
+        elif transaction_type == TransactionType.DEPOSIT:
             return raw["currency"], float(raw["amount"]), None, 0
-        elif self.is_withdrawal(raw):
+        elif transaction_type == TransactionType.WITHDRAWAL:
             return None, 0, raw["currency"], float(raw["amount"])
 
         return None, 0, None, 0
@@ -288,49 +655,55 @@ class BitfinexParser(CryptoParser):
     def is_withdrawal(self, raw):
         return raw["type"] == "WITHDRAWAL"
 
-    def get_commission(self, raw):
-        if self.is_trade(raw):
+    def get_commission(self, raw, transaction_type=None, date=None):
+        transaction_type = self._get_type(raw, transaction_type)
+        if transaction_type == TransactionType.TRADING:
             return Commission(
                 raw,
                 raw["fee_currency"],
                 abs(float(raw["fee_amount"])),
-                self.get_date(raw),
-                self.is_successful(raw)
+                date or self.get_date(raw, transaction_type),
+                self.is_successful(raw, transaction_type)
             )
-        elif self.is_deposit(raw) or self.is_trade(raw):
+        elif transaction_type == TransactionType.DEPOSIT:
             return Commission(
                 raw,
                 raw["currency"],
                 abs(float(raw["fee"])),
-                self.get_date(raw),
-                self.is_successful(raw)
+                date or self.get_date(raw, transaction_type),
+                self.is_successful(raw, transaction_type)
             )
 
         return None
 
-    def get_date(self, raw):
-        return datetime.fromtimestamp(int(float(raw["timestamp"])))
+    def get_raw_date(self, raw, transaction_type):
+        return raw["timestamp"]
+
+    def get_date(self, raw, transaction_type=None):
+        return datetime.fromtimestamp(float(raw["timestamp"]), UTC)
 
     def is_deposit(self, raw):
         return raw["type"] == "DEPOSIT"
 
-    def is_successful(self, raw):
-        if self.is_trade(raw):
+    def is_successful(self, raw, transaction_type=None):
+        transaction_type = self._get_type(raw, transaction_type)
+        if transaction_type == TransactionType.TRADING:
             return float(raw["fee_amount"]) <= 0
-        elif self.is_deposit(raw) or self.is_withdrawal(raw):
+        elif transaction_type in (TransactionType.DEPOSIT,
+                                  TransactionType.WITHDRAWAL):
             return raw["status"] == "COMPLETED"
 
         return False
 
-    def build_exchange(self, exchange_name="bitfinex"):
-        return super().build_exchange(exchange_name)
-
 
 class CoinbaseParser(CryptoParser):
     """ Parses Coinbase transactions data """
 
-    def get_coins_amounts(self, raw):
-        if self.is_trade(raw):
+    EXCHANGE_NAME = "coinbase"
+
+    def get_coins_amounts(self, raw, transaction_type=None):
+        transaction_type = self._get_type(raw, transaction_type)
+        if transaction_type == TransactionType.TRADING:
             coin, currency = \
                 raw["amount"]["currency"], raw["native_amount"]["currency"]
             if coin != currency:  # otherwise just a fiat log to discard
@@ -343,10 +716,10 @@ class CoinbaseParser(CryptoParser):
                        currency, abs(float(raw["native_amount"]["amount"]))
 
             return None, 0, None, 0
-        elif self.is_deposit(raw):
+        elif transaction_type == TransactionType.DEPOSIT:
             return raw["amount"]["currency"], \
                    abs(float(raw["amount"]["amount"])), None, 0
-        elif self.is_withdrawal(raw):
+        elif transaction_type == TransactionType.WITHDRAWAL:
             return None, 0, \
                    raw["amount"]["currency"], \
                    abs(float(raw["amount"]["amount"]))
@@ -361,20 +734,20 @@ class CoinbaseParser(CryptoParser):
         native_amount = float(raw["native_amount"]["amount"])
         return amount < 0 and native_amount < 0
 
-    def get_commission(self, raw):
+    def get_commission(self, raw, transaction_type=None, date=None):
         try:
             commission_data = raw["network"]
             return Commission(
                 commission_data,
                 commission_data["transaction_fee"]["currency"],
                 commission_data["transaction_fee"]["amount"],
-                self.get_date(raw),
+                date or self.get_date(raw, transaction_type),
                 commission_data["status"] == "confirmed"
             )
         except:
             return None
 
-    def get_date(self, raw):
+    def get_date(self, raw, transaction_type=None):
         return ciso8601.parse_datetime(raw["updated_at"])
 
     def is_deposit(self, raw):
@@ -382,27 +755,22 @@ class CoinbaseParser(CryptoParser):
         native_amount = float(raw["native_amount"]["amount"])
         return amount >= 0 and native_amount >= 0
 
-    def is_successful(self, raw):
+    def is_successful(self, raw, transaction_type=None):
         return raw["status"] == "completed"
 
-    def get_transactions_list(self):
-        raw = self.get_raw_data()
-        for account, transactions in raw.items():
-            for transaction in transactions:
-                try:
-                    yield self.parse_transaction(transaction)
-                except:
-                    print("Cannot parse transaction", transaction,
-                          "of account", account)
-
-    def build_exchange(self, exchange_name="coinbase"):
-        return super().build_exchange(exchange_name)
+    def get_raw_transactions(self):
+        return [
+            raw for transactions in self.get_raw_data().values()
+            for raw in transactions
+        ]  # of all accounts
 
 
 class GdaxParser(CoinbaseParser):
     """ Parses Binance transactions data """
 
-    def get_coins_amounts(self, raw):
+    EXCHANGE_NAME = "gdax"
+
+    def get_coins_amounts(self, raw, transaction_type=None):
         amount = float(raw["amount"])
         coin = raw["currency"]
 
@@ -418,18 +786,15 @@ class GdaxParser(CoinbaseParser):
         return raw["type"] == "transfer" \
                and raw["details"]["transfer_type"] == "withdraw"
 
-    def get_commission(self, raw):
+    def get_commission(self, raw, transaction_type=None, date=None):
         return None  # by default no way to check if transaction has fee or not
 
-    def get_date(self, raw):
+    def get_date(self, raw, transaction_type=None):
         return ciso8601.parse_datetime(raw["created_at"])
 
     def is_deposit(self, raw):
         return raw["type"] == "transfer" \
                and raw["details"]["transfer_type"] == "deposit"
 
-    def is_successful(self, raw):
+    def is_successful(self, raw, transaction_type=None):
         return True  # always
-
-    def build_exchange(self, exchange_name="gdax"):
-        return super().build_exchange(exchange_name)
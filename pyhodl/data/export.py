@@ -0,0 +1,406 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Export transactions and prices to columnar (Parquet/Arrow) files """
+
+import hashlib
+import json
+import os
+from collections import Counter
+from itertools import islice
+
+import numpy as np
+
+from pyhodl.config import APP_FOLDER, DATE_TIME_KEY
+from pyhodl.metrics import METRICS
+from pyhodl.utils import datetimes_to_unix_timestamps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: pip install pyarrow
+    pa, pq = None, None
+
+EXPORT_FOLDER = os.path.join(
+    APP_FOLDER,
+    "export"
+)
+EXPORT_FORMATS = ["parquet", "arrow"]
+DEFAULT_CHUNK_SIZE = 64 * 1024  # rows in memory at once
+EXPORT_STATE_FILE = "export.json"  # last date of prices exported
+EXPORTED_KEYS_FILE = "exported.keys"  # keys of transactions exported
+COLUMNS_TYPES = {
+    "exchange": "string", "type": "string", "coin_buy": "string",
+    "buy_amount": "float64", "coin_sell": "string", "sell_amount": "float64",
+    "successful": "bool", "fee_coin": "string", "fee_amount": "float64",
+    "coin": "string", "price": "float64"
+}  # same schema in all files, even if a chunk has just missing values
+
+
+def get_symbol(coin):
+    """
+    :param coin: str
+        Coin of transaction (may be missing)
+    :return: str
+        Symbol of coin (None if missing)
+    """
+
+    if coin and str(coin) != "None":
+        return str(coin)
+
+    return None
+
+
+def get_transactions_columns(exchange_name, transactions):
+    """
+    :param exchange_name: str
+        Exchange of transactions
+    :param transactions: [] of Transaction
+        Transactions to convert
+    :return: {} of str -> []
+        Values of each column of transactions (dates as unix timestamps in
+        us)
+    """
+
+    columns = {
+        "exchange": [str(exchange_name)] * len(transactions),
+        "date": np.round(
+            datetimes_to_unix_timestamps(
+                [transaction.date for transaction in transactions]
+            ) * 1e6
+        ).astype(np.int64),
+        "type": [], "coin_buy": [], "buy_amount": [], "coin_sell": [],
+        "sell_amount": [], "successful": [], "fee_coin": [], "fee_amount": []
+    }
+
+    for transaction in transactions:
+        commission = transaction.commission
+        columns["type"].append(transaction.transaction_type.name)
+        columns["coin_buy"].append(get_symbol(transaction.coin_buy))
+        columns["buy_amount"].append(float(transaction.buy_amount or 0.0))
+        columns["coin_sell"].append(get_symbol(transaction.coin_sell))
+        columns["sell_amount"].append(float(transaction.sell_amount or 0.0))
+        columns["successful"].append(bool(transaction.successful))
+        columns["fee_coin"].append(
+            get_symbol(commission.coin) if commission else None
+        )
+        columns["fee_amount"].append(
+            float(commission.amount) if commission else 0.0
+        )
+
+    return columns
+
+
+def get_transactions_keys(columns):
+    """
+    :param columns: {} of str -> []
+        Values of each column of transactions
+    :return: [] of str
+        Key of each transaction: digest of all its values (same ones as
+        Transaction.get_key), so identical fills have the same key
+    """
+
+    names = [name for name in columns if name != "exchange"]
+    return [
+        hashlib.sha1(repr(values).encode("utf-8")).hexdigest()[:20]
+        for values in zip(*[columns[name] for name in names])
+    ]
+
+
+def get_prices_columns(table, coins, start, end):
+    """
+    :param table: CoinPricesTable
+        Prices to convert
+    :param coins: [] of str
+        Coins to get
+    :param start: int
+        Index of first date of table to get
+    :param end: int
+        Index after last date of table to get
+    :return: {} of str -> numpy array
+        Date (unix timestamp in us), coin and price of each known price,
+        sorted by date. One row for each price, so all files have the
+        same columns even when new coins are listed.
+    """
+
+    dates = np.round(table.timestamps[start:end] * 1e6).astype(np.int64)
+    prices = np.column_stack(
+        [table.get_column(coin)[start:end] for coin in coins]
+    ) if coins else np.empty((end - start, 0))
+    rows, cols = np.nonzero(~np.isnan(prices))  # by date, then by coin
+    return {
+        DATE_TIME_KEY: dates[rows],
+        "coin": [coins[j] for j in cols],
+        "price": prices[rows, cols]
+    }
+
+
+def get_table_coins(table):
+    """
+    :param table: CoinPricesTable
+        Prices table
+    :return: [] of str
+        Coins with a price on any date of table, sorted
+    """
+
+    coins = set()
+    for item in table.content.values():
+        coins.update(item.keys())
+    coins.discard(DATE_TIME_KEY)
+    return sorted(coins)
+
+
+class ColumnsWriter:
+    """ Writes batches of columns to a Parquet or Arrow file, one at a time,
+    so just a batch is in memory. The file appears only when closed. """
+
+    def __init__(self, output_file, file_format="parquet"):
+        """
+        :param output_file: str
+            File to write
+        :param file_format: str
+            "parquet" or "arrow" (Arrow IPC file, memory-mappable)
+        """
+
+        if pa is None:
+            raise ValueError("Exporting needs pyarrow (pip install pyarrow)")
+
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError("Cannot export to format", file_format)
+
+        self.output_file = output_file
+        self.temp_file = output_file + ".tmp"
+        self.file_format = file_format
+        self.writer = None
+        self.rows = 0
+
+    def write(self, columns):
+        """
+        :param columns: {} of str -> []
+            Values of each column (dates as unix timestamps in us)
+        :return: void
+            Appends batch to file
+        """
+
+        arrays = []
+        for name, values in columns.items():
+            if name in ("date", DATE_TIME_KEY):
+                arrays.append(pa.array(values, pa.timestamp("us", tz="UTC")))
+            else:
+                arrays.append(pa.array(
+                    values, pa.type_for_alias(COLUMNS_TYPES[name]),
+                    from_pandas=True
+                ))  # NaN as null
+        batch = pa.RecordBatch.from_arrays(arrays, list(columns.keys()))
+
+        if self.writer is None:
+            if self.file_format == "parquet":
+                self.writer = pq.ParquetWriter(self.temp_file, batch.schema)
+            else:
+                self.writer = pa.ipc.new_file(self.temp_file, batch.schema)
+
+        if self.file_format == "parquet":
+            self.writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self):
+        """
+        :return: str
+            File written (None if no rows)
+        """
+
+        if self.writer is None:
+            return None
+
+        self.writer.close()
+        os.replace(self.temp_file, self.output_file)
+        return self.output_file
+
+
+class Exporter:
+    """ Exports transactions and prices to a folder of columnar files.
+    Each export appends a new part file with just the rows not exported yet
+    (transactions are found by key, prices by date), so it can run after
+    each update. """
+
+    def __init__(self, output_folder, file_format="parquet",
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        :param output_folder: str
+            Folder where to write files
+        :param file_format: str
+            "parquet" or "arrow"
+        :param chunk_size: int
+            Number of rows converted and written at once
+        """
+
+        self.output_folder = output_folder
+        self.file_format = file_format
+        self.chunk_size = int(chunk_size)
+        self.state_file = os.path.join(output_folder, EXPORT_STATE_FILE)
+        self.state = self._read_state()
+
+    def _read_state(self):
+        try:
+            with open(self.state_file) as reader:
+                return json.load(reader)
+        except:
+            return {}  # nothing exported yet
+
+    def _save_state(self):
+        with open(self.state_file + ".tmp", "w") as writer:
+            json.dump(self.state, writer, indent=4, sort_keys=True)
+        os.replace(self.state_file + ".tmp", self.state_file)
+
+    @staticmethod
+    def _read_keys(keys_file):
+        """
+        :param keys_file: str
+            File with a key on each line
+        :return: Counter
+            Number of times each key has been exported
+        """
+
+        if not os.path.exists(keys_file):
+            return Counter()
+
+        with open(keys_file) as reader:
+            return Counter(line.strip() for line in reader if line.strip())
+
+    def _get_part_file(self, *folders):
+        """
+        :param folders: [] of str
+            Sub-folders of output folder
+        :return: str
+            Path of next part file in folder
+        """
+
+        folder = os.path.join(self.output_folder, *folders)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        parts = [
+            doc for doc in os.listdir(folder) if doc.startswith("part-")
+            and doc.endswith("." + self.file_format)
+        ]
+        return os.path.join(
+            folder, "part-%05d.%s" % (len(parts), self.file_format)
+        )
+
+    def export_transactions(self, exchange_name, transactions):
+        """
+        :param exchange_name: str
+            Exchange of transactions
+        :param transactions: generator of Transaction
+            Transactions to export (any order). Just chunk size of them
+            are in memory at once.
+        :return: str
+            File written (None if no new transactions)
+        """
+
+        output_file = self._get_part_file("transactions", str(exchange_name))
+        keys_file = os.path.join(
+            os.path.dirname(output_file), EXPORTED_KEYS_FILE
+        )
+        exported = self._read_keys(keys_file)  # also older or same-date ones
+        writer = ColumnsWriter(output_file, self.file_format)
+
+        transactions = iter(transactions)
+        with METRICS.span("export"), open(keys_file + ".tmp", "w") as keys:
+            while True:
+                chunk = list(islice(transactions, self.chunk_size))
+                if not chunk:
+                    break
+
+                columns = get_transactions_columns(exchange_name, chunk)
+                new = []
+                for i, key in enumerate(get_transactions_keys(columns)):
+                    if exported[key] > 0:  # each copy matches one export
+                        exported[key] -= 1
+                    else:
+                        new.append(i)
+                        keys.write(key + "\n")
+
+                if len(new) < len(chunk):
+                    columns = {
+                        name: values[new]
+                        if isinstance(values, np.ndarray)
+                        else [values[i] for i in new]
+                        for name, values in columns.items()
+                    }
+                if new:
+                    writer.write(columns)
+
+            output_file = writer.close()
+
+        METRICS.count("transactions exported", writer.rows)
+        if output_file:  # keys of file just written
+            with open(keys_file + ".tmp") as reader, \
+                    open(keys_file, "a") as out:
+                for line in reader:
+                    out.write(line)
+        os.remove(keys_file + ".tmp")
+        return output_file
+
+    def export_parser(self, parser):
+        """
+        :param parser: CryptoParser
+            Parser of exchange file
+        :return: str
+            File written (None if no new transactions)
+        """
+
+        return self.export_transactions(
+            parser.EXCHANGE_NAME, parser.get_transactions_list()
+        )
+
+    def export_prices(self, table):
+        """
+        :param table: CoinPricesTable
+            Prices to export
+        :return: str
+            File written (None if no new dates)
+        """
+
+        key = "prices/" + table.base_currency
+        last = self.state.get(key)  # unix timestamp (us)
+        start = 0
+        if last is not None:  # dates are sorted
+            start = int(np.searchsorted(
+                table.timestamps, last / 1e6, side="right"
+            ))
+
+        coins = get_table_coins(table)
+        writer = ColumnsWriter(
+            self._get_part_file("prices", table.base_currency.lower()),
+            self.file_format
+        )
+        with METRICS.span("export"):
+            for i in range(start, len(table.dates), self.chunk_size):
+                columns = get_prices_columns(
+                    table, coins, i, min(i + self.chunk_size, len(table.dates))
+                )
+                if len(columns[DATE_TIME_KEY]):
+                    writer.write(columns)
+            output_file = writer.close()
+
+        if output_file:
+            self.state[key] = int(round(table.timestamps[-1] * 1e6))
+            self._save_state()
+        return output_file
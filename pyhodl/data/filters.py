@@ -0,0 +1,85 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Date range and coins of transactions to load, checked while parsing """
+
+import numpy as np
+
+from pyhodl.utils import datetimes_to_unix_timestamps
+
+
+class TransactionsFilter:
+    """ Transactions in a date range and moving some coins. Parsers check
+    it on raw data, before building transactions. """
+
+    def __init__(self, since=None, until=None, coins=None):
+        """
+        :param since: datetime
+            Keep transactions since this date (UTC if naive; if None, since
+            first)
+        :param until: datetime
+            Keep transactions until this date (UTC if naive; if None, until
+            last)
+        :param coins: [] of str
+            Keep transactions buying, selling or paying fees with any of
+            these coins (if None, all)
+        """
+
+        self.since, self.until = datetimes_to_unix_timestamps(
+            [since, until]
+        ).tolist()  # unix timestamps (s), NaN if unbounded
+        self.coins = {str(coin).upper() for coin in coins} if coins else None
+
+    def has_dates(self):
+        return not (np.isnan(self.since) and np.isnan(self.until))
+
+    def has_coins(self):
+        return self.coins is not None
+
+    def is_empty(self):
+        return not self.has_dates() and not self.has_coins()
+
+    def get_dates_mask(self, timestamps):
+        """
+        :param timestamps: numpy array
+            Unix timestamps (s) of transactions (NaN if missing)
+        :return: numpy array
+            True iff timestamp is in range (or missing, so that transaction
+            is rejected as usual)
+        """
+
+        mask = np.isnan(timestamps)
+        in_range = np.ones(len(timestamps), dtype=bool)
+        with np.errstate(invalid="ignore"):  # NaN timestamps
+            if not np.isnan(self.since):
+                in_range &= timestamps >= self.since
+            if not np.isnan(self.until):
+                in_range &= timestamps <= self.until
+        return mask | in_range
+
+    def contains_coins(self, *coins):
+        """
+        :param coins: [] of str
+            Coins bought, sold and paid as fee (None if nothing)
+        :return: bool
+            True iff any coin is one of the coins to keep
+        """
+
+        if self.coins is None:
+            return True
+
+        return any(str(coin).upper() in self.coins for coin in coins)
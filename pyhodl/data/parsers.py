@@ -18,16 +18,23 @@
 
 """ Parse raw data """
 
+import os
+
 from hal.files.models.system import ls_recurse, is_file
 
 from .core import CryptoParser, BinanceParser, BitfinexParser, CoinbaseParser, \
     GdaxParser
 
 
-def build_parser(input_file):
+def build_parser(input_file, max_workers=None, filters=None):
     """
     :param input_file: str
         File to parse
+    :param max_workers: int
+        Number of processes parsing chunks of big files (if None, the
+        default of parsers)
+    :param filters: TransactionsFilter
+        Transactions to keep (if None, all)
     :return: CryptoExchange
         Builds exchange model based on transactions
     """
@@ -40,47 +47,71 @@ def build_parser(input_file):
             if raw_lst:
                 raw_dict = raw_lst[0]
                 if "instant_exchange" in raw_dict:
-                    return CoinbaseParser(input_file)
+                    return CoinbaseParser(
+                        input_file, raw_data, max_workers, filters=filters
+                    )
                 elif "currency" in raw_dict:
-                    return GdaxParser(input_file)
+                    return GdaxParser(
+                        input_file, raw_data, max_workers, filters=filters
+                    )
     else:  # list
         raw_item = raw_data[0]
         if "timestamp" in raw_item:
-            return BitfinexParser(input_file)
+            return BitfinexParser(
+                input_file, raw_data, max_workers, filters=filters
+            )
         elif "txId" in raw_item or "isBuyer" in raw_item:
-            return BinanceParser(input_file)
+            return BinanceParser(
+                input_file, raw_data, max_workers, filters=filters
+            )
 
     raise ValueError("Cannot identify parser for file", input_file)
 
 
-def build_parsers(input_folder):
+def get_files(input_path):
+    """
+    :param input_path: str
+        File or folder with transactions
+    :return: [] of str
+        Files in path (itself, if it is a file)
+    """
+
+    if os.path.isfile(input_path):
+        return [input_path]
+
+    return [
+        doc for doc in ls_recurse(input_path) if is_file(doc)
+    ]
+
+
+def build_parsers(input_folder, filters=None):
     """
     :param input_folder: str
         Path to folder where to look for transactions files
+    :param filters: TransactionsFilter
+        Transactions to keep (if None, all)
     :return: [] of Parsers
         Parsers found for each file
     """
 
-    files = [
-        doc for doc in ls_recurse(input_folder) if is_file(doc)
-    ]
-
-    for input_file in files:
+    for input_file in get_files(input_folder):
         try:
-            yield build_parser(input_file)
+            yield build_parser(input_file, filters=filters)
         except:
             pass
 
 
-def build_exchanges(input_folder):
+def build_exchanges(input_folder, filters=None):
     """
     :param input_folder: str
         Path to folder where to look for transactions files
+    :param filters: TransactionsFilter
+        Transactions to keep (if None, all)
     :return: [] of CryptoExchange
         Exchanges found (with transactions)
     """
 
-    parsers = build_parsers(input_folder)
+    parsers = build_parsers(input_folder, filters)
     for parser in parsers:
         yield parser.build_exchange()
 
@@ -0,0 +1,142 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Raw transactions that cannot be parsed, with the reason why """
+
+import json
+import os
+
+from hal.streams.pretty_table import pretty_format_table
+
+from pyhodl.config import APP_FOLDER
+from pyhodl.metrics import METRICS
+
+REJECTS_FILE = os.path.join(
+    APP_FOLDER,
+    "rejects.json"
+)  # rejects of last run, one JSON record per line
+MAX_PRINTS = 5  # rejects printed for each file, the others are just counted
+
+
+def get_reason(transaction_type, date):
+    """
+    :param transaction_type: TransactionType
+        Type of transaction (None if it cannot be classified)
+    :param date: datetime
+        Date of transaction (None if it cannot be parsed)
+    :return: str
+        Stage where parsing failed: "type", "date" or "values" (coins,
+        amounts, status ...)
+    """
+
+    if transaction_type is None:
+        return "type"
+    elif date is None:
+        return "date"
+
+    return "values"
+
+
+class RejectsSink:
+    """ Collects raw transactions that cannot be parsed, prints just the
+    first few of each file and saves all of them to a file """
+
+    def __init__(self, output_file=REJECTS_FILE, max_prints=MAX_PRINTS):
+        """
+        :param output_file: str
+            File where to save rejects (if None, they are just kept)
+        :param max_prints: int
+            Number of rejects printed for each file
+        """
+
+        self.output_file = output_file
+        self.max_prints = int(max_prints)
+        self.records = []  # rejects not saved yet
+        self.counts = {}  # file -> reason -> number of rejects
+        self.is_saved = False  # file is rewritten at first save
+
+    def add(self, source, index, raw, reason, error):
+        """
+        :param source: str
+            File of transaction
+        :param index: int
+            Index of raw transaction in file
+        :param raw: {}
+            Raw transaction
+        :param reason: str
+            Stage where parsing failed
+        :param error: Exception or str
+            Error raised
+        :return: void
+            Records reject (printed only if one of the first of file)
+        """
+
+        counts = self.counts.setdefault(source, {})
+        total = sum(counts.values())
+        counts[reason] = counts.get(reason, 0) + 1
+        METRICS.count("transactions rejected")
+        error = error if isinstance(error, str) else repr(error)
+        self.records.append({
+            "file": source,
+            "index": index,
+            "reason": reason,
+            "error": error,
+            "raw": raw
+        })
+
+        if total < self.max_prints:
+            print("Cannot parse transaction", index, "of", source,
+                  "(" + reason + ":", error + ")")
+        elif total == self.max_prints and self.output_file:
+            print("More transactions of", source, "cannot be parsed: see",
+                  self.output_file)
+
+    def save(self):
+        """
+        :return: void
+            Appends rejects not saved yet to file (rewritten at first save)
+        """
+
+        if not self.records:
+            return
+
+        if self.output_file:
+            folder = os.path.dirname(self.output_file)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+
+            with open(self.output_file, "a" if self.is_saved else "w") as out:
+                for record in self.records:
+                    out.write(json.dumps(record, default=str) + "\n")
+            self.is_saved = True
+            self.records = []
+
+    def pretty_format(self):
+        """
+        :return: str
+            Table with number of rejects of each file and reason
+        """
+
+        table = [
+            [os.path.basename(source), reason, str(count)]
+            for source, counts in sorted(self.counts.items())
+            for reason, count in sorted(counts.items())
+        ]
+        return pretty_format_table(["file", "reason", "rejects"], table)
+
+
+REJECTS = RejectsSink()
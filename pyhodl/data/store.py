@@ -0,0 +1,511 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Optional SQLite store of transactions, prices and balances """
+
+import json
+import math
+import os
+import sqlite3
+from collections import Counter
+
+from pyhodl.config import APP_FOLDER, DATE_TIME_KEY, DEFAULT_FIAT
+from pyhodl.models.exchanges import CryptoExchange
+from pyhodl.models.transactions import Transaction, TransactionType, \
+    Commission
+from pyhodl.utils import datetimes_to_unix_timestamps, \
+    unix_timestamps_to_datetimes, parse_datetime, is_number
+
+STORE_FILE = os.path.join(
+    APP_FOLDER,
+    "pyhodl.sqlite"
+)
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    source TEXT NOT NULL DEFAULT '',
+    exchange TEXT NOT NULL,
+    date REAL NOT NULL,
+    type TEXT NOT NULL,
+    coin_buy TEXT NOT NULL,
+    buy_amount REAL NOT NULL,
+    coin_sell TEXT NOT NULL,
+    sell_amount REAL NOT NULL,
+    successful INTEGER NOT NULL,
+    fee_coin TEXT NOT NULL,
+    fee_amount REAL NOT NULL,
+    raw TEXT,
+    multiplicity INTEGER NOT NULL DEFAULT 1
+);
+CREATE UNIQUE INDEX IF NOT EXISTS transactions_key ON transactions (
+    source, exchange, date, type, coin_buy, buy_amount, coin_sell,
+    sell_amount, successful, fee_coin, fee_amount
+);
+CREATE INDEX IF NOT EXISTS transactions_buy ON transactions (coin_buy, date);
+CREATE INDEX IF NOT EXISTS transactions_sell ON transactions (coin_sell, date);
+CREATE INDEX IF NOT EXISTS transactions_fee ON transactions (fee_coin, date);
+CREATE TABLE IF NOT EXISTS prices (
+    currency TEXT NOT NULL,
+    coin TEXT NOT NULL,
+    date REAL NOT NULL,
+    price REAL,
+    PRIMARY KEY (currency, coin, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_date ON prices (currency, date);
+CREATE TABLE IF NOT EXISTS balances (
+    exchange TEXT NOT NULL,
+    date REAL NOT NULL,
+    coin TEXT NOT NULL,
+    balance REAL,
+    value REAL,
+    PRIMARY KEY (exchange, date, coin)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    modified REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+TRANSACTIONS_COLUMNS = [
+    "source", "exchange", "date", "type", "coin_buy", "buy_amount",
+    "coin_sell", "sell_amount", "successful", "fee_coin", "fee_amount"
+]  # identify a transaction (identical fills are counted by multiplicity)
+
+
+class SqliteStore:
+    """ Indexed tables of transactions (by exchange, coin and time), prices
+    (by currency, coin and time) and balance snapshots. Transactions are
+    kept with the file they come from, and replaced all together when that
+    file is parsed again. The database is in WAL mode, so it survives
+    crashes. Identical transactions of a file (e.g. fills of the same
+    order) are kept once, with the number of times they happened. """
+
+    def __init__(self, db_file=STORE_FILE):
+        """
+        :param db_file: str
+            Path to database file (created if missing)
+        """
+
+        self.db_file = db_file
+        folder = os.path.dirname(os.path.abspath(db_file))
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")  # safe in WAL
+        self.connection.executescript(STORE_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """
+        :return: void
+            Adds columns missing in stores of older versions
+        """
+
+        columns = [
+            row[1] for row in self.connection.execute(
+                "PRAGMA table_info(transactions)"
+            )
+        ]
+        if "multiplicity" not in columns:
+            with self.connection:
+                self.connection.execute(
+                    "ALTER TABLE transactions ADD COLUMN "
+                    "multiplicity INTEGER NOT NULL DEFAULT 1"
+                )
+
+        if "source" not in columns:  # files are parsed again
+            with self.connection:
+                self.connection.execute("DELETE FROM transactions")
+                self.connection.execute("DELETE FROM files")
+                self.connection.execute("DROP INDEX transactions_key")
+                self.connection.execute(
+                    "ALTER TABLE transactions ADD COLUMN "
+                    "source TEXT NOT NULL DEFAULT ''"
+                )
+                self.connection.execute(
+                    "CREATE UNIQUE INDEX transactions_key ON transactions (" +
+                    ", ".join(TRANSACTIONS_COLUMNS) + ")"
+                )
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def _get_range_filter(column, since, until):
+        """
+        :param column: str
+            Column with unix timestamps
+        :param since: datetime
+            Start of range (None if unbounded)
+        :param until: datetime
+            End of range (None if unbounded)
+        :return: tuple ([] of str, [] of float)
+            SQL conditions and their args
+        """
+
+        conditions, args = [], []
+        for date, operator in ((since, ">="), (until, "<=")):
+            if date is not None:
+                conditions.append(column + " " + operator + " ?")
+                args.append(float(datetimes_to_unix_timestamps([date])[0]))
+        return conditions, args
+
+    def add_transactions(self, exchange_name, transactions, source):
+        """
+        :param exchange_name: str
+            Exchange of transactions
+        :param transactions: [] of Transaction
+            Transactions to add
+        :param source: str
+            File with transactions
+        :return: int
+            Number of transactions of exchange added (negative if more
+            were removed). Transactions are expected to be all the ones of
+            file: they replace the ones of file in store.
+        """
+
+        source = os.path.abspath(source)
+        transactions = list(transactions)
+        timestamps = datetimes_to_unix_timestamps([
+            transaction.date for transaction in transactions
+        ])
+        counts, raws = Counter(), {}  # key -> multiplicity, raw
+        for transaction, timestamp in zip(transactions, timestamps):
+            commission = transaction.commission
+            key = (
+                source, str(exchange_name), float(timestamp),
+                transaction.transaction_type.name,
+                transaction.coin_buy, transaction.buy_amount,
+                transaction.coin_sell, transaction.sell_amount,
+                int(transaction.successful),
+                commission.coin if commission else "",
+                commission.amount if commission else 0.0
+            )
+            counts[key] += 1
+            if key not in raws:
+                raws[key] = json.dumps(transaction.raw, default=str)
+
+        rows = [
+            key + (raws[key], multiplicity)
+            for key, multiplicity in counts.items()
+        ]
+        query = "INSERT INTO transactions (" + \
+                ", ".join(TRANSACTIONS_COLUMNS) + ", raw, multiplicity) " \
+                "VALUES (" + \
+                ", ".join("?" * (len(TRANSACTIONS_COLUMNS) + 2)) + ")"
+        with self.connection:  # one transaction
+            before = self._count_transactions(exchange_name)
+            self.connection.execute(
+                "DELETE FROM transactions WHERE source = ?", (source,)
+            )
+            self.connection.executemany(query, rows)
+            return int(self._count_transactions(exchange_name) - before)
+
+    def remove_file(self, input_file):
+        """
+        :param input_file: str
+            File with transactions (e.g deleted)
+        :return: void
+            Removes transactions of file from store
+        """
+
+        source = os.path.abspath(input_file)
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM transactions WHERE source = ?", (source,)
+            )
+            self.connection.execute(
+                "DELETE FROM files WHERE path = ?", (source,)
+            )
+
+    def get_files_stored(self):
+        """
+        :return: [] of str
+            Files whose transactions are in store
+        """
+
+        return [
+            row[0] for row in self.connection.execute(
+                "SELECT path FROM files UNION "
+                "SELECT DISTINCT source FROM transactions"
+            )
+        ]
+
+    def _count_transactions(self, exchange_name):
+        """
+        :param exchange_name: str
+            Exchange of transactions
+        :return: int
+            Number of transactions of exchange in store
+        """
+
+        return self.connection.execute(
+            "SELECT TOTAL(multiplicity) FROM transactions WHERE exchange = ?",
+            (str(exchange_name),)
+        ).fetchone()[0]
+
+    def get_transactions(self, exchange_name=None, coin=None, since=None,
+                         until=None, filters=None):
+        """
+        :param exchange_name: str
+            Get just transactions of this exchange (if None, all)
+        :param coin: str
+            Get just transactions moving this coin (if None, all)
+        :param since: datetime
+            Get transactions since this date (if None, since first)
+        :param until: datetime
+            Get transactions until this date (if None, until last)
+        :param filters: TransactionsFilter
+            Get just transactions kept by filters (if None, all)
+        :return: [] of Transaction
+            Transactions found, sorted by date
+        """
+
+        conditions, args = self._get_range_filter("date", since, until)
+        if exchange_name is not None:
+            conditions.append("exchange = ?")
+            args.append(str(exchange_name))
+        if coin is not None:
+            conditions.append("(coin_buy = ? OR coin_sell = ? OR "
+                              "fee_coin = ?)")
+            args += [str(coin)] * 3
+        if filters is not None:
+            for timestamp, operator in ((filters.since, ">="),
+                                        (filters.until, "<=")):
+                if not math.isnan(timestamp):
+                    conditions.append("date " + operator + " ?")
+                    args.append(timestamp)
+            if filters.has_coins():
+                coins = sorted(filters.coins)
+                marks = "(" + ", ".join("?" * len(coins)) + ")"
+                conditions.append(
+                    "(UPPER(coin_buy) IN " + marks + " OR UPPER(coin_sell) "
+                    "IN " + marks + " OR UPPER(fee_coin) IN " + marks + ")"
+                )
+                args += coins * 3
+
+        query = "SELECT date, type, coin_buy, buy_amount, coin_sell, " \
+                "sell_amount, successful, fee_coin, fee_amount, raw, " \
+                "multiplicity FROM transactions"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        rows = self.connection.execute(query + " ORDER BY date", args) \
+            .fetchall()
+
+        dates = unix_timestamps_to_datetimes([row[0] for row in rows])
+        transactions = []
+        for date, row in zip(dates, rows):
+            raw = json.loads(row[9]) if row[9] else {}
+            commission = Commission(
+                raw, row[7], row[8], date, bool(row[6])
+            ) if row[7] else None
+            transactions += [
+                Transaction(
+                    raw, row[2], row[3], row[4], row[5], date,
+                    trans_type=TransactionType[row[1]],
+                    successful=bool(row[6]), commission=commission
+                ) for _ in range(row[10])
+            ]
+        return transactions
+
+    def is_file_stored(self, input_file):
+        """
+        :param input_file: str
+            File with transactions
+        :return: bool
+            True iff file has not changed since its transactions were added
+        """
+
+        stat = os.stat(input_file)
+        row = self.connection.execute(
+            "SELECT modified, size FROM files WHERE path = ?",
+            (os.path.abspath(input_file),)
+        ).fetchone()
+        return row is not None and \
+            row[0] == stat.st_mtime and row[1] == stat.st_size
+
+    def set_file_stored(self, input_file):
+        """
+        :param input_file: str
+            File whose transactions have just been added
+        :return: void
+            Remembers file as it is now, to skip it until it changes
+        """
+
+        stat = os.stat(input_file)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+                (os.path.abspath(input_file), stat.st_mtime, stat.st_size)
+            )
+
+    def get_exchanges_names(self):
+        """
+        :return: [] of str
+            Exchanges with transactions in store
+        """
+
+        return [
+            row[0] for row in self.connection.execute(
+                "SELECT DISTINCT exchange FROM transactions"
+            )
+        ]
+
+    def get_exchanges(self, filters=None):
+        """
+        :param filters: TransactionsFilter
+            Get just transactions kept by filters (if None, all)
+        :return: [] of CryptoExchange
+            Exchanges with their transactions in store
+        """
+
+        return [
+            CryptoExchange(self.get_transactions(name, filters=filters), name)
+            for name in self.get_exchanges_names()
+        ]
+
+    def add_prices(self, currency, prices):
+        """
+        :param currency: str
+            Currency of prices
+        :param prices: [] of {}
+            Prices of coins on each date (same format as historical prices
+            files)
+        :return: void
+            Adds prices (or replaces the ones of same coin and date)
+        """
+
+        rows = []
+        for item in prices:
+            date = item[DATE_TIME_KEY]
+            if isinstance(date, str):
+                date = parse_datetime(date)
+            timestamp = float(datetimes_to_unix_timestamps([date])[0])
+            for coin, price in item.items():
+                if coin != DATE_TIME_KEY:
+                    price = float(price) if is_number(price) else None
+                    rows.append((currency.upper(), coin, timestamp, price))
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)", rows
+            )
+
+    def get_prices(self, currency=DEFAULT_FIAT, coins=None, since=None,
+                   until=None):
+        """
+        :param currency: str
+            Currency of prices
+        :param coins: [] of str
+            Get just prices of these coins (if None, all)
+        :param since: datetime
+            Get prices since this date (if None, since first)
+        :param until: datetime
+            Get prices until this date (if None, until last)
+        :return: [] of {}
+            Prices of coins on each date, sorted by date (same format as
+            historical prices files, but with datetime objects)
+        """
+
+        conditions, args = self._get_range_filter("date", since, until)
+        conditions.insert(0, "currency = ?")
+        args.insert(0, currency.upper())
+        if coins is not None:
+            coins = [str(coin) for coin in coins]
+            conditions.append(
+                "coin IN (" + ", ".join("?" * len(coins)) + ")"
+            )
+            args += coins
+
+        rows = self.connection.execute(
+            "SELECT date, coin, price FROM prices WHERE " +
+            " AND ".join(conditions) + " ORDER BY date", args
+        ).fetchall()
+
+        prices = {}  # date -> prices of coins
+        for timestamp, coin, price in rows:
+            if timestamp not in prices:
+                prices[timestamp] = {}
+            prices[timestamp][coin] = price
+
+        timestamps = list(prices.keys())
+        dates = unix_timestamps_to_datetimes(timestamps)
+        for date, timestamp in zip(dates, timestamps):
+            prices[timestamp][DATE_TIME_KEY] = date
+        return [prices[timestamp] for timestamp in timestamps]
+
+    def add_balances(self, exchange_name, balances, date):
+        """
+        :param exchange_name: str
+            Exchange of balances
+        :param balances: [] of {}
+            Balance and value of each coin
+        :param date: datetime
+            Date of snapshot
+        :return: void
+            Adds snapshot
+        """
+
+        timestamp = float(datetimes_to_unix_timestamps([date])[0])
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO balances VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        str(exchange_name), timestamp,
+                        str(balance["symbol"]), balance["balance"],
+                        balance["value"]
+                    ) for balance in balances
+                ]
+            )
+
+    def get_balances(self, exchange_name, since=None, until=None):
+        """
+        :param exchange_name: str
+            Exchange of balances
+        :param since: datetime
+            Get snapshots since this date (if None, since first)
+        :param until: datetime
+            Get snapshots until this date (if None, until last)
+        :return: [] of {}
+            Snapshots (balance of each coin and date), sorted by date
+        """
+
+        conditions, args = self._get_range_filter("date", since, until)
+        conditions.insert(0, "exchange = ?")
+        args.insert(0, str(exchange_name))
+        rows = self.connection.execute(
+            "SELECT date, coin, balance, value FROM balances WHERE " +
+            " AND ".join(conditions) + " ORDER BY date", args
+        ).fetchall()
+
+        snapshots = {}  # date -> snapshot
+        for timestamp, coin, balance, value in rows:
+            if timestamp not in snapshots:
+                snapshots[timestamp] = {}
+            snapshots[timestamp][coin] = {
+                "symbol": coin,
+                "balance": balance,
+                "value": value
+            }
+
+        timestamps = list(snapshots.keys())
+        dates = unix_timestamps_to_datetimes(timestamps)
+        for date, timestamp in zip(dates, timestamps):
+            snapshots[timestamp][DATE_TIME_KEY] = date
+        return [snapshots[timestamp] for timestamp in timestamps]
@@ -20,33 +20,59 @@
 
 import os
 from bisect import bisect
+from datetime import datetime
 
+import numpy as np
 from hal.files.parsers import JSONParser
 
 from pyhodl.config import HISTORICAL_DATA_FOLDER, DATE_TIME_KEY, VALUE_KEY, \
     INFINITY
-from pyhodl.utils import parse_datetime
+from pyhodl.metrics import METRICS, timed
+from pyhodl.utils import parse_datetime, datetimes_to_unix_timestamps
+
+
+def get_date(raw):
+    """
+    :param raw: str or datetime
+        Date of row
+    :return: datetime
+        Date parsed (if needed)
+    """
+
+    if isinstance(raw, datetime):
+        return raw
+
+    return parse_datetime(raw)
 
 
 class DatetimeTable(JSONParser):
     """ Get content from file and load a datetime-based database """
 
-    def __init__(self, input_file, max_error_search):
+    def __init__(self, input_file, max_error_search, content=None):
         """
         :param input_file: str
             File with database to model
         :param max_error_search: float
             When searching for date, returns nearest date found if within
             max error. Should be measured in seconds.
+        :param content: [] of {}
+            Rows of database (e.g from a store). If None, reads them from
+            file (empty if there is no file yet, e.g before the first
+            download).
         """
 
         JSONParser.__init__(self, input_file)
 
-        self.content = {
-            parse_datetime(item[DATE_TIME_KEY]): item
-            for item in self.get_content()
-        }  # date -> raw dict
+        with METRICS.span("read"):
+            if content is None:
+                content = self.get_content() \
+                    if os.path.exists(input_file) else []
+
+            self.content = {
+                get_date(item[DATE_TIME_KEY]): item for item in content
+            }  # date -> raw dict
         self.dates = sorted(self.content.keys())  # sorted list of all dates
+        self.timestamps = datetimes_to_unix_timestamps(self.dates)  # (s)
 
         self.max_error = float(max_error_search)  # seconds
 
@@ -61,9 +87,9 @@ class DatetimeTable(JSONParser):
         bisect_insert = bisect(self.dates, date_time)
         low, high = bisect_insert - 1, bisect_insert  # 2 nearest dates
         low = self.dates[low] if low >= 0 else None
-        high = self.dates[high - 1] if high <= len(self.dates) else None
+        high = self.dates[high] if high < len(self.dates) else None
         err_low = (date_time - low).total_seconds() if low else INFINITY
-        err_high = (high - date_time).total_seconds() if low else INFINITY
+        err_high = (high - date_time).total_seconds() if high else INFINITY
 
         if err_low <= err_high and err_low <= self.max_error:
             return self.content[low]
@@ -72,6 +98,64 @@ class DatetimeTable(JSONParser):
 
         return None
 
+    def get_nearest_indexes(self, dates):
+        """
+        :param dates: [] of datetime or numpy array of unix timestamps (s)
+            Dates to search
+        :return: numpy array
+            Index of nearest date in table for each date (-1 if farther
+            than max error). Same as get_values_on, but for all dates at
+            once.
+        """
+
+        if isinstance(dates, np.ndarray):
+            timestamps = dates.astype(np.float64)
+        else:
+            timestamps = datetimes_to_unix_timestamps(dates)
+
+        if not len(self.timestamps):
+            return np.full(len(timestamps), -1, dtype=np.int64)
+
+        last = len(self.timestamps) - 1
+        high = np.searchsorted(self.timestamps, timestamps, side="right")
+        low = high - 1  # 2 nearest dates
+        err_low = np.where(
+            low >= 0, timestamps - self.timestamps[np.maximum(low, 0)],
+            INFINITY
+        )
+        err_high = np.where(
+            high <= last, self.timestamps[np.minimum(high, last)] - timestamps,
+            INFINITY
+        )
+
+        nearest = np.where(err_low <= err_high, low, high)
+        errors = np.minimum(err_low, err_high)
+        nearest[~(errors <= self.max_error)] = -1  # also NaN dates
+        return nearest
+
+    def update(self, other):
+        """
+        :param other: DatetimeTable
+            Same table, loaded again (e.g after a download)
+        :return: tuple (datetime, datetime)
+            First and last date whose values have been added, removed or
+            changed (None if nothing changed). Values of other are now the
+            values of this table.
+        """
+
+        changed = [
+            date for date in set(self.content.keys()) | set(other.content)
+            if self.content.get(date) != other.content.get(date)
+        ]
+
+        self.content = other.content
+        self.dates = other.dates
+        self.timestamps = other.timestamps
+        if changed:
+            return min(changed), max(changed)
+
+        return None
+
     def get_values_between(self, since, until):
         """
         :param since: datetime
@@ -112,14 +196,75 @@ class MarketDataTable(DatetimeTable):
 class CoinPricesTable(DatetimeTable):
     """ Parse market data files """
 
-    def __init__(self, currency="USD"):
+    def __init__(self, currency="USD", content=None,
+                 input_folder=HISTORICAL_DATA_FOLDER):
+        """
+        :param currency: str
+            Currency of prices
+        :param content: [] of {}
+            Rows of table (if None, read from file)
+        :param input_folder: str
+            Folder with historical prices files
+        """
+
         DatetimeTable.__init__(
             self,
-            os.path.join(HISTORICAL_DATA_FOLDER, currency.lower() + ".json"),
-            24 * 60 * 60  # a day
+            os.path.join(input_folder, currency.lower() + ".json"),
+            24 * 60 * 60,  # a day
+            content
         )
 
         self.base_currency = currency.upper()
+        self.columns = {}  # coin -> price on each date of table
+
+    def update(self, other):
+        changed = DatetimeTable.update(self, other)
+        if changed:
+            self.columns = {}  # build them again
+        return changed
+
+    def get_column(self, coin):
+        """
+        :param coin: str
+            Coin to get
+        :return: numpy array
+            Price of coin on each date of table (NaN if missing). Columns
+            are built just once.
+        """
+
+        symbol = str(coin).upper()
+        if symbol not in self.columns:
+            column = np.full(len(self.dates), np.nan)
+            for i, date in enumerate(self.dates):
+                try:
+                    column[i] = float(self.content[date][symbol])
+                except (KeyError, TypeError, ValueError):
+                    pass
+            self.columns[symbol] = column
+
+        return self.columns[symbol]
+
+    @timed("prices")
+    def get_prices_matrix(self, coins, dates):
+        """
+        :param coins: [] of str
+            Coins to get
+        :param dates: [] of datetime or numpy array of unix timestamps (s)
+            Dates to get
+        :return: numpy array
+            Matrix (dates x coins) of prices of coins on the nearest date of
+            table, if within max error (NaN otherwise)
+        """
+
+        nearest = self.get_nearest_indexes(dates)
+        found = nearest >= 0
+        prices = np.full((len(nearest), len(coins)), np.nan)
+        for j, coin in enumerate(coins):
+            if str(coin).upper() == self.base_currency:
+                prices[:, j] = 1.0
+            else:
+                prices[found, j] = self.get_column(coin)[nearest[found]]
+        return prices
 
     def get_value_on(self, coin, date_time):
         """
@@ -142,6 +287,7 @@ class CoinPricesTable(DatetimeTable):
 
 
 COINS_PRICES_TABLE = CoinPricesTable()
+PRICES_TABLES = {"USD": COINS_PRICES_TABLE}  # currency -> table
 
 
 def get_coin_prices_table(currency="USD"):
@@ -149,10 +295,32 @@ def get_coin_prices_table(currency="USD"):
     :param currency: str
         Convert prices to this currency
     :return: CoinPricesTable
-        Database of prices
+        Database of prices (loaded just once)
+    """
+
+    currency = currency.upper()
+    if currency not in PRICES_TABLES:
+        PRICES_TABLES[currency] = CoinPricesTable(currency)
+
+    return PRICES_TABLES[currency]
+
+
+def reload_coin_prices_table(currency="USD", content=None):
     """
+    :param currency: str
+        Convert prices to this currency
+    :param content: [] of {}
+        Prices of coins on each date (e.g from a store). If None, reads them
+        from file.
+    :return: CoinPricesTable
+        Database of prices, loaded again (e.g after a download)
+    """
+
+    global COINS_PRICES_TABLE
 
+    currency = currency.upper()
+    PRICES_TABLES[currency] = CoinPricesTable(currency, content)
     if currency == "USD":
-        return COINS_PRICES_TABLE
+        COINS_PRICES_TABLE = PRICES_TABLES[currency]
 
-    return CoinPricesTable(currency)
+    return PRICES_TABLES[currency]
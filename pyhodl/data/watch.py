@@ -0,0 +1,395 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Finds out which data files changed and what changed in them """
+
+import ctypes
+import ctypes.util
+import os
+import struct
+
+from pyhodl.config import DATA_FOLDER, HISTORICAL_DATA_FOLDER
+from pyhodl.data.parsers import build_parser
+from pyhodl.data.tables import PRICES_TABLES, CoinPricesTable
+
+INOTIFY_EVENTS = {
+    "modified": 0x00000008 | 0x00000080,  # closed after write, moved in
+    "created": 0x00000100,
+    "deleted": 0x00000200 | 0x00000040  # deleted, moved out
+}
+INOTIFY_IS_FOLDER = 0x40000000
+INOTIFY_IGNORED = 0x00008000  # watch removed (e.g folder deleted)
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, length
+
+
+def get_file_stamp(input_file):
+    """
+    :param input_file: str
+        Path to file
+    :return: tuple (int, int)
+        Last modification time (ns) and size of file (None if missing)
+    """
+
+    try:
+        stats = os.stat(input_file)
+        return stats.st_mtime_ns, stats.st_size
+    except OSError:
+        return None
+
+
+class FilesWatcher:
+    """ Finds files added, modified or deleted in some folders by polling
+    their modification time and size """
+
+    def __init__(self, folders):
+        """
+        :param folders: [] of str
+            Folders to watch
+        """
+
+        self.folders = list(folders)
+        self.stamps = {
+            input_file: get_file_stamp(input_file)
+            for input_file in self._list_files()
+        }  # file -> last stamp seen
+
+    def _list_files(self):
+        """
+        :return: [] of str
+            Files in folders
+        """
+
+        files = []
+        for folder in self.folders:
+            if os.path.isdir(folder):
+                for root, _, names in os.walk(folder):
+                    files += [os.path.join(root, name) for name in names]
+        return files
+
+    def _check(self, files):
+        """
+        :param files: [] of str
+            Files that may have changed
+        :return: [] of (str, str)
+            Files that actually changed and how ("created", "modified" or
+            "deleted")
+        """
+
+        changes = []
+        for input_file in files:
+            stamp = get_file_stamp(input_file)
+            old_stamp = self.stamps.get(input_file)
+            if stamp == old_stamp:
+                continue
+
+            if stamp is None:
+                del self.stamps[input_file]
+                changes.append((input_file, "deleted"))
+            else:
+                self.stamps[input_file] = stamp
+                changes.append(
+                    (input_file, "modified" if old_stamp else "created")
+                )
+        return changes
+
+    def poll(self):
+        """
+        :return: [] of (str, str)
+            Files changed since last poll and how
+        """
+
+        files = set(self._list_files()) | set(self.stamps.keys())
+        return self._check(sorted(files))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(FilesWatcher):
+    """ Finds changed files with inotify (Linux): polling just reads the
+    events of the kernel, without listing folders """
+
+    def __init__(self, folders):
+        self.libc = ctypes.CDLL(
+            ctypes.util.find_library("c"), use_errno=True
+        )
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Cannot init inotify")
+
+        self.watches = {}  # watch descriptor -> folder
+        self.mask = 0
+        for events in INOTIFY_EVENTS.values():
+            self.mask |= events
+        self.missing = []  # folders to watch as soon as they are created
+        try:
+            for folder in folders:
+                if os.path.isdir(folder):
+                    self._add_watches(folder)
+                else:
+                    self.missing.append(folder)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+        FilesWatcher.__init__(self, folders)
+
+    def _add_watches(self, folder):
+        """
+        :param folder: str
+            Folder to watch
+        :return: [] of str
+            Files already in folder and its sub-folders (watched too)
+        """
+
+        files = []
+        for sub_folder, _, names in os.walk(folder):
+            watch = self.libc.inotify_add_watch(
+                self.fd, os.fsencode(sub_folder), self.mask
+            )
+            if watch < 0:
+                raise OSError(ctypes.get_errno(), "Cannot watch", sub_folder)
+            self.watches[watch] = sub_folder
+            files += [os.path.join(sub_folder, name) for name in names]
+        return files
+
+    def _read_events(self):
+        """
+        :return: [] of str
+            Files named by the events queued since last read (new folders
+            are watched too, and their files are returned)
+        """
+
+        files = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:  # no more events
+                return files
+
+            offset = 0
+            while offset < len(data):
+                watch, mask, _, length = INOTIFY_EVENT_HEADER.unpack_from(
+                    data, offset
+                )
+                offset += INOTIFY_EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & INOTIFY_IGNORED:
+                    folder = self.watches.pop(watch, None)
+                    if folder in self.folders:  # watched again if created
+                        self.missing.append(folder)
+                elif watch in self.watches and name:
+                    path = os.path.join(
+                        self.watches[watch], os.fsdecode(name)
+                    )
+                    if mask & INOTIFY_IS_FOLDER:
+                        if os.path.isdir(path):  # created or moved in
+                            try:
+                                files += self._add_watches(path)
+                            except OSError:  # deleted meanwhile
+                                pass
+                    else:
+                        files.append(path)
+
+    def _add_missing(self):
+        """
+        :return: [] of str
+            Files in folders to watch created since last check (now
+            watched too)
+        """
+
+        files = []
+        for folder in list(self.missing):
+            if os.path.isdir(folder):
+                try:
+                    files += self._add_watches(folder)
+                    self.missing.remove(folder)
+                except OSError:  # deleted meanwhile
+                    pass
+        return files
+
+    def poll(self):
+        files = self._read_events() + self._add_missing()
+        return self._check(sorted(set(files)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+def build_watcher(folders):
+    """
+    :param folders: [] of str
+        Folders to watch
+    :return: FilesWatcher
+        Watcher using inotify where available, polling otherwise
+    """
+
+    try:
+        return InotifyWatcher(folders)
+    except (OSError, AttributeError, TypeError):  # not Linux, no watches left
+        return FilesWatcher(folders)
+
+
+class DataWatcher:
+    """ Keeps exchanges and prices tables up to date with their files,
+    applying just what changed """
+
+    def __init__(self, data_folder=DATA_FOLDER,
+                 historical_folder=HISTORICAL_DATA_FOLDER):
+        """
+        :param data_folder: str
+            Folder with exchanges data
+        :param historical_folder: str
+            Folder with historical prices
+        """
+
+        self.data_folder = data_folder
+        self.historical_folder = historical_folder
+        self.watcher = build_watcher(
+            [data_folder, historical_folder]
+        )  # also the ones not created yet
+        self.exchanges = {}  # file -> CryptoExchange
+        for input_file in self.watcher.stamps:
+            if self._is_data_file(input_file):
+                exchange = self._parse(input_file)
+                if exchange:
+                    self.exchanges[input_file] = exchange
+
+    def _is_data_file(self, input_file):
+        folder = os.path.abspath(self.data_folder)
+        return os.path.commonpath([os.path.abspath(input_file), folder]) \
+               == folder
+
+    @staticmethod
+    def _parse(input_file):
+        """
+        :param input_file: str
+            File to parse
+        :return: CryptoExchange
+            Exchange in file (None if file is not an exchange dump)
+        """
+
+        try:
+            return build_parser(input_file).build_exchange()
+        except:
+            return None
+
+    def _update_exchange(self, input_file, event):
+        """
+        :param input_file: str
+            Exchange file
+        :param event: str
+            How file changed
+        :return: {}
+            Exchange changed and transactions added and removed (None if
+            file is not an exchange dump)
+        """
+
+        exchange = self.exchanges.get(input_file)
+        new_exchange = None
+        if event != "deleted":
+            new_exchange = self._parse(input_file)
+            if new_exchange is None:  # not a dump, or still being written
+                return None  # parsed again when it changes again
+
+        if exchange is None and new_exchange is None:
+            return None
+
+        if new_exchange is None:
+            del self.exchanges[input_file]
+            added, removed = [], exchange.transactions
+        elif exchange is None:
+            exchange = self.exchanges[input_file] = new_exchange
+            added, removed = new_exchange.transactions, []
+        else:
+            added, removed = exchange.update_transactions(
+                new_exchange.transactions
+            )
+
+        dates = [transaction.date for transaction in added + removed]
+        return {
+            "file": input_file,
+            "event": event,
+            "exchange": exchange,
+            "added": added,
+            "removed": removed,
+            "since": min(dates) if dates else None,
+            "until": max(dates) if dates else None
+        }
+
+    def _update_prices(self, input_file, event):
+        """
+        :param input_file: str
+            Historical prices file
+        :param event: str
+            How file changed
+        :return: {}
+            Table changed and dates range changed (None if table is not
+            loaded or has not changed)
+        """
+
+        currency = os.path.splitext(os.path.basename(input_file))[0].upper()
+        if currency not in PRICES_TABLES or event == "deleted":
+            return None
+
+        table = PRICES_TABLES[currency]
+        try:
+            changed = table.update(
+                CoinPricesTable(currency, input_folder=self.historical_folder)
+            )
+        except:  # still being written
+            return None
+
+        if changed:
+            return {
+                "file": input_file,
+                "event": event,
+                "table": table,
+                "since": changed[0],
+                "until": changed[1]
+            }
+
+    def poll(self):
+        """
+        :return: [] of {}
+            What changed since last poll. Exchanges changes have the
+            transactions added and removed; prices changes have the range of
+            dates changed. Exchanges and prices tables are updated in place.
+        """
+
+        changes = []
+        for input_file, event in self.watcher.poll():
+            if self._is_data_file(input_file):
+                change = self._update_exchange(input_file, event)
+            else:
+                change = self._update_prices(input_file, event)
+
+            if change:
+                changes.append(change)
+        return changes
+
+    def get_exchanges(self):
+        """
+        :return: [] of CryptoExchange
+            Exchanges in data folder
+        """
+
+        return list(self.exchanges.values())
+
+    def close(self):
+        self.watcher.close()
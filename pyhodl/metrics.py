@@ -0,0 +1,221 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Time spent and counters of app stages (parsing, wallets, prices ...) """
+
+import cProfile
+import contextvars
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from hal.streams.pretty_table import pretty_format_table
+
+
+class Metrics:
+    """ Records spans (time spent in a stage) and counters. Spans nest
+    (e.g. "read" runs within "parse"), so each stage also records its self
+    time: its time without the spans within it. Self times never count the
+    same second twice. """
+
+    def __init__(self):
+        self.spans = {}  # stage -> [calls, seconds, max seconds, self]
+        self.counters = {}  # name -> value
+        self.since = time.time()
+        self.running = contextvars.ContextVar(
+            "running", default=()
+        )  # spans running in each thread (or asyncio task)
+
+    def add_span(self, stage, seconds, self_seconds=None):
+        """
+        :param stage: str
+            Name of stage
+        :param seconds: float
+            Time spent in stage
+        :param self_seconds: float
+            Time spent in stage, but not in the spans within it (if None,
+            all time)
+        :return: void
+            Records time spent in stage
+        """
+
+        if self_seconds is None:
+            self_seconds = seconds
+
+        span = self.spans.get(stage)
+        if span is None:
+            self.spans[stage] = [1, seconds, seconds, self_seconds]
+        else:
+            span[0] += 1
+            span[1] += seconds
+            if seconds > span[2]:
+                span[2] = seconds
+            span[3] += self_seconds
+
+    @contextmanager
+    def span(self, stage):
+        """
+        :param stage: str
+            Name of stage
+        :return: context manager
+            Records time spent in the with block
+        """
+
+        outer = self.running.get()
+        current = [stage, 0.0]  # stage, seconds in nested spans
+        token = self.running.set(outer + (current,))
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start_time
+            self.running.reset(token)
+            if outer:
+                outer[-1][1] += seconds
+
+            self_seconds = max(
+                0.0, seconds - current[1]
+            )  # nested spans may overlap (e.g concurrent requests)
+            if any(span[0] == stage for span in outer):  # recursion
+                self.add_span(stage, 0.0, self_seconds)
+            else:
+                self.add_span(stage, seconds, self_seconds)
+
+    def count(self, name, value=1):
+        """
+        :param name: str
+            Name of counter
+        :param value: int or float
+            Increment
+        :return: void
+            Increments counter
+        """
+
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        """
+        :return: void
+            Forgets all spans and counters
+        """
+
+        self.spans = {}
+        self.counters = {}
+        self.since = time.time()
+
+    def get_summary(self):
+        """
+        :return: {}
+            Spans and counters recorded since last reset
+        """
+
+        return {
+            "since": self.since,
+            "until": time.time(),
+            "spans": {
+                stage: {
+                    "calls": calls,
+                    "seconds": seconds,
+                    "self_seconds": self_seconds,
+                    "max_seconds": max_seconds
+                } for stage, (calls, seconds, max_seconds, self_seconds)
+                in self.spans.items()
+            },
+            "counters": dict(self.counters)
+        }
+
+    def pretty_format(self):
+        """
+        :return: str
+            Table with time spent in each stage (with and without nested
+            stages) and counters
+        """
+
+        table = [
+            [stage, str(calls), str(seconds), str(self_seconds),
+             str(max_seconds)]
+            for stage, (calls, seconds, max_seconds, self_seconds) in sorted(
+                self.spans.items(), key=lambda x: x[1][3], reverse=True
+            )
+        ]
+        out = pretty_format_table(
+            ["stage", "calls", "seconds", "self seconds", "max seconds"],
+            table
+        )
+        if self.counters:
+            out += "\n" + pretty_format_table(
+                ["counter", "value"],
+                [[name, str(value)] for name, value in
+                 sorted(self.counters.items())]
+            )
+        return out
+
+    def save(self, output_file):
+        """
+        :param output_file: str
+            Path to file where to save metrics
+        :return: void
+            Saves summary as JSON (readers never see a half-written file)
+        """
+
+        temp_file = output_file + ".tmp"
+        with open(temp_file, "w") as writer:
+            json.dump(self.get_summary(), writer, indent=4)
+        os.replace(temp_file, output_file)
+
+
+METRICS = Metrics()  # app-wide metrics
+
+
+def timed(stage):
+    """
+    :param stage: str
+        Name of stage
+    :return: callback function
+        Decorator that records time spent in function as stage
+    """
+
+    def _timed(func):
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            with METRICS.span(stage):
+                return func(*args, **kwargs)
+
+        return _wrapper
+
+    return _timed
+
+
+@contextmanager
+def profile(output_file):
+    """
+    :param output_file: str
+        Path to file where to save profile stats (pstats format)
+    :return: context manager
+        Profiles the with block with cProfile
+    """
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(output_file)
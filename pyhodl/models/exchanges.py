@@ -18,16 +18,23 @@
 
 """ Analyze transactions in exchanges """
 
-from datetime import datetime
+from collections import Counter
+from datetime import datetime, timedelta
 
-import numpy as np
 from hal.streams.pretty_table import pretty_format_table
 
+from pyhodl.apis.prices import get_current_prices
 from pyhodl.config import DATE_TIME_KEY, VALUE_KEY, NAN, \
     DEFAULT_FIAT
-from pyhodl.data.balance import parse_balance, save_balance
-from pyhodl.models.transactions import Wallet
-from pyhodl.utils import datetime_to_str, get_delta_seconds, is_nan
+from pyhodl.models.index import TimestampsIndex, TransactionsIndex
+from pyhodl.models.ledger import Ledger, get_coins_deltas
+from pyhodl.models.valuation import PortfolioValuation, StreamingValuation
+from pyhodl.utils import datetime_to_str, get_delta_seconds, is_nan, UTC
+
+BALANCE_COMPARISONS = [
+    ("24 hours", timedelta(days=1)),
+    ("30 days", timedelta(days=30))
+]
 
 
 class CryptoExchange:
@@ -43,6 +50,8 @@ class CryptoExchange:
         if not self.transactions:
             raise ValueError("Creating exchange with no past transaction!")
         self.exchange_name = str(exchange_name)
+        self.ledger = None
+        self.index = None
 
     def get_transactions_count(self):
         """
@@ -52,17 +61,23 @@ class CryptoExchange:
 
         return len(self.transactions)
 
+    def get_index(self):
+        """
+        :return: TransactionsIndex
+            Transactions sorted by date (built just once)
+        """
+
+        if self.index is None:
+            self.index = TransactionsIndex(self.transactions)
+        return self.index
+
     def get_first_transaction(self):
         """
         :return: Transaction
             First transaction done (with respect to time)
         """
 
-        first = self.transactions[0]
-        for transaction in self.transactions:
-            if transaction.date < first.date:
-                first = transaction
-        return first
+        return self.get_index().get_first_transaction()
 
     def get_last_transaction(self):
         """
@@ -70,11 +85,19 @@ class CryptoExchange:
             Last transaction done (with respect to time)
         """
 
-        last = self.transactions[0]
-        for transaction in self.transactions:
-            if transaction.date > last.date:
-                last = transaction
-        return last
+        return self.get_index().get_last_transaction()
+
+    def get_transactions_between(self, since=None, until=None):
+        """
+        :param since: datetime
+            Start of window, included (if None, since first)
+        :param until: datetime
+            End of window, included (if None, until last)
+        :return: [] of Transaction
+            Transactions done in window, sorted by date
+        """
+
+        return self.get_index().get_transactions(since, until)
 
     def get_transactions(self, rule):
         """
@@ -88,30 +111,66 @@ class CryptoExchange:
             if rule(transaction):
                 yield transaction
 
-    def build_wallets(self):
+    def update_transactions(self, transactions):
         """
-        :return: {} of str -> Wallet
-            Build a wallet for each currency traded and put trading history
-            there
+        :param transactions: [] of Transaction
+            All transactions of exchange (e.g parsed again after an update)
+        :return: tuple ([] of Transaction, [] of Transaction)
+            Transactions added and removed with respect to the ones before
         """
 
-        wallets = {}
+        old = Counter(
+            transaction.get_key() for transaction in self.transactions
+        )
+        added = []
+        for transaction in transactions:
+            key = transaction.get_key()
+            if old[key] > 0:
+                old[key] -= 1
+            else:
+                added.append(transaction)
+
+        removed = []
         for transaction in self.transactions:
-            if transaction.successful:
-                # get coins involved
-                coin_buy, coin_sell, coin_fee = \
-                    transaction.coin_buy, transaction.coin_sell, \
-                    transaction.commission.coin if transaction.commission else None
+            key = transaction.get_key()
+            if old[key] > 0:
+                old[key] -= 1
+                removed.append(transaction)
 
-                # update wallets
-                for coin in {coin_buy, coin_sell, coin_fee}:
-                    if coin and str(coin) != "None":
-                        if coin not in wallets:
-                            wallets[coin] = Wallet(coin)
+        self.transactions = transactions
+        self.ledger = None
+        self.index = None
+        return added, removed
 
-                        wallets[coin].add_transaction(transaction)
+    def get_ledger(self):
+        """
+        :return: Ledger
+            Deltas of each coin traded, grouped by coin
+        """
+
+        if self.ledger is None:
+            self.ledger = Ledger(
+                self.transactions,
+                self.get_index().transactions_timestamps
+            )
+        return self.ledger
 
-        return wallets
+    def coins(self):
+        """
+        :return: [] of str
+            List of coins traded (without building any wallet)
+        """
+
+        return self.get_ledger().coins()
+
+    def build_wallets(self):
+        """
+        :return: {} of str -> Wallet
+            Build a wallet for each currency traded and put trading history
+            there
+        """
+
+        return self.get_ledger().build_wallets()
 
 
 class Portfolio:
@@ -120,23 +179,71 @@ class Portfolio:
     def __init__(self, wallets, portfolio_name=None):
         self.wallets = wallets
         self.portfolio_name = str(portfolio_name) if portfolio_name else None
+        self.index = None
 
-    def get_transactions_dates(self):
-        dates = []
-        for wallet in self.wallets:
-            dates += wallet.dates()
-        return sorted(dates)
+    def get_index(self):
+        """
+        :return: TimestampsIndex
+            Sorted unique dates of transactions of all wallets (built just
+            once, from the timestamps wallets already have)
+        """
+
+        if self.index is None:
+            self.index = TimestampsIndex.merge([
+                wallet.get_index() for wallet in self.wallets
+            ])
+        return self.index
+
+    def get_transactions_dates(self, since=None, until=None):
+        """
+        :param since: datetime
+            Start of window, included (if None, since first)
+        :param until: datetime
+            End of window, included (if None, until last)
+        :return: [] of datetime
+            Sorted dates of transactions of any wallet (once, even if a
+            transaction is in many wallets)
+        """
+
+        return self.get_index().get_dates(since, until)
+
+    def get_current_balance(self, currency=DEFAULT_FIAT, prices=None):
+        """
+        :param currency: str
+            Currency to convert balances to
+        :param prices: {} of str -> float
+            Current price of each coin (if None, they are downloaded)
+        :return: [] of {}
+            Current balance of each wallet
+        """
 
-    def get_current_balance(self, currency=DEFAULT_FIAT):
-        balances = [
-            {
+        if prices is None:
+            prices = get_current_prices(
+                [wallet.base_currency for wallet in self.wallets],
+                currency, tor=False
+            )  # all coins with just one request
+
+        balances = []
+        for wallet in self.wallets:
+            amount = wallet.balance()
+            balances.append({
                 "symbol": wallet.base_currency,
-                "balance": wallet.balance(),
-                "value": wallet.balance(currency, True)
-            }
-            for wallet in self.wallets
-        ]
-        tot_balance = self.sum_total_balance(balances)
+                "balance": amount,
+                "value": float(prices[wallet.base_currency]) * amount
+            })
+        return self.complete_balances(balances)
+
+    @staticmethod
+    def complete_balances(balances):
+        """
+        :param balances: [] of {}
+            List of raw balances (symbol, balance and value)
+        :return: [] of {}
+            List of positive balances with price and percentage, sorted by
+            value
+        """
+
+        tot_balance = Portfolio.sum_total_balance(balances)
 
         for i, balance in enumerate(balances):  # add price and %
             balances[i]["price"] = \
@@ -186,35 +293,68 @@ class Portfolio:
         """
 
         return sum([
-            balance[VALUE_KEY] for balance in balances
-            if not is_nan(balance[VALUE_KEY])
+            balance["value"] for balance in balances
+            if not is_nan(balance["value"])
         ])
 
     def get_crypto_fiat_balance(self, currency):
         dates = self.get_transactions_dates()
-        crypto_values = np.zeros(len(dates))  # zeros
-        fiat_values = np.zeros(len(dates))
-
-        for wallet in self.wallets:
-            balances = wallet.get_balance_array_by_date(dates, currency)
-            if wallet.is_crypto():
-                crypto_values += balances
-            else:
-                fiat_values += balances
+        crypto_values, fiat_values = PortfolioValuation(
+            self.wallets, currency
+        ).get_crypto_fiat_values(self.get_index().timestamps)
         return dates, crypto_values.tolist(), fiat_values.tolist()
 
-    def show_balance(self, last=None, save_to=None):
+    def iter_crypto_fiat_balance(self, currency):
+        """
+        :param currency: str
+            Currency to get balance
+        :return: generator of tuple (float, float, float)
+            Unix timestamp (s), crypto and fiat balance on each date of
+            transactions. Same values as get_crypto_fiat_balance, but
+            computed one date at a time in constant memory.
+        """
+
+        return StreamingValuation(self.wallets, currency).iter_values()
+
+    @staticmethod
+    def show_total_delta(total, last):
         """
-        :param save_to: str
-            Path to file where to save balance data
-        :param last: str
-            Path to file where to read balance data
+        :param total: float
+            Total balance now
+        :param last: {}
+            Past balance data
+        :return: void
+            Prints difference between total balance now and in the past
+        """
+
+        last_total_balance = sum(
+            [
+                float(coin["value"])
+                for symbol, coin in last.items() if symbol != DATE_TIME_KEY
+            ]
+        )
+        delta = total - last_total_balance
+        percentage = abs(100.0 * (total / last_total_balance - 1.0)) if \
+            last_total_balance != 0.0 else 0.0
+        if delta >= 0:
+            print("+", delta, "$ (+", percentage, "%)")
+        else:
+            print("-", abs(delta), "$ (-", percentage, "%)")
+
+    def show_balance(self, series=None, balances=None):
+        """
+        :param series: BalancesSeries
+            Past balances: the new balance is compared with them and then
+            appended
+        :param balances: [] of {}
+            Current balances to show (if None, they are computed)
         :return: float
             Total balance
         """
 
-        last = parse_balance(last) if last else None
-        balances = self.get_current_balance()
+        last = series.get_last() if series is not None else None
+        if balances is None:
+            balances = self.get_current_balance()
         total = self.sum_total_balance(balances)
         table = [
             [
@@ -241,7 +381,7 @@ class Portfolio:
             ], table
         )
 
-        now = datetime.now()
+        now = datetime.now(UTC)
         print("As of", now, "you got")
         print(pretty_table)
         print("Total value: ~", total, "$")
@@ -251,22 +391,145 @@ class Portfolio:
             time_elapsed = get_delta_seconds(now, last_time) / (60.0 * 60.0)
             print("As of last time", datetime_to_str(last_time), "(",
                   time_elapsed, "hours ago):")
+            self.show_total_delta(total, last)
 
-            last_total_balance = sum(
-                [
-                    float(coin["value"])
-                    for symbol, coin in last.items() if symbol != DATE_TIME_KEY
-                ]
-            )
-            delta = total - last_total_balance
-            percentage = abs(100.0 * (total / last_total_balance - 1.0)) if \
-                last_total_balance != 0.0 else 0.0
-            if delta >= 0:
-                print("+", delta, "$ (+", percentage, "%)")
-            else:
-                print("-", abs(delta), "$ (-", percentage, "%)")
+        if series is not None:
+            for label, time_ago in BALANCE_COMPARISONS:
+                past = series.get_snapshot_before(now - time_ago)
+                if past:
+                    print("As of", label, "ago (" +
+                          datetime_to_str(past[DATE_TIME_KEY]) + "):")
+                    self.show_total_delta(total, past)
 
-        if save_to:
-            save_balance(balances, save_to, timestamp=now)
+            series.append(balances, now)
 
         return total
+
+
+class ExchangesPortfolio:
+    """ Portfolios of many exchanges, priced all together """
+
+    def __init__(self, exchanges):
+        """
+        :param exchanges: [] of CryptoExchange
+            List of exchanges
+        """
+
+        self.portfolios = {
+            exchange.exchange_name: Portfolio(
+                exchange.build_wallets().values(), exchange.exchange_name
+            ) for exchange in exchanges
+        }
+        self.total = Portfolio([
+            wallet for portfolio in self.portfolios.values()
+            for wallet in portfolio.wallets
+        ], "total")
+
+    def add_transactions(self, exchange_name, transactions):
+        """
+        :param exchange_name: str
+            Exchange with new transactions
+        :param transactions: [] of Transaction
+            New transactions
+        :return: bool
+            True iff transactions have been added to the wallets of
+            exchange; False if wallets need to be built again (e.g a new
+            coin has been traded)
+        """
+
+        if exchange_name not in self.portfolios:
+            return False
+
+        wallets = {
+            wallet.base_currency: wallet
+            for wallet in self.portfolios[exchange_name].wallets
+        }
+        moves = [
+            (transaction, get_coins_deltas(transaction))
+            for transaction in transactions if transaction.successful
+        ]
+        if any(coin not in wallets for _, deltas in moves for coin in deltas):
+            return False
+
+        for transaction, deltas in moves:
+            for coin in deltas:
+                wallets[coin].add_transaction(transaction)
+
+        self.portfolios[exchange_name].index = None  # dates have changed
+        self.total.index = None
+        return True
+
+    def coins(self):
+        """
+        :return: [] of str
+            List of coins in any exchange
+        """
+
+        return list(dict.fromkeys(
+            wallet.base_currency for wallet in self.total.wallets
+        ))  # unique, keeping order
+
+    def get_amounts(self):
+        """
+        :return: {} of str -> [] of tuple (str, float)
+            Current amount of each coin of each exchange (no prices needed)
+        """
+
+        return {
+            name: [
+                (wallet.base_currency, wallet.balance())
+                for wallet in portfolio.wallets
+            ] for name, portfolio in self.portfolios.items()
+        }
+
+    def get_current_balances(self, currency=DEFAULT_FIAT):
+        """
+        :param currency: str
+            Currency to convert balances to
+        :return: tuple ({} of str -> [] of {}, [] of {})
+            Current balances of each exchange and total balances of all
+            exchanges (coins are priced just once)
+        """
+
+        return self.price_amounts(self.get_amounts(), currency)
+
+    @staticmethod
+    def price_amounts(amounts, currency=DEFAULT_FIAT):
+        """
+        :param amounts: {} of str -> [] of tuple (str, float)
+            Current amount of each coin of each exchange
+        :param currency: str
+            Currency to convert balances to
+        :return: tuple ({} of str -> [] of {}, [] of {})
+            Current balances of each exchange and total balances of all
+            exchanges (coins are priced just once)
+        """
+
+        prices = get_current_prices(list(dict.fromkeys(
+            symbol for coins in amounts.values() for symbol, _ in coins
+        )), currency, tor=False)
+        balances = {
+            name: Portfolio.complete_balances([
+                {
+                    "symbol": symbol,
+                    "balance": amount,
+                    "value": float(prices[symbol]) * amount
+                } for symbol, amount in coins
+            ]) for name, coins in amounts.items()
+        }
+
+        totals = {}  # merge wallets of same coin
+        for exchange_balances in balances.values():
+            for balance in exchange_balances:
+                symbol = balance["symbol"]
+                if symbol not in totals:
+                    totals[symbol] = {
+                        "symbol": symbol,
+                        "balance": 0.0,
+                        "value": 0.0
+                    }
+
+                totals[symbol]["balance"] += balance["balance"]
+                totals[symbol]["value"] += balance["value"]
+
+        return balances, Portfolio.complete_balances(list(totals.values()))
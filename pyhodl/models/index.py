@@ -0,0 +1,188 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Sorted indexes of dates of transactions, for first/last and windows """
+
+import numpy as np
+
+from pyhodl.utils import datetimes_to_unix_timestamps, \
+    unix_timestamps_to_datetimes
+
+
+def to_unix_timestamp(date):
+    """
+    :param date: datetime or float
+        Date (or unix timestamp in s)
+    :return: float
+        Unix timestamp (s), NaN if no date
+    """
+
+    if date is None or isinstance(date, (int, float, np.number)):
+        return np.nan if date is None else float(date)
+
+    return datetimes_to_unix_timestamps([date])[0]
+
+
+class TimestampsIndex:
+    """ Sorted and deduplicated unix timestamps (s) """
+
+    def __init__(self, timestamps):
+        """
+        :param timestamps: numpy array
+            Unix timestamps (s), any order, may repeat (NaN are skipped)
+        """
+
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.timestamps = np.unique(timestamps[~np.isnan(timestamps)])
+        self.dates = None  # datetime of each timestamp, built when needed
+
+    @staticmethod
+    def merge(indexes):
+        """
+        :param indexes: [] of TimestampsIndex
+            Indexes to merge
+        :return: TimestampsIndex
+            Timestamps of any index
+        """
+
+        return TimestampsIndex(np.concatenate(
+            [index.timestamps for index in indexes] or [np.empty(0)]
+        ))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def first(self):
+        """
+        :return: float
+            First timestamp (NaN if empty)
+        """
+
+        return self.timestamps[0] if len(self) else np.nan
+
+    def last(self):
+        """
+        :return: float
+            Last timestamp (NaN if empty)
+        """
+
+        return self.timestamps[-1] if len(self) else np.nan
+
+    def get_window(self, since=None, until=None):
+        """
+        :param since: datetime or float
+            Start of window, included (if None, since first)
+        :param until: datetime or float
+            End of window, included (if None, until last)
+        :return: tuple (int, int)
+            Indexes of first timestamp in window and after last one
+        """
+
+        start, end = 0, len(self.timestamps)
+        since, until = to_unix_timestamp(since), to_unix_timestamp(until)
+        if not np.isnan(since):
+            start = int(np.searchsorted(self.timestamps, since, side="left"))
+        if not np.isnan(until):
+            end = int(np.searchsorted(self.timestamps, until, side="right"))
+        return start, max(start, end)
+
+    def get_timestamps(self, since=None, until=None):
+        """
+        :param since: datetime or float
+            Start of window, included (if None, since first)
+        :param until: datetime or float
+            End of window, included (if None, until last)
+        :return: numpy array
+            Sorted timestamps in window (a view, not a copy)
+        """
+
+        start, end = self.get_window(since, until)
+        return self.timestamps[start:end]
+
+    def get_dates(self, since=None, until=None):
+        """
+        :param since: datetime or float
+            Start of window, included (if None, since first)
+        :param until: datetime or float
+            End of window, included (if None, until last)
+        :return: [] of datetime
+            Sorted UTC dates in window (converted just once)
+        """
+
+        if self.dates is None:
+            self.dates = unix_timestamps_to_datetimes(self.timestamps)
+
+        start, end = self.get_window(since, until)
+        return self.dates[start:end]
+
+
+class TransactionsIndex(TimestampsIndex):
+    """ Transactions sorted by date, with the index of their dates """
+
+    def __init__(self, transactions):
+        """
+        :param transactions: [] of Transaction
+            Transactions, any order
+        """
+
+        self.transactions = transactions
+        self.transactions_timestamps = datetimes_to_unix_timestamps([
+            transaction.date for transaction in transactions
+        ])  # of each transaction, same order
+        self.order = np.argsort(
+            self.transactions_timestamps, kind="stable"
+        )  # ties keep original order
+        self.sorted_timestamps = self.transactions_timestamps[self.order]
+
+        TimestampsIndex.__init__(self, self.transactions_timestamps)
+
+    def get_first_transaction(self):
+        """
+        :return: Transaction
+            First transaction done (the first listed if many at same time)
+        """
+
+        return self.transactions[self.order[0]]
+
+    def get_last_transaction(self):
+        """
+        :return: Transaction
+            Last transaction done (the first listed if many at same time)
+        """
+
+        last = np.searchsorted(
+            self.sorted_timestamps, self.sorted_timestamps[-1], side="left"
+        )
+        return self.transactions[self.order[last]]
+
+    def get_transactions(self, since=None, until=None):
+        """
+        :param since: datetime or float
+            Start of window, included (if None, since first)
+        :param until: datetime or float
+            End of window, included (if None, until last)
+        :return: [] of Transaction
+            Transactions in window, sorted by date
+        """
+
+        start, end = 0, len(self.sorted_timestamps)
+        since, until = to_unix_timestamp(since), to_unix_timestamp(until)
+        if not np.isnan(since):
+            start = np.searchsorted(self.sorted_timestamps, since, "left")
+        if not np.isnan(until):
+            end = np.searchsorted(self.sorted_timestamps, until, "right")
+        return [self.transactions[i] for i in self.order[start:end]]
@@ -0,0 +1,178 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Per-coin deltas of transactions, computed in a single pass """
+
+import numpy as np
+
+from pyhodl.metrics import timed
+from pyhodl.models.transactions import Wallet
+
+
+def get_coins_deltas(transaction):
+    """
+    :param transaction: Transaction
+        Transaction to analyze
+    :return: {} of str -> float
+        Amount of each coin involved in transaction (same as calling
+        transaction.get_amount on every coin, but all at once)
+    """
+
+    coin_buy, coin_sell = transaction.coin_buy, transaction.coin_sell
+    commission = transaction.commission
+    coin_fee = commission.coin if commission else None
+
+    deltas = {
+        coin: 0.0 for coin in (coin_buy, coin_sell, coin_fee)
+        if coin and str(coin) != "None"
+    }
+
+    if transaction.is_trade():
+        if coin_buy in deltas:
+            deltas[coin_buy] += transaction.buy_amount
+        if coin_sell in deltas:
+            deltas[coin_sell] -= transaction.sell_amount
+        if coin_fee in deltas:
+            deltas[coin_fee] -= commission.amount
+    elif transaction.is_fee():
+        if coin_fee in deltas:
+            deltas[coin_fee] -= commission.amount
+    elif transaction.is_deposit():
+        if coin_buy in deltas:
+            deltas[coin_buy] += transaction.buy_amount
+    elif transaction.is_withdrawal():
+        if coin_sell in deltas:
+            deltas[coin_sell] -= transaction.sell_amount
+
+    return deltas
+
+
+class Ledger:
+    """ Deltas of each coin traded, grouped by coin and sorted by date """
+
+    def __init__(self, transactions, timestamps=None):
+        """
+        :param transactions: [] of Transaction
+            List of transactions (any order)
+        :param timestamps: numpy array
+            Unix timestamp (s) of each transaction (if already known, e.g
+            from the index of exchange)
+        """
+
+        self.transactions = transactions
+        self.transactions_timestamps = timestamps
+        self.coins_ids = {}  # coin -> id
+        self.rows = None  # indexes of rows grouped by coin, sorted by date
+        self.offsets = None  # where each coin group starts in rows
+        self.indexes = None  # index of transaction of each row
+        self.timestamps = None  # unix timestamp (s) of each row
+        self.deltas = None  # amount of coin moved in each row
+
+        self._build()
+
+    @timed("wallets")
+    def _build(self):
+        """
+        :return: void
+            Scans transactions just once and groups deltas by coin
+        """
+
+        known_timestamps = None if self.transactions_timestamps is None \
+            else self.transactions_timestamps.tolist()
+        coins, indexes, timestamps, deltas = [], [], [], []
+        for i, transaction in enumerate(self.transactions):
+            if not transaction.successful:
+                continue
+
+            timestamp = transaction.date.timestamp() \
+                if known_timestamps is None else known_timestamps[i]
+            for coin, delta in get_coins_deltas(transaction).items():
+                if coin not in self.coins_ids:
+                    self.coins_ids[coin] = len(self.coins_ids)
+
+                coins.append(self.coins_ids[coin])
+                indexes.append(i)
+                timestamps.append(timestamp)
+                deltas.append(delta)
+
+        coins = np.array(coins, dtype=np.int64)
+        self.indexes = np.array(indexes, dtype=np.int64)
+        self.timestamps = np.array(timestamps, dtype=np.float64)
+        self.deltas = np.array(deltas, dtype=np.float64)
+
+        # group by coin, then by date (ties keep original order)
+        self.rows = np.lexsort((self.indexes, self.timestamps, coins))
+        counts = np.bincount(coins, minlength=len(self.coins_ids))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def coins(self):
+        """
+        :return: [] of str
+            List of coins involved in successful transactions
+        """
+
+        return list(self.coins_ids.keys())
+
+    def _get_rows(self, coin):
+        """
+        :param coin: str
+            Coin to get
+        :return: numpy array
+            Rows of coin, sorted by date
+        """
+
+        coin_id = self.coins_ids[coin]
+        return self.rows[self.offsets[coin_id]:self.offsets[coin_id + 1]]
+
+    def get_deltas(self, coin):
+        """
+        :param coin: str
+            Coin to get
+        :return: tuple (numpy array, numpy array, numpy array)
+            Unix timestamps (s), deltas and transaction indexes of coin,
+            sorted by date
+        """
+
+        rows = self._get_rows(coin)
+        return self.timestamps[rows], self.deltas[rows], self.indexes[rows]
+
+    def build_wallet(self, coin):
+        """
+        :param coin: str
+            Coin to get
+        :return: Wallet
+            Wallet of coin, with transactions and deltas already sorted
+        """
+
+        timestamps, deltas, indexes = self.get_deltas(coin)
+        wallet = Wallet(coin)
+        wallet.load_transactions(
+            [self.transactions[i] for i in indexes],
+            deltas.tolist(), timestamps
+        )
+        return wallet
+
+    def build_wallets(self):
+        """
+        :return: {} of str -> Wallet
+            Wallet of each coin traded
+        """
+
+        return {
+            coin: self.build_wallet(coin) for coin in self.coins_ids
+        }
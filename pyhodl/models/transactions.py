@@ -19,16 +19,17 @@
 """ Core models """
 
 from bisect import bisect
-from datetime import datetime
 from enum import Enum
 
 import numpy as np
 import pytz
 
-from pyhodl.apis.prices import get_price
+from pyhodl.apis.prices import get_current_prices
 from pyhodl.config import VALUE_KEY, DATE_TIME_KEY
 from pyhodl.data.tables import get_coin_prices_table
-from pyhodl.utils import is_crypto, is_nan
+from pyhodl.metrics import METRICS
+from pyhodl.models.index import TimestampsIndex
+from pyhodl.utils import is_crypto, is_nan, datetimes_to_unix_timestamps
 
 
 class TransactionType(Enum):
@@ -74,6 +75,21 @@ class Transaction:
         self.successful = bool(successful)
         self.commission = commission
 
+    def get_key(self):
+        """
+        :return: tuple
+            Values identifying transaction (e.g to find it again when
+            parsing the same file after an update)
+        """
+
+        commission = (
+            str(self.commission.coin), self.commission.amount
+        ) if self.commission else None
+        return (
+            self.date, self.transaction_type, self.coin_buy, self.buy_amount,
+            self.coin_sell, self.sell_amount, self.successful, commission
+        )
+
     def get_attrs(self):
         """
         :return: []
@@ -259,6 +275,8 @@ class Wallet:
     def __init__(self, base_currency):
         self.base_currency = base_currency
         self.transactions = []  # list of operations performed
+        self.deltas = None  # amount of base currency moved by transaction
+        self.timestamps = None  # unix timestamp (s) of each transaction
         self.is_sorted = False
 
     def is_crypto(self):
@@ -274,6 +292,8 @@ class Wallet:
             self.transactions = sorted(
                 self.transactions, key=lambda x: x.date
             )  # sort by date
+            self.deltas = None
+            self.timestamps = None
             self.is_sorted = True
 
     def add_transaction(self, transaction):
@@ -285,6 +305,49 @@ class Wallet:
         """
 
         self.transactions.append(transaction)
+        self.deltas = None
+        self.timestamps = None
+        self.is_sorted = False
+
+    def load_transactions(self, transactions, deltas, timestamps=None):
+        """
+        :param transactions: [] of Transaction
+            Transactions sorted by date
+        :param deltas: [] of float
+            Amount of base currency moved by each transaction
+        :param timestamps: numpy array
+            Unix timestamp (s) of each transaction (if already known)
+        :return: void
+            Replaces transactions with these ones (no need to sort them or
+            compute their deltas again)
+        """
+
+        self.transactions = list(transactions)
+        self.deltas = list(deltas)
+        self.timestamps = timestamps
+        self.is_sorted = True
+
+    def get_timestamps(self):
+        """
+        :return: numpy array
+            Unix timestamp (s) of each transaction, sorted (converted just
+            once)
+        """
+
+        self._sort_transactions()
+        if self.timestamps is None:
+            self.timestamps = datetimes_to_unix_timestamps([
+                transaction.date for transaction in self.transactions
+            ])
+        return self.timestamps
+
+    def get_index(self):
+        """
+        :return: TimestampsIndex
+            Sorted unique dates of transactions
+        """
+
+        return TimestampsIndex(self.get_timestamps())
 
     def dates(self):
         """
@@ -307,8 +370,8 @@ class Wallet:
         total = subtotals[-1][VALUE_KEY]  # amount of coins
 
         if now:  # convert to currency now
-            price = get_price(
-                [self.base_currency], currency, datetime.now(), tor=False
+            price = get_current_prices(
+                [self.base_currency], currency, tor=False
             )[self.base_currency]
             return float(price) * total
 
@@ -350,15 +413,21 @@ class Wallet:
             List of prices if coin converted to currency on those dates
         """
 
-        return [
-            self.convert_to(date, currency) for date in dates
-        ]
+        prices = get_coin_prices_table(currency).get_prices_matrix(
+            [self.base_currency], dates
+        )[:, 0]
+        return np.nan_to_num(prices, nan=0.0).tolist()  # as convert_to
 
     def get_delta_by_transaction(self):
         self._sort_transactions()
+        if self.deltas is None:
+            self.deltas = [
+                transaction.get_amount(self.base_currency)
+                for transaction in self.transactions
+            ]
+
         data = []
-        for transaction in self.transactions:
-            delta = transaction.get_amount(self.base_currency)
+        for transaction, delta in zip(self.transactions, self.deltas):
             if delta != 0.0:  # balance has actually changed
                 data.append({
                     "transaction": transaction,
@@ -366,6 +435,31 @@ class Wallet:
                 })
         return data
 
+    def iter_deltas(self):
+        """
+        :return: generator of tuple (Transaction, float)
+            Each transaction, sorted by date, and amount of base currency it
+            moves (computed one at a time, unless already known)
+        """
+
+        self._sort_transactions()
+        if self.deltas is not None:
+            yield from zip(self.transactions, self.deltas)
+            return
+
+        for transaction in self.transactions:
+            yield transaction, transaction.get_amount(self.base_currency)
+
+    def get_delta_arrays(self):
+        """
+        :return: tuple (numpy array, numpy array)
+            Unix timestamps (s) and amount of base currency moved by each
+            transaction, sorted by date
+        """
+
+        self.get_delta_by_transaction()  # sort and compute deltas
+        return self.get_timestamps(), np.array(self.deltas, dtype=np.float64)
+
     def get_delta_by_date(self, dates, currency=None):
         """
         :param dates: [] of datetime
@@ -475,13 +569,14 @@ class Wallet:
         )
 
         if currency:
-            filled = [
-                self.convert_to(
-                    data[DATE_TIME_KEY],
-                    currency,
-                    float(data[VALUE_KEY])
-                )
-                for data in filled
-            ]
+            with METRICS.span("prices"):  # one price lookup per date
+                filled = [
+                    self.convert_to(
+                        data[DATE_TIME_KEY],
+                        currency,
+                        float(data[VALUE_KEY])
+                    )
+                    for data in filled
+                ]
 
         return filled
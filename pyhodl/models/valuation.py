@@ -0,0 +1,241 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Value of many wallets on many dates, all at once or as a stream """
+
+import csv
+import heapq
+
+import numpy as np
+
+from pyhodl.config import DEFAULT_FIAT, DATE_TIME_KEY, INFINITY
+from pyhodl.data.tables import get_coin_prices_table
+from pyhodl.utils import EPOCH, datetimes_to_unix_timestamps, \
+    datetime_to_str, localize, unix_timestamp_s_to_datetime
+
+
+def get_balances_matrix(wallets, timestamps):
+    """
+    :param wallets: [] of Wallet
+        Wallets to get
+    :param timestamps: numpy array
+        Sorted unix timestamps (s)
+    :return: numpy array
+        Matrix (timestamps x wallets) of balance of each wallet right after
+        each time
+    """
+
+    balances = np.zeros((len(timestamps), len(wallets)))
+    for j, wallet in enumerate(wallets):
+        dates, deltas = wallet.get_delta_arrays()
+        subtotals = np.concatenate(([0.0], np.cumsum(deltas)))
+        balances[:, j] = subtotals[
+            np.searchsorted(dates, timestamps, side="right")
+        ]
+    return balances
+
+
+class PortfolioValuation:
+    """ Values wallets on a grid of dates with a single product of a
+    balances matrix and a prices matrix """
+
+    def __init__(self, wallets, currency=DEFAULT_FIAT):
+        """
+        :param wallets: [] of Wallet
+            Wallets to value
+        :param currency: str
+            Currency of values
+        """
+
+        self.wallets = list(wallets)
+        self.currency = currency
+        self.prices_table = get_coin_prices_table(currency)
+        self.coins = [wallet.base_currency for wallet in self.wallets]
+        self.is_crypto = np.array(
+            [wallet.is_crypto() for wallet in self.wallets], dtype=bool
+        )
+
+    def get_values_matrix(self, dates):
+        """
+        :param dates: [] of datetime or numpy array of unix timestamps (s)
+            Sorted dates
+        :return: numpy array
+            Matrix (dates x wallets) of value of each wallet on each date
+            (0 if price is not known)
+        """
+
+        timestamps = dates.astype(np.float64) \
+            if isinstance(dates, np.ndarray) \
+            else datetimes_to_unix_timestamps(dates)
+        balances = get_balances_matrix(self.wallets, timestamps)
+        prices = self.prices_table.get_prices_matrix(self.coins, timestamps)
+        return balances * np.nan_to_num(prices, nan=0.0)
+
+    def get_crypto_fiat_values(self, dates):
+        """
+        :param dates: [] of datetime or numpy array of unix timestamps (s)
+            Sorted dates
+        :return: tuple (numpy array, numpy array)
+            Value of crypto and fiat wallets on each date
+        """
+
+        masks = np.column_stack(
+            (self.is_crypto, ~self.is_crypto)
+        ).astype(np.float64)  # wallets x (crypto, fiat)
+        values = self.get_values_matrix(dates) @ masks
+        return values[:, 0], values[:, 1]
+
+
+def iter_wallet_deltas(wallet, wallet_id):
+    """
+    :param wallet: Wallet
+        Wallet to walk
+    :param wallet_id: int
+        Position of wallet in portfolio
+    :return: generator of tuple (float, int, float)
+        Unix timestamp (s), wallet id and amount moved by each transaction
+        of wallet, sorted by date (one at a time)
+    """
+
+    for transaction, delta in wallet.iter_deltas():
+        timestamp = (localize(transaction.date) - EPOCH).total_seconds()
+        yield timestamp, wallet_id, delta
+
+
+class StreamingValuation:
+    """ Values wallets walking their transactions just once, in date order.
+    Just the current balance and price of each wallet are kept, so memory
+    does not grow with dates. """
+
+    def __init__(self, wallets, currency=DEFAULT_FIAT):
+        """
+        :param wallets: [] of Wallet
+            Wallets to value
+        :param currency: str
+            Currency of values
+        """
+
+        self.wallets = list(wallets)
+        self.currency = currency
+        self.prices_table = get_coin_prices_table(currency)
+        self.is_crypto = [wallet.is_crypto() for wallet in self.wallets]
+
+    def _get_price(self, wallet, nearest):
+        """
+        :param wallet: Wallet
+            Wallet to value
+        :param nearest: int
+            Index of date in prices table (-1 if none is near)
+        :return: float
+            Price of coin of wallet on date (0 if not known)
+        """
+
+        symbol = str(wallet.base_currency).upper()
+        if symbol == self.prices_table.base_currency:
+            return 1.0
+
+        if nearest < 0:
+            return 0.0
+
+        date = self.prices_table.dates[nearest]
+        try:
+            price = float(self.prices_table.content[date][symbol])
+        except (KeyError, TypeError, ValueError):
+            return 0.0
+
+        return 0.0 if np.isnan(price) else price
+
+    def _get_nearest(self, timestamp):
+        """
+        :param timestamp: float
+            Unix timestamp (s)
+        :return: int
+            Index of nearest date in prices table (-1 if farther than max
+            error), as PortfolioValuation
+        """
+
+        table_timestamps = self.prices_table.timestamps
+        high = int(np.searchsorted(table_timestamps, timestamp, side="right"))
+        err_low = timestamp - table_timestamps[high - 1] if high > 0 \
+            else INFINITY
+        err_high = table_timestamps[high] - timestamp \
+            if high < len(table_timestamps) else INFINITY
+        if min(err_low, err_high) > self.prices_table.max_error:
+            return -1
+
+        return high - 1 if err_low <= err_high else high
+
+    def iter_values(self):
+        """
+        :return: generator of tuple (float, float, float)
+            Unix timestamp (s), crypto value and fiat value of wallets right
+            after each date of transactions (once for each date). Prices
+            are the ones on the nearest date of prices table, as in
+            PortfolioValuation, looked up just when that date changes.
+        """
+
+        balances = [0.0] * len(self.wallets)
+        prices = [0.0] * len(self.wallets)
+        nearest = None  # index of nearest date of prices table
+
+        moves = heapq.merge(*[
+            iter_wallet_deltas(wallet, j)
+            for j, wallet in enumerate(self.wallets)
+        ])
+        timestamp, j, delta = next(moves, (None, None, None))
+        while timestamp is not None:
+            now = timestamp
+            while timestamp == now:  # all moves at same time
+                balances[j] += delta
+                timestamp, j, delta = next(moves, (None, None, None))
+
+            found = self._get_nearest(now)
+            if found != nearest:  # prices change just with nearest date
+                nearest = found
+                prices = [
+                    self._get_price(wallet, nearest)
+                    for wallet in self.wallets
+                ]
+
+            crypto_value, fiat_value = 0.0, 0.0
+            for balance, price, is_crypto in \
+                    zip(balances, prices, self.is_crypto):
+                if is_crypto:
+                    crypto_value += balance * price
+                else:
+                    fiat_value += balance * price
+            yield now, crypto_value, fiat_value
+
+    def save(self, output_file):
+        """
+        :param output_file: str
+            CSV file where to write values
+        :return: int
+            Number of dates written (one row at a time)
+        """
+
+        count = 0
+        with open(output_file, "w", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow([DATE_TIME_KEY, "crypto", "fiat"])
+            for timestamp, crypto_value, fiat_value in self.iter_values():
+                writer.writerow([
+                    datetime_to_str(unix_timestamp_s_to_datetime(timestamp)),
+                    crypto_value, fiat_value
+                ])
+                count += 1
+        return count
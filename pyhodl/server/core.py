@@ -0,0 +1,431 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Keeps exchanges and prices in memory and answers queries over HTTP """
+
+import json
+import math
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pyhodl.config import DATA_FOLDER, DEFAULT_FIAT
+from pyhodl.data.balance import BalancesSeries
+from pyhodl.data.tables import get_coin_prices_table
+from pyhodl.data.watch import DataWatcher
+from pyhodl.metrics import METRICS
+from pyhodl.models.exchanges import ExchangesPortfolio, Portfolio
+from pyhodl.stats.analytics import PortfolioAnalytics
+from pyhodl.stats.profits import CostBasisMethod, get_profits
+from pyhodl.utils import datetime_to_str
+
+DEFAULT_HOST = "127.0.0.1"  # just local clients
+DEFAULT_PORT = 8417
+MIN_REFRESH_INTERVAL = 1.0  # seconds between 2 checks of files
+UNCACHED_QUERIES = {
+    "balance",  # depends on current prices
+    "charts/history"  # depends on balances files, not watched
+}
+UNLOCKED_QUERIES = {
+    "balance"  # takes data lock itself, not while downloading prices
+}
+
+
+def to_json(data):
+    """
+    :param data: *
+        Result of query
+    :return: *
+        Same data, with NaN and infinite values replaced by None
+    """
+
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+
+    if isinstance(data, dict):
+        return {str(key): to_json(value) for key, value in data.items()}
+
+    if isinstance(data, (list, tuple)):
+        return [to_json(value) for value in data]
+
+    return data
+
+
+class ReadWriteLock:
+    """ Many readers or just one writer at a time. Waiting writers go
+    first, so that queries do not keep changes out. """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0  # reading now
+        self.writers = 0  # waiting or writing
+        self.is_writing = False
+
+    @contextmanager
+    def reading(self):
+        with self.condition:
+            while self.writers:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self.condition:
+            self.writers += 1
+            while self.readers or self.is_writing:
+                self.condition.wait()
+            self.is_writing = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writers -= 1
+                self.is_writing = False
+                self.condition.notify_all()
+
+
+class ServerState:
+    """ Exchanges and prices kept in memory. They are updated with just the
+    changes of their files, and results of queries are kept until then.
+    Queries run concurrently; changes wait for them. """
+
+    def __init__(self, data_folder=DATA_FOLDER, currency=DEFAULT_FIAT):
+        """
+        :param data_folder: str
+            Folder with exchanges data
+        :param currency: str
+            Currency of values
+        """
+
+        self.currency = currency
+        get_coin_prices_table(currency)  # load table, so it is watched
+        self.data_folder = data_folder
+        self.watcher = DataWatcher(data_folder)
+        self.lock = threading.Lock()  # of results and checks
+        self.data_lock = ReadWriteLock()  # of exchanges and wallets
+        self.portfolio_lock = threading.Lock()  # built just once
+        self.portfolio = None
+        self.results = {}  # query -> result, until files change
+        self.version = 0  # incremented at each change
+        self.last_check = 0.0
+
+    def refresh(self, force=False):
+        """
+        :param force: bool
+            True iff files should be checked even if they were checked less
+            than MIN_REFRESH_INTERVAL seconds ago
+        :return: [] of {}
+            Changes of exchanges and prices since last refresh
+        """
+
+        with self.lock:
+            now = time.time()
+            if not force and now - self.last_check < MIN_REFRESH_INTERVAL:
+                return []
+
+            self.last_check = now
+
+        with self.data_lock.writing():
+            changes = self.watcher.poll()
+            for change in changes:
+                self._apply(change)
+
+            if changes:
+                with self.lock:
+                    self.results = {}
+                    self.version += 1
+        return changes
+
+    def _apply(self, change):
+        """
+        :param change: {}
+            Change of exchange or prices
+        :return: void
+            Adds new transactions to wallets in memory, or drops wallets if
+            they need to be built again
+        """
+
+        if self.portfolio is None or "exchange" not in change:
+            return  # prices are updated in place
+
+        if change["removed"] or not self.portfolio.add_transactions(
+                change["exchange"].exchange_name, change["added"]
+        ):
+            self.portfolio = None
+
+    def get_exchanges(self):
+        """
+        :return: [] of CryptoExchange
+            Exchanges in memory
+        """
+
+        return self.watcher.get_exchanges()
+
+    def get_portfolio(self):
+        """
+        :return: ExchangesPortfolio
+            Wallets of all exchanges (built once per version)
+        """
+
+        with self.portfolio_lock:
+            if self.portfolio is None:
+                self.portfolio = ExchangesPortfolio(self.get_exchanges())
+            return self.portfolio
+
+    def check_exchange(self, exchange):
+        """
+        :param exchange: str
+            Exchange name
+        :return: str
+            Same name, if it is an exchange in memory (or total)
+        """
+
+        portfolio = self.get_portfolio()
+        if exchange != portfolio.total.portfolio_name and \
+                exchange not in portfolio.portfolios:
+            raise ValueError("No exchange named", exchange)
+        return exchange
+
+    def get_wallets(self, exchange=None):
+        """
+        :param exchange: str
+            Exchange name (if None, all exchanges)
+        :return: [] of Wallet
+            Wallets of exchange
+        """
+
+        portfolio = self.get_portfolio()
+        if exchange is None:
+            return portfolio.total.wallets
+
+        if exchange not in portfolio.portfolios:
+            raise ValueError("No exchange named", exchange)
+
+        return portfolio.portfolios[exchange].wallets
+
+    def query(self, name, **params):
+        """
+        :param name: str
+            Query to answer
+        :param params: **
+            Args of query
+        :return: *
+            Result of query (kept until files change, except the ones that
+            depend on something else). Results are computed outside of the
+            lock of results, so slow queries do not hold others.
+        """
+
+        if name not in QUERIES:
+            raise ValueError("Unknown query", name)
+
+        self.refresh()
+        key = (name, tuple(sorted(params.items())))
+        with self.lock:
+            if key in self.results:
+                return self.results[key]
+
+        if name in UNLOCKED_QUERIES:
+            with METRICS.span("query " + name):
+                return to_json(QUERIES[name](self, **params))  # not cached
+
+        with self.data_lock.reading():
+            version = self.version  # no changes while reading
+            with METRICS.span("query " + name):
+                result = to_json(QUERIES[name](self, **params))
+
+        if name not in UNCACHED_QUERIES:
+            with self.lock:
+                if self.version == version:  # not changed meanwhile
+                    self.results[key] = result
+        return result
+
+
+def query_exchanges(state):
+    return [
+        {
+            "name": exchange.exchange_name,
+            "transactions": exchange.get_transactions_count(),
+            "coins": [str(coin) for coin in exchange.coins()],
+            "first": datetime_to_str(exchange.get_first_transaction().date),
+            "last": datetime_to_str(exchange.get_last_transaction().date)
+        } for exchange in state.get_exchanges()
+        if exchange.get_transactions_count()
+    ]
+
+
+def query_balance(state, exchange=None):
+    with state.data_lock.reading():  # just to copy amounts, not to price
+        amounts = state.get_portfolio().get_amounts()
+    if exchange is not None:
+        if exchange not in amounts:
+            raise ValueError("No exchange named", exchange)
+        amounts = {exchange: amounts[exchange]}  # price just its coins
+
+    balances, totals = ExchangesPortfolio.price_amounts(
+        amounts, state.currency
+    )
+    if exchange is not None:
+        totals = balances[exchange]
+
+    return {
+        "balances": totals,
+        "value": Portfolio.sum_total_balance(totals)
+    }
+
+
+def query_stats(state, resolution="daily"):
+    return PortfolioAnalytics(
+        state.get_exchanges(), state.currency, resolution
+    ).get_summary()
+
+
+def query_profits(state, method="fifo", exchange=None):
+    return get_profits(
+        state.get_wallets(exchange), currency=state.currency,
+        method=CostBasisMethod(method)
+    )
+
+
+def query_crypto_fiat(state, exchange=None):
+    portfolio = Portfolio(state.get_wallets(exchange))
+    dates, crypto_values, fiat_values = \
+        portfolio.get_crypto_fiat_balance(state.currency)
+    return {
+        "dates": [datetime_to_str(date) for date in dates],
+        "crypto": crypto_values,
+        "fiat": fiat_values
+    }
+
+
+def query_history(state, exchange="total", resolution="daily"):
+    series = BalancesSeries(state.check_exchange(exchange), state.data_folder)
+    if resolution not in series.files:
+        raise ValueError("Unknown resolution", resolution)
+
+    dates, values = series.get_total_values(resolution)
+    return {
+        "dates": [datetime_to_str(date) for date in dates],
+        "values": values
+    }
+
+
+QUERIES = {
+    "exchanges": query_exchanges,
+    "balance": query_balance,
+    "stats": query_stats,
+    "profits": query_profits,
+    "charts/crypto_fiat": query_crypto_fiat,
+    "charts/history": query_history
+}  # path -> function answering query
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """ Answers GET /<query>?<args> with JSON """
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        name = url.path.strip("/")
+        params = {
+            key: values[-1]
+            for key, values in urllib.parse.parse_qs(url.query).items()
+        }
+
+        if name not in QUERIES:
+            self._reply(404, {
+                "error": "unknown query " + name,
+                "queries": sorted(QUERIES.keys())
+            })
+            return
+
+        try:
+            self._reply(200, self.server.state.query(name, **params))
+        except (ValueError, TypeError) as e:
+            self._reply(400, {"error": " ".join(str(arg) for arg in e.args)})
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+
+class QueryServer(ThreadingHTTPServer):
+    """ HTTP server sharing one state among all requests """
+
+    daemon_threads = True
+
+    def __init__(self, state, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 verbose=False):
+        """
+        :param state: ServerState
+            Data to query
+        :param host: str
+            Address to listen on
+        :param port: int
+            Port to listen on
+        :param verbose: bool
+            True iff requests should be logged
+        """
+
+        ThreadingHTTPServer.__init__(self, (host, port), QueryHandler)
+        self.state = state
+        self.verbose = verbose
+
+
+def serve(data_folder=DATA_FOLDER, host=DEFAULT_HOST, port=DEFAULT_PORT,
+          verbose=False):
+    """
+    :param data_folder: str
+        Folder with exchanges data
+    :param host: str
+        Address to listen on
+    :param port: int
+        Port to listen on
+    :param verbose: bool
+        True iff requests should be logged
+    :return: void
+        Loads data and answers queries until interrupted
+    """
+
+    state = ServerState(data_folder)
+    state.refresh(force=True)
+    server = QueryServer(state, host, port, verbose)
+    print("Loaded", len(state.get_exchanges()), "exchanges")
+    print("Answering queries on http://" + host + ":" + str(port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,315 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Returns, volatility, drawdown and correlations of portfolios """
+
+import numpy as np
+
+from pyhodl.config import DEFAULT_FIAT
+from pyhodl.data.balance import BALANCES_ROLLUPS
+from pyhodl.data.tables import get_coin_prices_table
+from pyhodl.metrics import timed
+
+PERIODS_PER_YEAR = {
+    "hourly": 24 * 365,
+    "daily": 365
+}  # crypto markets never close
+ROLLING_WINDOWS = {
+    "hourly": 24 * 30,
+    "daily": 30
+}  # default window of rolling stats: 30 days
+
+
+def get_balances_matrix(ledger, coins, timestamps):
+    """
+    :param ledger: Ledger
+        Deltas of coins
+    :param coins: [] of str
+        Coins to get
+    :param timestamps: numpy array
+        Sorted unix timestamps (s)
+    :return: numpy array
+        Matrix (timestamps x coins) of balance of each coin at each time
+    """
+
+    balances = np.zeros((len(timestamps), len(coins)))
+    ledger_coins = set(ledger.coins())
+    for j, coin in enumerate(coins):
+        if coin not in ledger_coins:
+            continue
+
+        dates, deltas, _ = ledger.get_deltas(coin)
+        subtotals = np.concatenate(([0.0], np.cumsum(deltas)))
+        balances[:, j] = subtotals[
+            np.searchsorted(dates, timestamps, side="right")
+        ]
+    return balances
+
+
+def get_rolling_std(values, window):
+    """
+    :param values: numpy array
+        Values (NaN if missing)
+    :param window: int
+        Number of values in each window
+    :return: numpy array
+        Standard deviation of each window ending at each value (NaN if
+        window has less than 2 values). Uses running sums, so it takes O(n)
+        time whatever the window.
+    """
+
+    found = np.isfinite(values)
+    filled = np.where(found, values, 0.0)
+    sums = np.concatenate(([0.0], np.cumsum(filled)))
+    squares = np.concatenate(([0.0], np.cumsum(filled ** 2)))
+    counts = np.concatenate(([0], np.cumsum(found)))
+
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    n = (counts[ends] - counts[starts]).astype(np.float64)
+    total = sums[ends] - sums[starts]
+    total_squares = squares[ends] - squares[starts]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = (total_squares - total ** 2 / n) / (n - 1)
+    variance[n < 2] = np.nan
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def get_drawdowns(values):
+    """
+    :param values: numpy array
+        Values of portfolio
+    :return: numpy array
+        Drawdown of each value from the highest value before it (0 if value
+        is a new high, -1 if everything is lost)
+    """
+
+    values = np.where(np.isfinite(values), values, 0.0)
+    highs = np.maximum.accumulate(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdowns = values / highs - 1.0
+    drawdowns[highs <= 0.0] = 0.0
+    return drawdowns
+
+
+def get_correlations(returns):
+    """
+    :param returns: numpy array
+        Matrix (dates x coins) of returns (NaN if missing)
+    :return: numpy array
+        Correlation (coins x coins) of returns, each pair using just the
+        dates when both coins have a return. Computed with a few matrix
+        products, so it takes O(dates x coins^2) time.
+    """
+
+    found = np.isfinite(returns).astype(np.float64)
+    filled = np.where(found > 0, returns, 0.0)
+
+    n = found.T @ found  # dates in common
+    sums = filled.T @ found  # sum of coin i when j is known
+    squares = (filled ** 2).T @ found
+    products = filled.T @ filled
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariance = n * products - sums * sums.T
+        variances = n * squares - sums ** 2
+        correlations = covariance / np.sqrt(variances * variances.T)
+    correlations[n < 2] = np.nan
+    return np.clip(correlations, -1.0, 1.0)
+
+
+class PortfolioAnalytics:
+    """ Returns, volatility, drawdown and correlations of all coins of
+    some exchanges, sampled at fixed resolution """
+
+    def __init__(self, exchanges, currency=DEFAULT_FIAT, resolution="daily",
+                 prices_table=None):
+        """
+        :param exchanges: [] of CryptoExchange
+            Exchanges to analyze
+        :param currency: str
+            Currency of values
+        :param resolution: str
+            Time between 2 samples: "hourly" or "daily"
+        :param prices_table: CoinPricesTable
+            Table with historical prices (if None, local table of currency)
+        """
+
+        if resolution not in BALANCES_ROLLUPS:
+            raise ValueError(
+                "Resolution", resolution, "not supported. Choose one of",
+                list(BALANCES_ROLLUPS.keys())
+            )
+
+        self.resolution = resolution
+        self.currency = currency
+        self.prices_table = prices_table or get_coin_prices_table(currency)
+        self.ledgers = [exchange.get_ledger() for exchange in exchanges]
+        self.coins = sorted(set(
+            coin for ledger in self.ledgers for coin in ledger.coins()
+        ), key=str)
+
+        self.timestamps = None  # time of each sample
+        self.balances = None  # (timestamps x coins) amount of coins held
+        self.prices = None  # (timestamps x coins) price of coins
+        self._build()
+
+    @timed("analytics")
+    def _build(self):
+        """
+        :return: void
+            Samples balances and prices of coins from first transaction to
+            last price known
+        """
+
+        step = BALANCES_ROLLUPS[self.resolution]
+        first = min(
+            [ledger.timestamps.min() for ledger in self.ledgers
+             if len(ledger.timestamps)],
+            default=None
+        )
+        if first is None or not self.prices_table.dates:
+            self.timestamps = np.zeros(0)
+        else:
+            last = max(first, self.prices_table.timestamps[-1])
+            self.timestamps = np.arange(
+                (first // step + 1) * step, last + step, step
+            )  # end of each time bucket
+
+        self.balances = np.zeros((len(self.timestamps), len(self.coins)))
+        for ledger in self.ledgers:
+            self.balances += get_balances_matrix(
+                ledger, self.coins, self.timestamps
+            )
+        self.prices = self.prices_table.get_prices_matrix(
+            self.coins, self.timestamps
+        )
+
+    def get_values(self):
+        """
+        :return: numpy array
+            Value of portfolio at each time (coins without price are not
+            counted)
+        """
+
+        return np.nansum(self.balances * self.prices, axis=1)
+
+    def get_returns(self):
+        """
+        :return: numpy array
+            Return of portfolio in each period (NaN for the first one). Only
+            the coins held at the start of the period are counted, so
+            deposits, withdrawals and trades do not count as returns.
+        """
+
+        held = self.balances[:-1]
+        before, after = self.prices[:-1], self.prices[1:]
+        found = np.isfinite(before) & np.isfinite(after)
+        start = np.where(found, held * before, 0.0).sum(axis=1)
+        end = np.where(found, held * after, 0.0).sum(axis=1)
+
+        returns = np.full(len(self.timestamps), np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns[1:] = np.where(start > 0.0, end / start - 1.0, np.nan)
+        return returns
+
+    def get_coins_returns(self):
+        """
+        :return: numpy array
+            Matrix (timestamps x coins) of price returns of each coin
+        """
+
+        returns = np.full(self.prices.shape, np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns[1:] = self.prices[1:] / self.prices[:-1] - 1.0
+        return returns
+
+    def get_volatility(self, window=None):
+        """
+        :param window: int
+            Number of periods of each window (if None, 30 days)
+        :return: numpy array
+            Annualized volatility of returns over window ending at each time
+        """
+
+        window = window or ROLLING_WINDOWS[self.resolution]
+        return get_rolling_std(self.get_returns(), window) * \
+               np.sqrt(PERIODS_PER_YEAR[self.resolution])
+
+    def get_max_drawdown(self):
+        """
+        :return: tuple (float, float, float)
+            Max drawdown of cumulative returns and unix timestamps of its
+            peak and trough (None if there is no drawdown)
+        """
+
+        returns = np.nan_to_num(self.get_returns())
+        growth = np.cumprod(1.0 + returns)
+        drawdowns = get_drawdowns(growth)
+        if not len(drawdowns) or drawdowns.min() >= 0.0:
+            return 0.0, None, None
+
+        trough = int(np.argmin(drawdowns))
+        peak = int(np.argmax(growth[:trough + 1]))
+        return float(drawdowns[trough]), float(self.timestamps[peak]), \
+               float(self.timestamps[trough])
+
+    def get_correlations(self):
+        """
+        :return: tuple ([] of str, numpy array)
+            Coins with prices and correlation matrix of their returns
+        """
+
+        columns = [
+            j for j, coin in enumerate(self.coins)
+            if str(coin).upper() != self.prices_table.base_currency and
+            np.isfinite(self.prices[:, j]).any()
+        ]
+        return [self.coins[j] for j in columns], \
+               get_correlations(self.get_coins_returns()[:, columns])
+
+    def get_summary(self):
+        """
+        :return: {}
+            Period, current value, cumulative and mean return, last rolling
+            volatility, max drawdown and correlations of portfolio
+        """
+
+        if not len(self.timestamps):
+            return {}
+
+        returns = self.get_returns()
+        drawdown, peak, trough = self.get_max_drawdown()
+        coins, correlations = self.get_correlations()
+        with np.errstate(invalid="ignore"):
+            mean_return = float(np.nanmean(returns)) if len(returns) > 1 \
+                else 0.0
+        return {
+            "resolution": self.resolution,
+            "since": float(self.timestamps[0]),
+            "until": float(self.timestamps[-1]),
+            "value": float(self.get_values()[-1]),
+            "return": float(np.prod(1.0 + np.nan_to_num(returns)) - 1.0),
+            "mean return": mean_return,
+            "volatility": float(self.get_volatility()[-1]),
+            "max drawdown": drawdown,
+            "peak": peak,
+            "trough": trough,
+            "coins": [str(coin) for coin in coins],
+            "correlations": correlations.tolist()
+        }
@@ -0,0 +1,291 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Cost basis of wallets and profits (realized and unrealized) """
+
+from collections import deque
+from enum import Enum
+
+from pyhodl.config import DEFAULT_FIAT, NAN, VALUE_KEY
+from pyhodl.data.tables import get_coin_prices_table
+from pyhodl.metrics import timed
+from pyhodl.utils import is_nan
+
+
+class CostBasisMethod(Enum):
+    """ Which acquired lots are matched with a disposal """
+
+    FIFO = "fifo"  # first acquired, first disposed
+    LIFO = "lifo"  # last acquired, first disposed
+    AVERAGE = "average"  # average cost of all lots
+
+
+class LotsMatcher:
+    """ Matches disposals of a coin with its open lots. Every lot is added
+    and removed once, so matching n deltas takes O(n) time. Lots acquired
+    without a known price are matched as usual, but their amount is kept
+    out of cost and profits. """
+
+    def __init__(self, method=CostBasisMethod.FIFO):
+        """
+        :param method: CostBasisMethod
+            How to match disposals with lots
+        """
+
+        self.method = CostBasisMethod(method)
+        self.lots = deque()  # [amount, unit cost] of open lots, by date
+        self.amount = 0.0  # amount of open lots
+        self.unpriced = 0.0  # amount of open lots without a known cost
+        self.cost = 0.0  # cost of open lots (with a known cost)
+        self.realized = 0.0  # profit (or loss) of disposals
+        self.proceeds = 0.0  # value of disposals
+        self.unmatched = 0.0  # amount disposed without any open lot
+
+    def acquire(self, amount, price):
+        """
+        :param amount: float
+            Amount acquired
+        :param price: float
+            Price of each coin (NaN if not known)
+        :return: void
+            Opens new lot
+        """
+
+        if self.method != CostBasisMethod.AVERAGE:
+            self.lots.append([amount, price])
+
+        self.amount += amount
+        if is_nan(price):
+            self.unpriced += amount
+        else:
+            self.cost += amount * price
+
+    def _match_lots(self, amount):
+        """
+        :param amount: float
+            Amount to take from open lots
+        :return: tuple (float, float, float)
+            Amount actually matched, amount of it without a known cost and
+            cost of the rest
+        """
+
+        if self.method == CostBasisMethod.AVERAGE:
+            matched = min(amount, self.amount)
+            if not self.amount:
+                return matched, 0.0, 0.0
+
+            unpriced = self.unpriced * matched / self.amount
+            priced = self.amount - self.unpriced
+            cost = self.cost * (matched - unpriced) / priced if priced \
+                else 0.0
+            return matched, unpriced, cost
+
+        take_next = self.lots.popleft \
+            if self.method == CostBasisMethod.FIFO else self.lots.pop
+        matched, unpriced, cost = 0.0, 0.0, 0.0
+        while matched < amount and self.lots:
+            lot = take_next()
+            taken = min(lot[0], amount - matched)
+            matched += taken
+            if is_nan(lot[1]):
+                unpriced += taken
+            else:
+                cost += taken * lot[1]
+            if taken < lot[0]:  # lot is just partially closed
+                lot[0] -= taken
+                if self.method == CostBasisMethod.FIFO:
+                    self.lots.appendleft(lot)
+                else:
+                    self.lots.append(lot)
+        return matched, unpriced, cost
+
+    def dispose(self, amount, price, realize=True):
+        """
+        :param amount: float
+            Amount disposed
+        :param price: float
+            Price of each coin (NaN if not known)
+        :param realize: bool
+            True iff disposal is a sale (or fee); False if coins are just
+            moved away (e.g withdrawals), so their cost leaves with them
+        :return: float
+            Profit (or loss) realized (just of lots with a known cost, 0 if
+            price is not known)
+        """
+
+        matched, unpriced, cost = self._match_lots(amount)
+        self.amount -= matched
+        self.unpriced -= unpriced
+        self.cost -= cost
+        self.unmatched += amount - matched
+        if self.amount <= 0.0:  # rounding errors
+            self.amount, self.unpriced, self.cost = 0.0, 0.0, 0.0
+        elif self.unpriced <= 0.0:
+            self.unpriced = 0.0
+
+        if not realize or is_nan(price):
+            return 0.0
+
+        proceeds = (matched - unpriced) * price
+        profit = proceeds - cost
+        self.proceeds += proceeds
+        self.realized += profit
+        return profit
+
+    def get_unrealized(self, price):
+        """
+        :param price: float
+            Current price of each coin
+        :return: float
+            Profit (or loss) of open lots with a known cost if sold at price
+        """
+
+        return (self.amount - self.unpriced) * price - self.cost
+
+
+class WalletCostBasis:
+    """ Cost basis and profits of a wallet, updated transaction by
+    transaction """
+
+    def __init__(self, wallet, currency=DEFAULT_FIAT,
+                 method=CostBasisMethod.FIFO):
+        """
+        :param wallet: Wallet
+            Wallet to analyze
+        :param currency: str
+            Currency of prices and profits
+        :param method: CostBasisMethod
+            How to match disposals with lots
+        """
+
+        self.coin = wallet.base_currency
+        self.currency = currency
+        self.prices_table = get_coin_prices_table(currency)
+        self.matcher = LotsMatcher(method)
+        self.last_date = None
+        self.unpriced = 0  # transactions without a known price
+
+        for delta in wallet.get_delta_by_transaction():
+            self.add_delta(delta["transaction"], delta[VALUE_KEY])
+
+    def get_price(self, date_time):
+        """
+        :param date_time: datetime
+            Date and time
+        :return: float
+            Price of coin on date (NaN if not known)
+        """
+
+        try:
+            price = self.prices_table.get_value_on(self.coin, date_time)
+            return NAN if price is None else float(price)
+        except:
+            return NAN
+
+    def add_delta(self, transaction, delta):
+        """
+        :param transaction: Transaction
+            Transaction that moved coin
+        :param delta: float
+            Amount of coin moved
+        :return: void
+            Opens or matches lots
+        """
+
+        if self.last_date and transaction.date < self.last_date:
+            raise ValueError(
+                "Cannot add transaction of", transaction.date,
+                "before last one (", self.last_date, ")"
+            )
+
+        self.last_date = transaction.date
+        if delta == 0.0:
+            return
+
+        price = self.get_price(transaction.date)
+        if is_nan(price):
+            self.unpriced += 1
+
+        if delta > 0:
+            self.matcher.acquire(delta, price)
+        else:
+            self.matcher.dispose(
+                -delta, price,
+                realize=transaction.is_trade() or transaction.is_fee()
+            )
+
+    def add_transaction(self, transaction):
+        """
+        :param transaction: Transaction
+            New transaction (not older than the ones already added)
+        :return: void
+            Updates cost basis and profits with transaction
+        """
+
+        if transaction.successful:
+            self.add_delta(transaction, transaction.get_amount(self.coin))
+
+    def get_profits(self, date_time=None):
+        """
+        :param date_time: datetime
+            Value open lots at this date (if None, last date with prices)
+        :return: {}
+            Amount held, cost basis, realized and unrealized profits
+        """
+
+        if date_time is None and self.prices_table.dates:
+            date_time = self.prices_table.dates[-1]
+
+        price = self.get_price(date_time) if date_time is not None else NAN
+        matcher = self.matcher
+        unrealized = matcher.get_unrealized(price)
+        invested = matcher.cost + matcher.proceeds - matcher.realized
+        return {
+            "symbol": self.coin,
+            "balance": matcher.amount,
+            "cost": matcher.cost,
+            "value": matcher.amount * price,
+            "realized": matcher.realized,
+            "unrealized": unrealized,
+            "roi": 100.0 * (matcher.realized + unrealized) / invested
+            if invested else 0.0,
+            "unmatched": matcher.unmatched,
+            "unpriced": self.unpriced
+        }
+
+
+@timed("profits")
+def get_profits(wallets, date_time=None, currency=DEFAULT_FIAT,
+                method=CostBasisMethod.FIFO):
+    """
+    :param wallets: [] of Wallet
+        Wallets to analyze
+    :param date_time: datetime
+        Value open lots at this date (if None, last date with prices)
+    :param currency: str
+        Currency of prices and profits
+    :param method: CostBasisMethod
+        How to match disposals with lots
+    :return: [] of {}
+        Profits of each wallet
+    """
+
+    return [
+        WalletCostBasis(wallet, currency, method).get_profits(date_time)
+        for wallet in wallets
+    ]
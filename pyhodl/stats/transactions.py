@@ -19,23 +19,21 @@
 """ Get transactions stats """
 
 from pyhodl.data.parsers import build_exchanges
+from pyhodl.models.index import TimestampsIndex
 from pyhodl.updater.core import UpdateManager
 
 
 def get_transactions_dates(items):
     """
     :param items: Exchange, Wallet ...
-        Anything with 'transactions' attr
+        Anything with 'get_index' method
     :return: sorted [] of datetime
-        Sorted list of date and time of all transactions in list
+        Sorted list of date and time of all transactions in list (just
+        once, even if many transactions are done at same time)
     """
 
-    dates = []
-    for item in items:
-        dates += [
-            transaction.date for transaction in item.transactions
-        ]
-    return sorted(dates)
+    return TimestampsIndex.merge([item.get_index() for item in items]) \
+        .get_dates()
 
 
 def get_all_coins(exchanges):
@@ -48,7 +46,7 @@ def get_all_coins(exchanges):
 
     return list(set([
         coin for exchange in exchanges
-        for coin in exchange.build_wallets().keys()
+        for coin in exchange.coins()
     ]))
 
 
@@ -0,0 +1,275 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Updates exchanges data with concurrent requests on an event loop """
+
+import abc
+import asyncio
+import os
+
+from pyhodl.metrics import METRICS
+from pyhodl.updater.updaters import ExchangeUpdater, INT_32_MAX
+from pyhodl.utils import is_rate_limit_error
+
+MAX_ATTEMPTS = 3  # of a request, if rate limit is exceeded
+
+
+async def gather_all(*coroutines):
+    """
+    :param coroutines: *
+        Coroutines to run concurrently
+    :return: [] of *
+        Results of coroutines (same order), after all of them are done: a
+        coroutine that fails does not leave the others running. Raises the
+        first error (if any).
+    """
+
+    results = await asyncio.gather(*coroutines, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+    return results
+
+
+class AsyncExchangeUpdater(ExchangeUpdater):
+    """ Abstract exchange updater whose requests run concurrently """
+
+    HOST = None  # requests to exchange share limits of this host
+
+    def __init__(self, api_client, data_folder, session, **kwargs):
+        """
+        :param api_client: ApiClient
+            Async client with which to perform requests
+        :param data_folder: str
+            Folder where to save data
+        :param session: AsyncSession
+            Session whose limits of concurrent requests are shared
+        :param kwargs: **
+            Extra args of ExchangeUpdater
+        """
+
+        ExchangeUpdater.__init__(self, api_client, data_folder, **kwargs)
+
+        self.session = session
+        self.output_file = os.path.join(
+            self.folder,
+            self.class_name.replace("Async", "", 1) + ".json"
+        )  # same file as blocking updater
+
+    async def request(self, func, *args, **kwargs):
+        """
+        :param func: coroutine function
+            Request to make
+        :param args: *
+            Args of request
+        :param kwargs: **
+            Kwargs of request
+        :return: *
+            Result of request, made when host has a free slot (and keeping
+            it for at least rate seconds). If rate limit is exceeded, the
+            request is made again after waiting longer and longer.
+        """
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                async with self.session.limit(self.HOST, self.rate):
+                    return await func(*args, **kwargs)
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS or not is_rate_limit_error(e):
+                    raise
+
+                time_wait = self.rate_wait * 2 ** (attempt - 1)
+                self.log("Attempt #", attempt, ": rate limit exceeded! Wait "
+                         "time:", time_wait, "seconds before next request")
+                await asyncio.sleep(time_wait)  # slot is free meanwhile
+
+    async def gather(self, name, keys, fetch):
+        """
+        :param name: str
+            Name of what is fetched (for logs)
+        :param keys: [] of str
+            Symbols, currencies, accounts ...
+        :param fetch: coroutine function
+            Gets list of items of a key
+        :return: [] of {}
+            Items of all keys (same order as keys), fetched concurrently.
+            Keys that fail do not stop the others: when all keys are done,
+            raises ValueError with the failed ones (so that data with
+            missing keys is not saved).
+        """
+
+        results = await asyncio.gather(
+            *[fetch(key) for key in keys], return_exceptions=True
+        )
+        items, failed = [], {}
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                self.log("Cannot get", key, name, "due to", result)
+                failed[key] = result
+            else:
+                self.log("Found", len(result), key, name)
+                items += result
+
+        if failed:
+            raise ValueError("Cannot get " + name + " of", failed)
+
+        return items
+
+    @abc.abstractmethod
+    async def get_transactions(self):
+        self.log("getting transactions")
+
+    async def close(self):
+        """
+        :return: void
+            Closes connections of client
+        """
+
+        return
+
+    async def update(self, verbose):
+        self.log("updating local data")
+        with METRICS.span("http " + self.class_name):
+            await self.get_transactions()
+        self.save_data()
+        if verbose:
+            print(self.class_name, "Transactions written to", self.output_file)
+
+    @staticmethod
+    def build_updater(api_client, data_folder, session):
+        """
+        :param api_client: ApiClient
+            Async client of exchange
+        :param data_folder: str
+            Folder where to save data
+        :param session: AsyncSession
+            Session whose limits of concurrent requests are shared
+        :return: AsyncExchangeUpdater
+            Updater of exchange
+        """
+
+        name = type(api_client).__module__.split(".")[0]
+        if name == "binance":
+            return AsyncBinanceUpdater(api_client, data_folder, session)
+        elif name == "ccxt":
+            return AsyncBitfinexUpdater(api_client, data_folder, session)
+
+        raise ValueError("Cannot infer type of async API client")
+
+
+class AsyncBinanceUpdater(AsyncExchangeUpdater):
+    """ Updates Binance data (all symbols together) """
+
+    HOST = "api.binance.com"
+
+    async def get_symbols_list(self):
+        symbols = await self.request(self.client.get_all_tickers)
+        return [
+            symbol["symbol"] for symbol in symbols
+        ]
+
+    async def get_deposits(self):
+        result = await self.request(self.client.get_deposit_history)
+        return result["depositList"] if isinstance(result, dict) else result
+
+    async def get_withdraw(self):
+        result = await self.request(self.client.get_withdraw_history)
+        return result["withdrawList"] if isinstance(result, dict) else result
+
+    async def get_all_transactions(self, symbol, page_size=500):
+        trades, from_id = [], 0
+        while True:  # pages of a symbol come one after the other
+            page = await self.request(
+                self.client.get_my_trades, symbol=symbol, fromId=from_id
+            )
+            if not page:
+                return trades
+
+            for trade in page:
+                trade["symbol"] = symbol
+            trades += page
+            from_id = page[-1]["id"] + page_size + 1
+
+    async def get_transactions(self):
+        await super().get_transactions()
+        deposits, withdrawals, symbols = await gather_all(
+            self.get_deposits(), self.get_withdraw(), self.get_symbols_list()
+        )
+        self.transactions = deposits + withdrawals + await self.gather(
+            "transactions", symbols, self.get_all_transactions
+        )
+
+    async def close(self):
+        await self.client.close_connection()
+
+
+class AsyncBitfinexUpdater(AsyncExchangeUpdater):
+    """ Updates Bitfinex data (all symbols and currencies together) """
+
+    HOST = "api.bitfinex.com"
+
+    async def get_symbols_list(self):
+        await self.client.load_markets()
+        currencies = self.client.currencies
+        return [
+            "".join([
+                currencies[coin]["id"] for coin in symbol.split("/")
+            ]) for symbol in self.client.symbols
+        ]
+
+    async def get_currencies_list(self):
+        await self.client.load_markets()
+        return [
+            value["id"] for value in self.client.currencies.values()
+        ]
+
+    async def fetch_private(self, path, params):
+        data = self.client.sign(path, api="private", params=params)
+        return await self.request(
+            self.client.fetch,
+            data["url"], headers=data["headers"], body=data["body"]
+        )
+
+    async def get_all_movements(self, currency):
+        return await self.fetch_private(
+            "history/movements",
+            {"currency": currency, "limit": INT_32_MAX}
+        )
+
+    async def get_all_transactions(self, symbol):
+        trades = await self.fetch_private(
+            "mytrades",
+            {"symbol": symbol, "limit_trades": INT_32_MAX}
+        )
+        for trade in trades:
+            trade["symbol"] = symbol
+        return trades
+
+    async def get_transactions(self):
+        await super().get_transactions()
+        currencies = await self.get_currencies_list()
+        symbols = await self.get_symbols_list()
+        movements, trades = await gather_all(
+            self.gather("movements", currencies, self.get_all_movements),
+            self.gather("transactions", symbols, self.get_all_transactions)
+        )
+        self.transactions = movements + trades  # deposits and withdrawals
+
+    async def close(self):
+        await self.client.close()
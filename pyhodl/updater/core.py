@@ -18,13 +18,19 @@
 
 """ Updates exchange transactions """
 
+import asyncio
 import os
 import threading
 from datetime import datetime, timedelta
 
+from pyhodl.apis.aio import AsyncSession
 from pyhodl.apis.exchanges import ApiManager
 from pyhodl.app import ConfigManager
-from pyhodl.config import DATA_FOLDER
+from pyhodl.config import DATA_FOLDER, APP_FOLDER
+from pyhodl.data.parsers import build_parser
+from pyhodl.data.store import SqliteStore
+from pyhodl.metrics import METRICS
+from pyhodl.updater.aio import AsyncExchangeUpdater
 from pyhodl.updater.updaters import ExchangeUpdater
 from pyhodl.utils import get_actual_class_name, parse_datetime, datetime_to_str
 
@@ -32,6 +38,10 @@ UPDATE_CONFIG = os.path.join(
     DATA_FOLDER,
     "config.json"
 )
+METRICS_FILE = os.path.join(
+    APP_FOLDER,
+    "metrics.json"
+)  # metrics of last update, rewritten at each update
 
 
 class UpdateManager(ConfigManager):
@@ -99,11 +109,16 @@ class UpdateManager(ConfigManager):
 class Updater:
     """ Updates exchanges local data """
 
-    def __init__(self, config_file, verbose):
+    def __init__(self, config_file, verbose, store_file=None,
+                 exporter=None, use_async=False):
         self.manager = UpdateManager()
         self.api_manager = ApiManager(config_file=config_file)
         self.api_updaters = []
+        self.async_apis = []  # updated together on an event loop
         self.verbose = verbose
+        self.use_async = use_async
+        self.store = SqliteStore(store_file) if store_file else None
+        self.exporter = exporter  # appends new transactions after update
 
         self._build_updaters()
 
@@ -114,9 +129,13 @@ class Updater:
         if self.verbose:
             print("Updating local data...")
 
+        if self.async_apis:
+            asyncio.run(self.run_async())
+
         for updater in self.api_updaters:
             try:
                 updater.update(self.verbose)
+                self.save_update(updater)
             except Exception as e:
                 print("Cannot update", get_actual_class_name(updater),
                       "due to", e)
@@ -124,8 +143,91 @@ class Updater:
         self.manager.save_time_update()
         print("Next update:", datetime_to_str(self.manager.time_next_update()))
 
+        METRICS.save(METRICS_FILE)
+        METRICS.reset()  # next file will contain just next update
+
+    async def run_async(self):
+        """
+        :return: void
+            Updates exchanges with async clients all together, sharing
+            connections and limits of concurrent requests
+        """
+
+        async with AsyncSession() as session:
+            updaters = []
+            for api in self.async_apis:
+                try:
+                    updaters.append(AsyncExchangeUpdater.build_updater(
+                        api.get_async_client(), DATA_FOLDER, session
+                    ))
+                except Exception as e:
+                    print("Cannot authenticate client",
+                          get_actual_class_name(api), "due to", e)
+
+            results = await asyncio.gather(*[
+                updater.update(self.verbose) for updater in updaters
+            ], return_exceptions=True)
+            for updater, result in zip(updaters, results):
+                await updater.close()
+                try:
+                    if isinstance(result, Exception):
+                        raise result
+
+                    self.save_update(updater)
+                except Exception as e:
+                    print("Cannot update", get_actual_class_name(updater),
+                          "due to", e)
+
+    def save_update(self, updater):
+        """
+        :param updater: ExchangeUpdater
+            Updater that has just written its transactions
+        :return: void
+            Stores and exports new transactions of updater (if asked to)
+        """
+
+        if self.store:
+            self.save_to_store(updater)
+        if self.exporter:
+            self.export(updater)
+
+    def save_to_store(self, updater):
+        """
+        :param updater: ExchangeUpdater
+            Updater that has just written its transactions
+        :return: void
+            Adds new transactions of updater to store
+        """
+
+        exchange = build_parser(updater.output_file).build_exchange()
+        with METRICS.span("store"):
+            added = self.store.add_transactions(
+                exchange.exchange_name, exchange.transactions,
+                updater.output_file
+            )
+        if self.verbose:
+            print(added, "new", exchange.exchange_name, "transactions stored")
+
+    def export(self, updater):
+        """
+        :param updater: ExchangeUpdater
+            Updater that has just written its transactions
+        :return: void
+            Exports new transactions of updater
+        """
+
+        output_file = self.exporter.export_parser(
+            build_parser(updater.output_file)
+        )
+        if self.verbose and output_file:
+            print("Exported new transactions to", output_file)
+
     def _build_updaters(self):
         for api in self.api_manager.get_all():
+            if self.use_async and api.has_async_client():
+                self.async_apis.append(api)  # clients built in event loop
+                continue
+
             try:
                 updater = ExchangeUpdater.build_updater(
                     api.get_client(), DATA_FOLDER
@@ -29,6 +29,7 @@ from gdax.authenticated_client import AuthenticatedClient as GdaxClient
 from hal.files.save_as import write_dicts_to_json
 
 from pyhodl.logs import Logger
+from pyhodl.metrics import METRICS
 from pyhodl.utils import handle_rate_limits
 
 INT_32_MAX = 2 ** 31 - 1
@@ -71,11 +72,13 @@ class ExchangeUpdater(Logger):
 
     def save_data(self):
         self.log("saving data")
-        write_dicts_to_json(self.transactions, self.output_file)
+        with METRICS.span("write"):
+            write_dicts_to_json(self.transactions, self.output_file)
 
     def update(self, verbose):
         self.log("updating local data")
-        self.get_transactions()
+        with METRICS.span("http " + self.class_name):
+            self.get_transactions()
         self.save_data()
         if verbose:
             print(self.class_name, "Transactions written to", self.output_file)
@@ -21,15 +21,20 @@
 import functools
 import time
 from collections import Counter
-from datetime import datetime
+from datetime import datetime, timezone
 from datetime import timedelta
 
+import numpy as np
 import pytz
 import requests
 from hal.internet.web import get_tor_session, renew_connection
 
-from pyhodl.config import DATE_TIME_FORMAT, FIAT_COINS
-from pyhodl.data.coins import Coin
+from pyhodl.config import DATE_TIME_FORMAT, COINS_REGISTRY, NAN
+
+UTC = timezone.utc  # builds datetime objects faster than pytz.utc
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+MIN_TIMESTAMP = -62135596800  # 0001-01-01 (first datetime)
+MAX_TIMESTAMP = 253402300799  # 9999-12-31 23:59:59 (last datetime)
 
 
 def generate_dates(since, until, hours):
@@ -82,6 +87,19 @@ def get_actual_class_name(class_name):
     return str(type(class_name)).split("'")[-2].split(".")[-1]
 
 
+def is_rate_limit_error(error):
+    """
+    :param error: Exception
+        Error of request
+    :return: bool
+        True iff request may succeed if made again later (rate limit
+        exceeded, connection refused or timeout)
+    """
+
+    return isinstance(error, TimeoutError) or "429" in str(error) or \
+        "Connection refused" in str(error)
+
+
 def handle_rate_limits(func, time_wait=60, max_attempts=2):
     """
     :param func: callback function
@@ -114,7 +132,7 @@ def handle_rate_limits(func, time_wait=60, max_attempts=2):
                 attempt_counter += 1
                 return func(*args, **kwargs)
             except Exception as e:
-                if "429" in str(e) or "Connection refused" in str(e):
+                if is_rate_limit_error(e):
                     print(
                         function_name,
                         ">>> Attempt #", attempt_counter,
@@ -155,16 +173,134 @@ def replace_items(lst, old, new):
 
 
 def datetime_to_unix_timestamp_ms(dt):
-    return int(time.mktime(dt.timetuple()) * 1e3 + dt.microsecond / 1e3)
+    """
+    :param dt: datetime
+        Date and time (UTC if naive)
+    :return: int
+        Milliseconds since epoch
+    """
+
+    return (localize(dt) - EPOCH) // timedelta(milliseconds=1)
 
 
 def datetime_to_unix_timestamp_s(dt):
-    return int(time.mktime(dt.timetuple()) * 1e3)
+    """
+    :param dt: datetime
+        Date and time (UTC if naive)
+    :return: int
+        Seconds since epoch
+    """
+
+    return (localize(dt) - EPOCH) // timedelta(seconds=1)
+
+
+def datetimes_to_unix_timestamps(dates, unit="s"):
+    """
+    :param dates: [] of datetime or numpy array of datetime64
+        Dates and times (UTC if naive, None or NaT if missing)
+    :param unit: str
+        Unit of timestamps: "s" or "ms"
+    :return: numpy array
+        Unix timestamps (NaN if date is missing), as float. Arrays of
+        datetime64 are converted all together. Python datetime objects are
+        converted one by one: their timestamp() is faster than numpy
+        parsing them into datetime64.
+    """
+
+    if isinstance(dates, np.ndarray) and \
+            np.issubdtype(dates.dtype, np.datetime64):
+        microseconds = dates.astype("datetime64[us]")
+        seconds = microseconds.astype(np.int64) / 1e6
+        seconds[np.isnat(microseconds)] = NAN
+    else:
+        seconds = np.array([
+            NAN if dt is None else
+            dt.timestamp() if dt.tzinfo else
+            dt.replace(tzinfo=UTC).timestamp()
+            for dt in dates
+        ], dtype=np.float64)
+
+    if unit == "ms":
+        seconds *= 1e3
+
+    return seconds
 
 
 def unix_timestamp_ms_to_datetime(ms):
-    dt = datetime.fromtimestamp(float(ms) / 1e3)
-    return localize(dt)  # utc as default time zone
+    return datetime.fromtimestamp(float(ms) / 1e3, UTC)
+
+
+def unix_timestamp_s_to_datetime(seconds):
+    return datetime.fromtimestamp(float(seconds), UTC)
+
+
+def unix_timestamps_to_seconds(timestamps, unit="s"):
+    """
+    :param timestamps: [] of str, int or float
+        Unix timestamps (None if missing)
+    :param unit: str
+        Unit of timestamps: "s" or "ms"
+    :return: numpy array
+        Unix timestamps in seconds (NaN if missing or not valid), parsed
+        and scaled all together
+    """
+
+    try:
+        seconds = np.array(timestamps, dtype=np.float64)
+    except (TypeError, ValueError):  # some timestamps are not numbers
+        seconds = np.array([
+            float(timestamp) if is_number(timestamp) else None
+            for timestamp in timestamps
+        ], dtype=np.float64)
+
+    if unit == "ms":
+        seconds /= 1e3
+
+    return seconds
+
+
+def unix_timestamps_to_datetimes(timestamps, unit="s"):
+    """
+    :param timestamps: [] of str, int or float
+        Unix timestamps (None if missing)
+    :param unit: str
+        Unit of timestamps: "s" or "ms"
+    :return: [] of datetime
+        UTC dates (None if timestamp is missing or not valid). Timestamps
+        are parsed, scaled and converted to microseconds (datetime64) all
+        together, then added to EPOCH.
+    """
+
+    seconds = unix_timestamps_to_seconds(timestamps, unit)
+    valid = np.isfinite(seconds) & (seconds >= MIN_TIMESTAMP) & \
+        (seconds <= MAX_TIMESTAMP)
+    whole = np.floor(seconds[valid])
+    microseconds = whole.astype(np.int64) * 1000000 + \
+        np.round((seconds[valid] - whole) * 1e6).astype(np.int64)
+    deltas = microseconds.astype("timedelta64[us]").tolist()
+    valid_dates = map(EPOCH.__add__, deltas)  # rounded as fromtimestamp
+    if valid.all():
+        return list(valid_dates)
+
+    dates = [None] * len(seconds)  # NaN or out of range
+    for i, date in zip(np.flatnonzero(valid).tolist(), valid_dates):
+        dates[i] = date
+    return dates
+
+
+def is_number(candidate):
+    """
+    :param candidate: *
+        Candidate to check
+    :return: bool
+        True iff candidate can be converted to float
+    """
+
+    try:
+        float(candidate)
+        return True
+    except (TypeError, ValueError):
+        return False
 
 
 def download(url):
@@ -253,4 +389,4 @@ def is_crypto(coin):
         True iff coin is among crypto supported
     """
 
-    return not Coin(coin) in FIAT_COINS
+    return COINS_REGISTRY.is_crypto(coin)
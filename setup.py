@@ -44,7 +44,7 @@ setup(
     license="Apache License, Version 2.0",
     keywords="crypto hodl portfolio",
     url="https://github.com/sirfoga/pyhodl",
-    packages=find_packages(exclude=["tests"]),
+    packages=find_packages(exclude=["tests", "benchmarks"]),
     package_data={"pyhodl": [".json", "pyhodl/data/raw/*.json"]},
     include_package_data=True,
     install_requires=[
@@ -58,6 +58,10 @@ setup(
         "ccxt",
         "pytz", 'requests', 'ciso8601'
     ],
+    extras_require={
+        "export": ["pyarrow"],
+        "async": ["aiohttp"]
+    },
     entry_points={
         "console_scripts": ["pyhodl = pyhodl.cli:cli"]
     }
@@ -0,0 +1,143 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Test pyhodl.apis module """
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from pyhodl.apis import prices
+
+
+class FakeClient:
+    """ Counts batches of current prices requested """
+
+    def __init__(self):
+        self.batches = []
+
+    def get_current_price(self, coins, currency):
+        """
+        :param coins: [] of str
+            List of coins
+        :param currency: str
+            Convert prices to this currency
+        :return: {}
+            Same price for all coins
+        """
+
+        self.batches.append(list(coins))
+        return {coin: 10.0 for coin in coins}
+
+
+class TestCurrentPrices(unittest.TestCase):
+    """ Tests of current prices shared across calls and runs """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.folder, "current_prices.json")
+        self.client = FakeClient()
+        self.patches = [
+            mock.patch.object(prices, "CURRENT_PRICES_FILE", self.cache_file),
+            mock.patch.dict(prices.CURRENT_PRICES_CACHE, clear=True),
+            mock.patch.object(
+                prices, "get_client", return_value=self.client
+            )
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        shutil.rmtree(self.folder)
+
+    def test_batch(self):
+        current = prices.get_current_prices(
+            ["BTC", "ETH", "BTC", "USD"], "USD", None
+        )
+        self.assertEqual(current, {"BTC": 10.0, "ETH": 10.0, "USD": 1.0})
+        self.assertEqual(self.client.batches, [["BTC", "ETH"]])
+
+        prices.get_current_prices(["ETH", "BTC"], "USD", None)
+        self.assertEqual(len(self.client.batches), 1)  # all cached
+
+    def test_file(self):
+        prices.get_current_prices(["BTC"], "USD", None)
+        with open(self.cache_file) as reader:
+            self.assertEqual(json.load(reader)["USD"]["BTC"][1], 10.0)
+
+        prices.CURRENT_PRICES_CACHE.clear()  # as in another run
+        prices.get_current_prices(["BTC"], "USD", None)
+        self.assertEqual(len(self.client.batches), 1)
+
+    def test_expired(self):
+        fetched = time.time() - prices.CURRENT_PRICES_TTL - 1
+        prices.save_current_prices(
+            {("USD", "BTC"): (fetched, 5.0)}, self.cache_file
+        )
+        self.assertEqual(prices.load_current_prices(self.cache_file), {})
+
+        prices.CURRENT_PRICES_CACHE[("USD", "BTC")] = (fetched, 5.0)
+        current = prices.get_current_prices(["BTC"], "USD", None)
+        self.assertEqual(current["BTC"], 10.0)
+        self.assertEqual(self.client.batches, [["BTC"]])
+
+    def test_concurrent_save(self):
+        cache = {("USD", "BTC"): (time.time(), 5.0)}
+        threads = [
+            threading.Thread(
+                target=prices.save_current_prices,
+                args=(cache, self.cache_file)
+            ) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(os.listdir(self.folder), ["current_prices.json"])
+        self.assertEqual(
+            prices.load_current_prices(self.cache_file)[("USD", "BTC")][1],
+            5.0
+        )
+
+    def test_failed_save(self):
+        with mock.patch.object(prices.os, "replace", side_effect=OSError):
+            prices.save_current_prices(
+                {("USD", "BTC"): (time.time(), 5.0)}, self.cache_file
+            )
+        self.assertEqual(os.listdir(self.folder), [])  # temp file removed
+
+    def test_bad_file(self):
+        with open(self.cache_file, "w") as writer:
+            writer.write("{not json")
+        self.assertEqual(prices.load_current_prices(self.cache_file), {})
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,618 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Test pyhodl.data module """
+
+import json
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+
+from pyhodl.cli import store_new_files
+from pyhodl.config import DATE_TIME_KEY
+from pyhodl.data import coins, core
+from pyhodl.data.balance import BalancesSeries
+from pyhodl.data.coins import Coin, CryptoCoin, CoinsRegistry
+from pyhodl.data.core import BinanceParser, CryptoParser
+from pyhodl.data.export import Exporter, get_prices_columns, pa
+from pyhodl.data.filters import TransactionsFilter
+from pyhodl.data.rejects import RejectsSink
+from pyhodl.data.store import SqliteStore
+from pyhodl.data.tables import PRICES_TABLES, CoinPricesTable
+from pyhodl.data.watch import DataWatcher
+from pyhodl.models.transactions import TransactionType
+from pyhodl.utils import UTC, datetime_to_str, \
+    datetimes_to_unix_timestamps, unix_timestamps_to_datetimes
+
+SINCE = datetime(2018, 1, 1, tzinfo=UTC)
+
+
+def to_ms(date_time):
+    return int(round(date_time.timestamp() * 1e3))
+
+
+def get_binance_trade(i, date_time, symbol="ETHBTC", fee_coin="BNB"):
+    """
+    :param i: int
+        Id of trade
+    :param date_time: datetime
+        Date of trade
+    :param symbol: str
+        Market of trade
+    :param fee_coin: str
+        Coin of fee
+    :return: {}
+        Raw Binance trade buying 2 coins at 0.05
+    """
+
+    return {
+        "symbol": symbol, "id": i, "orderId": i, "price": "0.05",
+        "qty": "2.0", "commission": "0.01", "commissionAsset": fee_coin,
+        "time": to_ms(date_time), "isBuyer": True, "isMaker": False,
+        "isBestMatch": True
+    }
+
+
+def get_binance_deposit(i, date_time, coin="BTC"):
+    """
+    :param i: int
+        Id of deposit
+    :param date_time: datetime
+        Date of deposit
+    :param coin: str
+        Coin deposited
+    :return: {}
+        Raw Binance deposit of 1 coin
+    """
+
+    return {
+        "insertTime": to_ms(date_time), "amount": 1.0, "asset": coin,
+        "address": "address", "txId": "tx" + str(i), "status": 1
+    }
+
+
+def get_binance_raws(size):
+    """
+    :param size: int
+        Number of trades
+    :return: [] of {}
+        A deposit, then trades an hour apart
+    """
+
+    return [get_binance_deposit(0, SINCE)] + [
+        get_binance_trade(i, SINCE + timedelta(hours=i))
+        for i in range(1, size + 1)
+    ]
+
+
+def write_json(data, output_file):
+    with open(output_file, "w") as writer:
+        json.dump(data, writer)
+
+
+def parse_binance(raws, filters=None):
+    """
+    :param raws: [] of {}
+        Raw Binance transactions
+    :param filters: TransactionsFilter
+        Transactions to keep
+    :return: tuple ([] of Transaction, RejectsSink)
+        Transactions parsed and rejects
+    """
+
+    rejects = RejectsSink(None)
+    parser = BinanceParser(
+        "binance.json", raws, rejects=rejects, filters=filters
+    )
+    return list(parser.get_transactions_list()), rejects
+
+
+class TestCoins(unittest.TestCase):
+    """ Basic test class to test pyhodl.data.coins module"""
+
+    def test_eq(self):
+        """ The actual test. Any method which starts with ``test_`` will
+        considered as a test case.
+        """
+
+        symbol = "USD"
+        coin = Coin(symbol)
+        crypto_coin = Coin(symbol)
+        self.assertTrue(symbol == coin == crypto_coin)
+
+    def test_eq_crypto(self):
+        """ The actual test. Any method which starts with ``test_`` will
+        considered as a test case.
+        """
+
+        btc = CryptoCoin("btc", "bitcoin")
+        bch = CryptoCoin("bch", "bitcoin-cash")
+        self.assertFalse(btc == bch)
+
+        btc_malformed = CryptoCoin(
+            "bt?", name="bitcoin", other_names=["bitcoin"]
+        )
+        self.assertTrue(btc == btc_malformed)
+
+        btc_very_malformed = CryptoCoin(
+            "bt?", name="b--", other_names=["bitcoin"]
+        )
+        self.assertTrue(btc == btc_very_malformed)
+        self.assertTrue(btc_malformed == btc_very_malformed)
+
+        btc_malformed.symbol = "btcccccc"
+        self.assertTrue(btc_malformed == btc_very_malformed)
+
+    def test_registry(self):
+        """ The actual test. Any method which starts with ``test_`` will
+        considered as a test case.
+        """
+
+        btc = CryptoCoin("btc", "bitcoin", other_names=["xbt"])
+        registry = CoinsRegistry([btc], [Coin("usd")])
+        self.assertTrue(registry.get_by_symbol("BTC") is btc)
+        self.assertTrue(registry.get_by_name("XBT") is btc)
+        self.assertTrue(registry.get("eth") is registry.get("ETH"))
+        self.assertTrue(registry.is_crypto(btc))
+        self.assertFalse(registry.is_crypto("usd"))
+        self.assertEqual({"BTC": 1}[btc], 1)  # hashed as its symbol
+        self.assertTrue(btc == "btc" == Coin("BTC"))
+        self.assertFalse(btc == "bitcoin")
+
+        registry.get("xyz")
+        self.assertTrue(registry.get("XYZ") is registry.get("xyz"))
+        self.assertIsNone(registry.get_by_symbol("XYZ"))  # not supported
+
+    @mock.patch.object(coins, "MAX_UNKNOWN_COINS", 2)
+    def test_registry_unknown(self):
+        """ Coins not supported are interned up to a limit """
+
+        registry = CoinsRegistry([], [])
+        for symbol in ["a", "b", "c", "d"]:
+            self.assertEqual(registry.get(symbol), symbol)
+        self.assertEqual(len(registry.unknown), 2)
+        self.assertFalse(registry.get("c") is registry.get("c"))
+
+
+class TestBalancesSeries(unittest.TestCase):
+    """ Tests of series of balance snapshots """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.series = BalancesSeries("test", self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def append(self, date_time, value):
+        self.series.append([
+            {"symbol": "BTC", "balance": 1.0, "value": value},
+            {"symbol": "XRP", "balance": 1.0, "value": float("nan")}
+        ], date_time)
+
+    def test_append(self):
+        for hours in range(3):
+            self.append(SINCE + timedelta(hours=hours), 10.0 + hours)
+
+        self.assertEqual(len(self.series), 3)
+        last = self.series.get_last()
+        self.assertEqual(last["BTC"]["value"], 12.0)
+        self.assertNotIn("XRP", last)  # not priced
+        self.assertEqual(last[DATE_TIME_KEY], SINCE + timedelta(hours=2))
+
+        before = self.series.get_snapshot_before(
+            SINCE + timedelta(hours=1, minutes=30)
+        )
+        self.assertEqual(before["BTC"]["value"], 11.0)
+        self.assertIsNone(
+            self.series.get_snapshot_before(SINCE - timedelta(hours=1))
+        )
+
+    def test_rollups(self):
+        for hours in [0, 1, 25]:
+            self.append(SINCE + timedelta(hours=hours), 10.0 + hours)
+
+        dates, values = self.series.get_total_values("daily")
+        self.assertEqual(values, [10.0, 35.0])  # first of each day
+        dates, values = self.series.get_total_values("hourly")
+        self.assertEqual(values, [10.0, 11.0, 35.0])
+        self.assertEqual(dates[0], SINCE)
+
+    def test_appended_by_others(self):
+        self.append(SINCE, 10.0)
+        other = BalancesSeries("test", self.folder)
+        self.assertEqual(len(other), 1)
+        self.append(SINCE + timedelta(hours=1), 11.0)
+        self.assertEqual(len(other), 2)  # reads just new lines
+
+
+class TestFilters(unittest.TestCase):
+    """ Tests of filters of transactions """
+
+    def test_dates_mask(self):
+        filters = TransactionsFilter(SINCE, SINCE + timedelta(days=1))
+        timestamps = SINCE.timestamp() + \
+            np.array([-1.0, 0.0, 86400.0, 86401.0, math.nan])
+        self.assertEqual(
+            filters.get_dates_mask(timestamps).tolist(),
+            [False, True, True, False, True]  # missing ones are rejected
+        )
+        self.assertTrue(TransactionsFilter().is_empty())
+
+    def test_coins(self):
+        filters = TransactionsFilter(coins=["btc"])
+        self.assertTrue(filters.contains_coins("ETH", "BTC"))
+        self.assertFalse(filters.contains_coins("ETH", None))
+        self.assertTrue(TransactionsFilter().contains_coins("ETH"))
+
+
+class TestParsers(unittest.TestCase):
+    """ Tests of parsers of exchanges dumps """
+
+    def test_parse(self):
+        transactions, rejects = parse_binance(get_binance_raws(3))
+        self.assertEqual(len(transactions), 4)
+        self.assertEqual(rejects.records, [])
+
+        deposit, trade = transactions[0], transactions[1]
+        self.assertEqual(deposit.transaction_type, TransactionType.DEPOSIT)
+        self.assertEqual(deposit.coin_buy, "BTC")
+        self.assertEqual(deposit.date, SINCE)
+        self.assertEqual(trade.transaction_type, TransactionType.TRADING)
+        self.assertEqual((trade.coin_buy, trade.coin_sell), ("ETH", "BTC"))
+        self.assertAlmostEqual(trade.buy_amount, 2.0)
+        self.assertAlmostEqual(trade.sell_amount, 0.1)
+        self.assertEqual(trade.commission.coin, "BNB")
+        self.assertEqual(trade.date, SINCE + timedelta(hours=1))
+
+    def test_rejects(self):
+        raws = get_binance_raws(3)
+        raws[1]["qty"] = "not a number"
+        raws[2]["time"] = "not a date"
+        raws.append(None)  # cannot be classified
+        transactions, rejects = parse_binance(raws)
+        self.assertEqual(len(transactions), 2)
+        self.assertEqual(
+            [(record["index"], record["reason"]) for record in
+             rejects.records],
+            [(1, "values"), (2, "date"), (4, "type")]
+        )
+        self.assertEqual(rejects.counts["binance.json"]["values"], 1)
+
+    def test_filters(self):
+        raws = get_binance_raws(3)
+        raws.append(get_binance_trade(9, SINCE, "LTCBTC", fee_coin="LTC"))
+        transactions, _ = parse_binance(
+            raws, TransactionsFilter(coins=["BNB"])
+        )
+        self.assertEqual(len(transactions), 3)  # fees are paid in BNB
+
+        transactions, _ = parse_binance(
+            raws, TransactionsFilter(
+                SINCE + timedelta(minutes=30),
+                SINCE + timedelta(hours=2),
+                ["ETH"]
+            )
+        )
+        self.assertEqual(
+            [transaction.date for transaction in transactions],
+            [SINCE + timedelta(hours=1), SINCE + timedelta(hours=2)]
+        )
+
+    @mock.patch.object(core, "PARALLEL_MIN_TRANSACTIONS", 0)
+    def test_parallel(self):
+        """ Chunks parsed by many processes are merged by date """
+
+        raws = list(reversed(get_binance_raws(20)))
+        raws[3]["qty"] = "not a number"
+        rejects = RejectsSink(None)
+        parser = BinanceParser(
+            "binance.json", raws, max_workers=2, rejects=rejects
+        )
+        transactions = list(parser.get_transactions_list())
+        serial, _ = parse_binance(raws)
+
+        self.assertEqual(len(transactions), 20)
+        self.assertEqual(
+            [transaction.date for transaction in transactions],
+            sorted(transaction.date for transaction in serial)
+        )
+        indexes = {id(raw): i for i, raw in enumerate(raws)}
+        self.assertEqual(
+            [indexes[id(transaction.raw)] for transaction in transactions],
+            [i for i in reversed(range(len(raws))) if i != 3]
+        )  # with their raw data
+        self.assertEqual(
+            [(record["index"], record["raw"]) for record in rejects.records],
+            [(3, raws[3])]
+        )
+
+    def test_raw_date(self):
+        parser = BinanceParser("binance.json", [])
+        raw = get_binance_trade(1, SINCE)
+        self.assertEqual(
+            parser.get_raw_date(raw, TransactionType.TRADING), to_ms(SINCE)
+        )
+        self.assertEqual(
+            CryptoParser.get_raw_date(parser, raw, TransactionType.TRADING),
+            to_ms(SINCE)
+        )  # default one, from parsed date
+
+    def test_timestamps(self):
+        dates = unix_timestamps_to_datetimes(
+            ["1514764800", 1514764800.5, None, "x", float("nan"), 1e20]
+        )
+        self.assertEqual(dates[0], SINCE)
+        self.assertEqual(dates[1], SINCE + timedelta(milliseconds=500))
+        self.assertEqual(dates[2:], [None] * 4)
+        self.assertEqual(
+            unix_timestamps_to_datetimes([1514764800123.0], "ms"),
+            [datetime.fromtimestamp(1514764800.123, UTC)]
+        )
+
+        dates = [SINCE, None, datetime(2018, 1, 1, 0, 0, 0, 500)]
+        expected = [1514764800.0, math.nan, 1514764800.0005]
+        np.testing.assert_array_equal(
+            datetimes_to_unix_timestamps(dates), expected
+        )  # naive is UTC
+        np.testing.assert_array_equal(
+            datetimes_to_unix_timestamps(
+                np.array([date and date.replace(tzinfo=None)
+                          for date in dates], dtype="datetime64[us]")
+            ), expected
+        )
+
+
+class TestStore(unittest.TestCase):
+    """ Tests of SQLite store """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.store = SqliteStore(os.path.join(self.folder, "store.sqlite"))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.folder)
+
+    def test_transactions(self):
+        transactions, _ = parse_binance(get_binance_raws(3))
+        self.assertEqual(self.store.add_transactions(
+            "binance", transactions, "binance.json"), 4)
+        self.assertEqual(self.store.add_transactions(
+            "binance", transactions, "binance.json"), 0)
+
+        stored = self.store.get_transactions("binance")
+        self.assertEqual(
+            [transaction.get_key() for transaction in stored],
+            [transaction.get_key() for transaction in transactions]
+        )
+        self.assertEqual(len(self.store.get_transactions(coin="ETH")), 3)
+        self.assertEqual(len(self.store.get_transactions(
+            filters=TransactionsFilter(coins=["btc"]))), 4)
+
+    def test_replaced(self):
+        """ Transactions of a file parsed again replace the old ones """
+
+        raws = get_binance_raws(3)
+        transactions, _ = parse_binance(raws)
+        self.store.add_transactions("binance", transactions, "binance.json")
+
+        raws[1]["qty"] = "3.0"  # corrected
+        transactions, _ = parse_binance(raws[:-1])  # last one removed
+        self.assertEqual(self.store.add_transactions(
+            "binance", transactions, "binance.json"), -1)
+        stored = self.store.get_transactions("binance")
+        self.assertEqual(len(stored), 3)
+        self.assertAlmostEqual(stored[1].buy_amount, 3.0)
+
+    def test_identical_fills(self):
+        raws = get_binance_raws(1)
+        raws.append(dict(raws[1], id=2))  # same fill twice
+        transactions, _ = parse_binance(raws)
+        self.assertEqual(self.store.add_transactions(
+            "binance", transactions, "binance.json"), 3)
+        self.assertEqual(self.store.add_transactions(
+            "binance", transactions, "binance.json"), 0)
+        self.assertEqual(len(self.store.get_transactions("binance")), 3)
+
+        self.assertEqual(self.store.add_transactions(
+            "binance", transactions[1:], "other.json"), 2)  # other fills
+        self.assertEqual(len(self.store.get_transactions("binance")), 5)
+
+    def test_new_files(self):
+        input_file = os.path.join(self.folder, "binance.json")
+        write_json(get_binance_raws(1), input_file)
+        self.assertEqual(store_new_files(self.store, self.folder), 2)
+        self.assertEqual(store_new_files(self.store, self.folder), 0)
+
+        os.remove(input_file)
+        store_new_files(self.store, self.folder)
+        self.assertEqual(self.store.get_transactions(), [])
+
+    def test_migrate(self):
+        self.store.close()
+        db_file = os.path.join(self.folder, "old.sqlite")
+        connection = sqlite3.connect(db_file)
+        connection.executescript(
+            "CREATE TABLE transactions (exchange TEXT NOT NULL, "
+            "date REAL NOT NULL, type TEXT NOT NULL, coin_buy TEXT NOT NULL, "
+            "buy_amount REAL NOT NULL, coin_sell TEXT NOT NULL, "
+            "sell_amount REAL NOT NULL, successful INTEGER NOT NULL, "
+            "fee_coin TEXT NOT NULL, fee_amount REAL NOT NULL, raw TEXT);"
+            "CREATE UNIQUE INDEX transactions_key ON transactions (exchange, "
+            "date, type, coin_buy, buy_amount, coin_sell, sell_amount, "
+            "successful, fee_coin, fee_amount);"
+        )
+        connection.close()
+
+        self.store = SqliteStore(db_file)
+        transactions, _ = parse_binance(get_binance_raws(1))
+        self.assertEqual(self.store.add_transactions(
+            "binance", transactions, "binance.json"), 2)
+
+    def test_files(self):
+        input_file = os.path.join(self.folder, "binance.json")
+        write_json(get_binance_raws(1), input_file)
+        self.assertFalse(self.store.is_file_stored(input_file))
+        self.store.set_file_stored(input_file)
+        self.assertTrue(self.store.is_file_stored(input_file))
+
+        write_json(get_binance_raws(2), input_file)
+        self.assertFalse(self.store.is_file_stored(input_file))
+
+    def test_prices(self):
+        self.store.add_prices("usd", [
+            {DATE_TIME_KEY: SINCE, "BTC": 10.0, "ETH": "N/A"},
+            {DATE_TIME_KEY: SINCE + timedelta(days=1), "BTC": 11.0}
+        ])
+        prices = self.store.get_prices("USD", ["BTC"])
+        self.assertEqual([item["BTC"] for item in prices], [10.0, 11.0])
+        self.assertEqual(prices[0][DATE_TIME_KEY], SINCE)
+        self.assertIsNone(self.store.get_prices("USD", ["ETH"])[0]["ETH"])
+
+
+class TestWatcher(unittest.TestCase):
+    """ Tests of watcher of data files """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.data_folder = os.path.join(self.folder, "data")
+        self.historical_folder = os.path.join(self.folder, "historical")
+        os.makedirs(self.data_folder)
+        self.input_file = os.path.join(self.data_folder, "binance.json")
+        write_json(get_binance_raws(2), self.input_file)
+        self.watcher = DataWatcher(self.data_folder, self.historical_folder)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.folder)
+
+    def test_changes(self):
+        self.assertEqual(len(self.watcher.get_exchanges()), 1)
+        self.assertEqual(self.watcher.poll(), [])
+
+        write_json(get_binance_raws(3), self.input_file)
+        changes = self.watcher.poll()
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(len(changes[0]["added"]), 1)
+        self.assertEqual(changes[0]["removed"], [])
+
+        os.remove(self.input_file)
+        changes = self.watcher.poll()
+        self.assertEqual(len(changes[0]["removed"]), 4)
+        self.assertEqual(self.watcher.get_exchanges(), [])
+
+    def test_half_written(self):
+        with open(self.input_file, "w") as writer:
+            writer.write(json.dumps(get_binance_raws(3))[:100])
+        self.assertEqual(self.watcher.poll(), [])  # retried later
+        self.assertEqual(len(self.watcher.get_exchanges()), 1)
+
+        write_json(get_binance_raws(3), self.input_file)
+        changes = self.watcher.poll()
+        self.assertEqual(len(changes[0]["added"]), 1)
+
+    def test_folders_created(self):
+        """ Folders created after watcher are watched too """
+
+        self.watcher.close()
+        shutil.rmtree(self.data_folder)
+        self.watcher = DataWatcher(self.data_folder, self.historical_folder)
+        self.assertEqual(self.watcher.get_exchanges(), [])
+
+        os.makedirs(self.data_folder)
+        write_json(get_binance_raws(2), self.input_file)
+        changes = self.watcher.poll()
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(len(changes[0]["added"]), 3)
+
+    @mock.patch.dict(PRICES_TABLES, {"USD": CoinPricesTable("USD", [])})
+    def test_prices(self):
+        """ Prices are read from historical folder of watcher """
+
+        os.makedirs(self.historical_folder)
+        write_json(
+            [{DATE_TIME_KEY: datetime_to_str(SINCE), "BTC": 10.0}],
+            os.path.join(self.historical_folder, "usd.json")
+        )
+        changes = self.watcher.poll()
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]["since"], SINCE)
+        self.assertEqual(
+            PRICES_TABLES["USD"].get_values_on(SINCE)["BTC"], 10.0
+        )
+
+
+class TestExport(unittest.TestCase):
+    """ Tests of export to columnar files """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_prices_columns(self):
+        table = CoinPricesTable("USD", content=[
+            {DATE_TIME_KEY: SINCE, "BTC": 10.0},
+            {DATE_TIME_KEY: SINCE + timedelta(days=1), "BTC": 11.0, "ETH": 1.0}
+        ])
+        columns = get_prices_columns(table, ["BTC", "ETH"], 0, 2)
+        self.assertEqual(columns["coin"], ["BTC", "BTC", "ETH"])
+        self.assertEqual(columns["price"].tolist(), [10.0, 11.0, 1.0])
+        self.assertEqual(
+            columns[DATE_TIME_KEY].tolist()[0], int(SINCE.timestamp() * 1e6)
+        )
+
+    @unittest.skipIf(pa is None, "needs pyarrow")
+    def test_transactions(self):
+        exporter = Exporter(self.folder, "arrow")
+        raws = get_binance_raws(2)
+        transactions, _ = parse_binance(raws)
+        self.assertIsNotNone(
+            exporter.export_transactions("binance", transactions)
+        )
+        self.assertIsNone(exporter.export_transactions("binance",
+                                                       transactions))
+
+        raws.append(dict(raws[-1], id=3))  # same time as last one
+        raws.append(get_binance_trade(4, SINCE - timedelta(days=1)))
+        transactions, _ = parse_binance(raws)
+        self.assertIsNotNone(
+            exporter.export_transactions("binance", transactions)
+        )
+        keys_file = os.path.join(
+            self.folder, "transactions", "binance", "exported.keys"
+        )
+        with open(keys_file) as reader:
+            self.assertEqual(len(reader.readlines()), 5)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
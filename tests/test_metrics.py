@@ -0,0 +1,77 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Test pyhodl.metrics module """
+
+import asyncio
+import time
+import unittest
+
+from pyhodl.metrics import Metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """ Tests of time spent in stages """
+
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def get_span(self, stage):
+        return self.metrics.get_summary()["spans"][stage]
+
+    def test_nested(self):
+        with self.metrics.span("outer"):
+            with self.metrics.span("inner"):
+                time.sleep(0.05)
+            with self.metrics.span("outer"):  # recursion
+                time.sleep(0.05)
+
+        outer, inner = self.get_span("outer"), self.get_span("inner")
+        self.assertEqual(outer["calls"], 2)
+        self.assertGreaterEqual(inner["seconds"], 0.05)
+        self.assertLess(outer["seconds"], 0.15)  # recursion counted once
+        self.assertAlmostEqual(
+            outer["self_seconds"] + inner["self_seconds"],
+            outer["seconds"], places=2
+        )
+
+    def test_concurrent(self):
+        """ Spans of concurrent coroutines do not nest """
+
+        async def _request():
+            with self.metrics.span("http"):
+                await asyncio.sleep(0.1)
+
+        async def _requests():
+            await asyncio.gather(*[_request() for _ in range(5)])
+
+        asyncio.run(_requests())
+        http = self.get_span("http")
+        self.assertEqual(http["calls"], 5)
+        self.assertGreaterEqual(http["seconds"], 0.5)
+        self.assertAlmostEqual(
+            http["self_seconds"], http["seconds"], places=6
+        )
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Test pyhodl.models module """
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from pyhodl.config import DATE_TIME_KEY
+from pyhodl.data.balance import BalancesSeries
+from pyhodl.data.tables import CoinPricesTable
+from pyhodl.models.exchanges import CryptoExchange, Portfolio
+from pyhodl.models.index import TimestampsIndex, TransactionsIndex
+from pyhodl.models.ledger import Ledger, get_coins_deltas
+from pyhodl.models.transactions import Commission, Transaction, \
+    TransactionType
+from pyhodl.models.valuation import PortfolioValuation, StreamingValuation
+from pyhodl.utils import UTC
+
+SINCE = datetime(2018, 1, 1, tzinfo=UTC)
+
+
+def get_transactions():
+    """
+    :return: [] of Transaction
+        Deposit, trades (one paying fee in a third coin, one failed) and
+        withdrawal, not sorted by date
+    """
+
+    def _at(hours):
+        return SINCE + timedelta(hours=hours)
+
+    return [
+        Transaction(
+            {}, "ETH", 2.0, "BTC", 0.1, _at(2),
+            commission=Commission({}, "BNB", 0.01, _at(2))
+        ),
+        Transaction(
+            {}, "BTC", 1.0, None, 0, _at(0),
+            trans_type=TransactionType.DEPOSIT
+        ),
+        Transaction({}, "ETH", 5.0, "BTC", 0.5, _at(3), successful=False),
+        Transaction(
+            {}, None, 0, "ETH", 0.5, _at(4),
+            trans_type=TransactionType.WITHDRAWAL
+        ),
+        Transaction(
+            {}, "BTC", 0.05, "ETH", 1.0, _at(2),
+            commission=Commission({}, "BTC", 0.001, _at(2))
+        )
+    ]
+
+
+class TestPortfolio(unittest.TestCase):
+    """ Tests of balances of portfolios """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_show_balance_empty_series(self):
+        """ First balance is appended to a new (empty) series """
+
+        series = BalancesSeries("test", self.folder)
+        self.assertEqual(len(series), 0)
+
+        balances = [
+            {
+                "symbol": "BTC", "balance": 2.0, "value": 20.0,
+                "price": 10.0, "percentage": 100.0
+            }
+        ]
+        total = Portfolio([]).show_balance(series, balances)
+        self.assertEqual(total, 20.0)
+        self.assertEqual(len(series), 1)
+        self.assertTrue(os.path.exists(series.files[None]))
+
+        last = series.get_last()
+        self.assertEqual(last["BTC"]["balance"], 2.0)
+        self.assertEqual(last["BTC"]["value"], 20.0)
+
+
+class TestLedger(unittest.TestCase):
+    """ Tests of single-pass ledger of coins deltas """
+
+    def test_same_as_transactions(self):
+        """ Deltas are the same as asking each transaction each coin """
+
+        transactions = get_transactions()
+        for transaction in transactions:
+            deltas = get_coins_deltas(transaction)
+            for coin in ["BTC", "ETH", "BNB"]:
+                self.assertAlmostEqual(
+                    deltas.get(coin, 0.0), transaction.get_amount(coin)
+                )
+
+    def test_wallets(self):
+        ledger = Ledger(get_transactions())
+        self.assertEqual(sorted(ledger.coins()), ["BNB", "BTC", "ETH"])
+
+        wallets = ledger.build_wallets()
+        balances = {
+            coin: sum(wallet.deltas) for coin, wallet in wallets.items()
+        }
+        self.assertAlmostEqual(balances["BTC"], 1.0 - 0.1 + 0.05 - 0.001)
+        self.assertAlmostEqual(balances["ETH"], 2.0 - 1.0 - 0.5)
+        self.assertAlmostEqual(balances["BNB"], -0.01)
+
+        timestamps, deltas, _ = ledger.get_deltas("ETH")
+        self.assertTrue(np.all(np.diff(timestamps) >= 0))  # sorted
+        self.assertEqual(deltas.tolist(), [2.0, -1.0, -0.5])  # ties in order
+
+
+class TestIndex(unittest.TestCase):
+    """ Tests of indexes of dates """
+
+    def test_timestamps(self):
+        index = TimestampsIndex([3.0, 1.0, np.nan, 2.0, 2.0])
+        self.assertEqual(index.timestamps.tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual((index.first(), index.last()), (1.0, 3.0))
+        self.assertEqual(index.get_window(1.5, 3.0), (1, 3))
+        self.assertEqual(index.get_timestamps(until=2.0).tolist(),
+                         [1.0, 2.0])
+        self.assertEqual(index.get_window(5.0, 4.0), (3, 3))  # empty
+
+        merged = TimestampsIndex.merge([index, TimestampsIndex([0.0, 3.0])])
+        self.assertEqual(merged.timestamps.tolist(), [0.0, 1.0, 2.0, 3.0])
+        self.assertTrue(np.isnan(TimestampsIndex([]).first()))
+
+    def test_transactions(self):
+        transactions = get_transactions()
+        index = TransactionsIndex(transactions)
+        self.assertIs(index.get_first_transaction(), transactions[1])
+        self.assertIs(index.get_last_transaction(), transactions[3])
+        self.assertEqual(
+            index.get_transactions(
+                SINCE + timedelta(hours=1), SINCE + timedelta(hours=2)
+            ),
+            [transactions[0], transactions[4]]  # ties in original order
+        )
+        self.assertEqual(
+            index.get_dates(since=SINCE + timedelta(hours=4)),
+            [SINCE + timedelta(hours=4)]
+        )
+
+
+class TestValuation(unittest.TestCase):
+    """ Tests of crypto and fiat values of portfolios """
+
+    def setUp(self):
+        wallets = CryptoExchange(
+            get_transactions() + [
+                Transaction(
+                    {}, "USD", 100.0, None, 0, SINCE + timedelta(days=1),
+                    trans_type=TransactionType.DEPOSIT
+                )
+            ], "test"
+        ).build_wallets()
+        self.wallets = [wallets[coin] for coin in sorted(wallets)]
+        self.prices_table = CoinPricesTable("USD", content=[
+            {DATE_TIME_KEY: SINCE, "BTC": 10000.0, "ETH": 1000.0},
+            {DATE_TIME_KEY: SINCE + timedelta(days=1), "BTC": 11000.0}
+        ])
+
+    def test_matrix(self):
+        valuation = PortfolioValuation(self.wallets, "USD")
+        valuation.prices_table = self.prices_table
+        dates = [SINCE + timedelta(hours=hours) for hours in [0, 2, 24]]
+        crypto, fiat = valuation.get_crypto_fiat_values(dates)
+        self.assertAlmostEqual(crypto[0], 10000.0)
+        self.assertAlmostEqual(
+            crypto[1], 0.949 * 10000.0 + 1.0 * 1000.0  # BNB not priced
+        )
+        self.assertAlmostEqual(crypto[2], 0.949 * 11000.0)  # no ETH price
+        self.assertEqual(fiat.tolist(), [0.0, 0.0, 100.0])
+
+    def test_streaming(self):
+        """ Streaming values are the same as the matrix ones """
+
+        valuation = PortfolioValuation(self.wallets, "USD")
+        streaming = StreamingValuation(self.wallets, "USD")
+        valuation.prices_table = streaming.prices_table = self.prices_table
+        timestamps, crypto, fiat = zip(*streaming.iter_values())
+        expected = valuation.get_crypto_fiat_values(np.array(timestamps))
+        np.testing.assert_allclose(crypto, expected[0])
+        np.testing.assert_allclose(fiat, expected[1])
+        self.assertEqual(len(timestamps), 4)  # once for each date (done)
+
+    def test_streaming_lazy(self):
+        """ Streaming looks up prices just on dates it needs """
+
+        streaming = StreamingValuation(self.wallets, "USD")
+        streaming.prices_table = self.prices_table
+        values = streaming.iter_values()
+        self.assertEqual(next(values)[1], 10000.0)
+        self.assertEqual(self.prices_table.columns, {})  # no full column
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
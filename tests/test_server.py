@@ -0,0 +1,163 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Test pyhodl.server module """
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+
+from pyhodl.server.core import QueryServer, ServerState
+from tests.test_data import get_binance_raws, write_json
+
+
+class TestServerState(unittest.TestCase):
+    """ Tests of queries of data in memory """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.folder, "binance.json")
+        write_json(get_binance_raws(2), self.input_file)
+        self.state = ServerState(self.folder)
+        self.state.refresh(force=True)
+
+    def tearDown(self):
+        self.state.watcher.close()
+        shutil.rmtree(self.folder)
+
+    def test_cache(self):
+        exchanges = self.state.query("exchanges")
+        self.assertEqual(exchanges[0]["name"], "binance")
+        self.assertEqual(exchanges[0]["transactions"], 3)
+        self.assertIs(self.state.query("exchanges"), exchanges)  # cached
+
+        write_json(get_binance_raws(3), self.input_file)
+        self.state.refresh(force=True)
+        self.assertEqual(self.state.query("exchanges")[0]["transactions"], 4)
+
+    def test_history(self):
+        history = self.state.query("charts/history", exchange="binance")
+        self.assertEqual(history, {"dates": [], "values": []})
+        self.assertEqual(self.state.results, {})  # never cached
+
+        for exchange in ["../binance", "gdax"]:  # just exchanges in memory
+            with self.assertRaises(ValueError):
+                self.state.query("charts/history", exchange=exchange)
+        self.assertEqual(os.listdir(self.folder), ["binance.json"])
+
+    def test_balance(self):
+        readers = []
+
+        def get_prices(coins, currency, tor):
+            readers.append(self.state.data_lock.readers)
+            return {coin: 2.0 for coin in coins}
+
+        with mock.patch(
+                "pyhodl.models.exchanges.get_current_prices", get_prices
+        ):
+            answer = self.state.query("balance", exchange="binance")
+            with self.assertRaises(ValueError):
+                self.state.query("balance", exchange="gdax")
+
+        self.assertEqual(readers, [0])  # data lock released before prices
+        self.assertTrue(answer["balances"])
+        self.assertAlmostEqual(answer["value"], sum(
+            2.0 * balance["balance"] for balance in answer["balances"]
+        ))
+        self.assertEqual(self.state.results, {})  # never cached
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            self.state.query("nothing")
+
+    def test_concurrent(self):
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(self.state.query("profits"))
+            ) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 4)
+        self.assertEqual(len(self.state.results), 1)
+
+
+class TestQueryServer(unittest.TestCase):
+    """ Tests of HTTP answers """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        write_json(
+            get_binance_raws(2), os.path.join(self.folder, "binance.json")
+        )
+        self.state = ServerState(self.folder)
+        self.server = QueryServer(self.state, "127.0.0.1", 0)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.state.watcher.close()
+        shutil.rmtree(self.folder)
+
+    def get(self, path):
+        """
+        :param path: str
+            Path of query
+        :return: tuple (int, *)
+            Status and JSON answer
+        """
+
+        url = "http://127.0.0.1:" + str(self.server.server_port) + path
+        try:
+            with urllib.request.urlopen(url) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_queries(self):
+        status, exchanges = self.get("/exchanges")
+        self.assertEqual(status, 200)
+        self.assertEqual(exchanges[0]["name"], "binance")
+
+        status, answer = self.get("/charts/history?exchange=..%2Fbinance")
+        self.assertEqual(status, 400)
+        self.assertIn("No exchange named", answer["error"])
+
+        status, answer = self.get("/nothing")
+        self.assertEqual(status, 404)
+        self.assertIn("exchanges", answer["queries"])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Test pyhodl.stats module """
+
+import math
+import unittest
+
+from pyhodl.data.tables import CoinPricesTable
+from pyhodl.models.transactions import Wallet
+from pyhodl.stats.profits import CostBasisMethod, LotsMatcher, \
+    WalletCostBasis
+
+NAN = float("nan")
+
+
+def match_lots(method, deltas):
+    """
+    :param method: CostBasisMethod
+        How to match disposals with lots
+    :param deltas: [] of (float, float)
+        Amount moved (negative if disposed) and price of each delta
+    :return: LotsMatcher
+        Matcher after all deltas
+    """
+
+    matcher = LotsMatcher(method)
+    for amount, price in deltas:
+        if amount > 0:
+            matcher.acquire(amount, price)
+        else:
+            matcher.dispose(-amount, price)
+    return matcher
+
+
+class TestLotsMatcher(unittest.TestCase):
+    """ Tests of cost basis methods """
+
+    DELTAS = [(1.0, 200.0), (1.0, 250.0), (-1.0, 300.0)]
+
+    def assert_cost_realized(self, method, cost, realized):
+        matcher = match_lots(method, self.DELTAS)
+        self.assertAlmostEqual(matcher.amount, 1.0)
+        self.assertAlmostEqual(matcher.cost, cost)
+        self.assertAlmostEqual(matcher.realized, realized)
+
+    def test_fifo(self):
+        self.assert_cost_realized(CostBasisMethod.FIFO, 250.0, 100.0)
+
+    def test_lifo(self):
+        self.assert_cost_realized(CostBasisMethod.LIFO, 200.0, 50.0)
+
+    def test_average(self):
+        self.assert_cost_realized(CostBasisMethod.AVERAGE, 225.0, 75.0)
+
+    def test_partial_lots(self):
+        matcher = match_lots(
+            CostBasisMethod.FIFO, [(2.0, 100.0), (1.0, 400.0), (-2.5, 300.0)]
+        )
+        self.assertAlmostEqual(matcher.amount, 0.5)
+        self.assertAlmostEqual(matcher.cost, 200.0)
+        self.assertAlmostEqual(matcher.realized, 2.5 * 300.0 - 400.0)
+        self.assertAlmostEqual(matcher.get_unrealized(500.0), 50.0)
+
+    def test_unmatched(self):
+        matcher = match_lots(CostBasisMethod.LIFO, [(1.0, 10.0), (-3.0, 20.0)])
+        self.assertAlmostEqual(matcher.amount, 0.0)
+        self.assertAlmostEqual(matcher.unmatched, 2.0)
+        self.assertAlmostEqual(matcher.realized, 10.0)
+
+    def test_unpriced_lots(self):
+        """ Lots without a price do not make cost and profits NaN """
+
+        for method in CostBasisMethod:
+            matcher = match_lots(
+                method, [(1.0, NAN), (1.0, 200.0), (-2.0, 300.0),
+                         (1.0, 100.0), (-0.5, NAN)]
+            )
+            self.assertFalse(math.isnan(matcher.cost), method)
+            self.assertFalse(math.isnan(matcher.realized), method)
+            self.assertAlmostEqual(matcher.realized, 100.0)
+            self.assertAlmostEqual(matcher.amount, 0.5)
+            self.assertAlmostEqual(matcher.unpriced, 0.0)
+            self.assertAlmostEqual(matcher.cost, 50.0)
+
+
+class TestWalletCostBasis(unittest.TestCase):
+    """ Tests of profits of wallets """
+
+    def test_empty_prices_table(self):
+        cost_basis = WalletCostBasis(Wallet("BTC"))
+        cost_basis.prices_table = CoinPricesTable("USD", content=[])
+        profits = cost_basis.get_profits()
+        self.assertEqual(profits["balance"], 0.0)
+        self.assertTrue(math.isnan(profits["value"]))
+        self.assertEqual(profits["unpriced"], 0)
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# !/usr/bin/python3
+# coding: utf_8
+
+# Copyright 2017-2018 Stefano Fogarollo
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+""" Test pyhodl.updater module """
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+from pyhodl.updater.aio import AsyncExchangeUpdater
+
+
+class AsyncKeysUpdater(AsyncExchangeUpdater):
+    """ Fetches items of keys, failing with some of them """
+
+    def __init__(self, data_folder, failing):
+        AsyncExchangeUpdater.__init__(self, None, data_folder, None)
+        self.failing = failing
+        self.fetched = []
+
+    async def fetch(self, key):
+        await asyncio.sleep(0.01)
+        if key in self.failing:
+            raise ValueError("Cannot fetch", key)
+
+        self.fetched.append(key)
+        return [{"key": key}]
+
+    async def get_transactions(self):
+        self.transactions = await self.gather(
+            "items", ["a", "b", "c"], self.fetch
+        )
+
+
+class TestAsyncUpdater(unittest.TestCase):
+    """ Tests of concurrent requests of updaters """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_gather(self):
+        updater = AsyncKeysUpdater(self.folder, [])
+        asyncio.run(updater.get_transactions())
+        self.assertEqual(
+            updater.transactions, [{"key": "a"}, {"key": "b"}, {"key": "c"}]
+        )
+
+    def test_failed_keys(self):
+        """ A failing key does not stop the others """
+
+        updater = AsyncKeysUpdater(self.folder, ["a"])
+        with self.assertRaises(ValueError) as context:
+            asyncio.run(updater.get_transactions())
+        self.assertEqual(list(context.exception.args[1]), ["a"])
+        self.assertEqual(sorted(updater.fetched), ["b", "c"])
+
+
+def main():
+    unittest.main()
+
+
+if __name__ == '__main__':
+    main()